@@ -9,7 +9,7 @@ from alembic import context
 
 # Import your SQLModel metadata
 from app.models.base import SQLModel
-from app.models.domain import QuestionBank, StudyMaterial  # Import all models to register them
+from app.models.domain import IngestionJob, QuestionBank, StudyMaterial  # Import all models to register them
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
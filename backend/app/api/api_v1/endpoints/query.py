@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.pipeline import RAGService
+from app.services.pipeline import RAGService, get_rag_service
 
 router = APIRouter()
 
@@ -11,14 +13,43 @@ class QueryResponse(BaseModel):
     answer: str
 
 @router.post("/", response_model=QueryResponse)
-async def query_knowledge_graph(request: QueryRequest):
+async def query_knowledge_graph(
+    request: QueryRequest,
+    service: RAGService = Depends(get_rag_service),
+):
     """
     Query the built knowledge graph.
     """
     try:
-        # In a real app, you might cache the service or pool it
-        service = RAGService()
-        answer = service.query(request.query)
+        answer = await service.aquery(request.query)
         return QueryResponse(answer=str(answer))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+
+@router.post("/stream")
+async def stream_query_knowledge_graph(
+    request: QueryRequest,
+    service: RAGService = Depends(get_rag_service),
+):
+    """
+    Query the built knowledge graph, streaming Server-Sent Events.
+
+    Emits `progress` events as community answers complete, `token` events for
+    the final answer, then `done` (or `error` if the query failed).
+    """
+    async def event_stream():
+        try:
+            async for event in service.astream_query(request.query):
+                name = event.pop("event")
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield f"event: error\ndata: {json.dumps({'detail': f'Query failed: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
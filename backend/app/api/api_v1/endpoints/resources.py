@@ -1,29 +1,66 @@
+from pathlib import Path
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
-import shutil
-import os
-from datetime import datetime
 from uuid import UUID
 
-from app.core.db import get_session
-from app.models.domain import QuestionBank, StudyMaterial
+from app.core.cache import etag_matches
+from app.core.config import settings
+from app.core.db import async_session, get_session
+from app.models.domain import IngestionJob, JobStatus, Question, QuestionBank, StudyMaterial
 from app.services import crud_services
+from app.services.ingest_progress import TERMINAL_STATUSES, job_event, progress_broker
+from app.services.pipeline import RAGService, get_rag_service
+from app.services.uploads import save_upload
 
 router = APIRouter()
 
 # --- Question Banks ---
 
+async def _read_page(
+    crud,
+    db: AsyncSession,
+    request: Request,
+    skip: int | None,
+    cursor: str | None,
+    limit: int,
+    fields: str | None,
+) -> Response:
+    """A list endpoint's page: keyset-paginated, with the next cursor in `X-Next-Cursor`.
+
+    `skip` keeps the old offset paging working; `fields` (comma separated) returns
+    only those columns. Pages are served from the listing cache with an ETag, and a
+    matching `If-None-Match` gets a 304 with no body.
+    """
+    columns = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    page = await crud.get_listing(db, cursor=cursor, limit=limit, fields=columns, skip=skip)
+    # Clients may reuse the response only after checking it is still current
+    headers = {"ETag": page["etag"], "Cache-Control": "no-cache"}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if etag_matches(request.headers.get("if-none-match"), page["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page["body"], media_type="application/json", headers=headers)
+
 @router.get("/question-banks/", response_model=list[QuestionBank])
 async def read_question_banks(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str | None = None,
+    skip: int | None = None,
     db: AsyncSession = Depends(get_session),
 ) -> Any:
     """
-    Retrieve question banks.
+    Retrieve question banks, oldest first.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` for the next page.
     """
-    return await crud_services.question_bank.get_multi(db, skip=skip, limit=limit)
+    return await _read_page(crud_services.question_bank, db, request, skip, cursor, limit, fields)
 
 @router.post("/question-banks/", response_model=QuestionBank)
 async def create_question_bank(
@@ -33,77 +70,321 @@ async def create_question_bank(
     db: AsyncSession = Depends(get_session),
 ) -> Any:
     """
-    Create new question bank and upload file.
+    Create new question bank, upload file and queue it for processing.
+
+    The workers parse it into questions, link each one to the knowledge graph and
+    answer them all; see `/question-banks/{bank_id}/questions`.
     """
     # Simply saving to local "uploads" folder for now
-    upload_dir = "uploads/question_banks"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = f"{upload_dir}/{file.filename}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    upload = await save_upload(
+        file,
+        "uploads/question_banks",
+        max_bytes=settings.UPLOAD_MAX_BYTES,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    )
         
-    obj_in = QuestionBank(title=title, description=description, file_path=file_path)
-    return await crud_services.question_bank.create(db, obj_in=obj_in)
+    obj_in = QuestionBank(title=title, description=description, file_path=upload.path)
+    db_obj = await crud_services.question_bank.create(db, obj_in=obj_in)
+    await _queue_question_bank(db, db_obj)
+    return db_obj
+
+async def _queue_question_bank(db: AsyncSession, bank: QuestionBank) -> IngestionJob:
+    # Picked up by the ingestion workers (python -m app.worker)
+    job_in = IngestionJob(
+        question_bank_id=bank.id,
+        file_path=bank.file_path,
+        max_attempts=settings.INGEST_MAX_ATTEMPTS,
+    )
+    return await crud_services.ingestion_job.create(db, obj_in=job_in)
+
+async def _get_question_bank(db: AsyncSession, bank_id: UUID) -> QuestionBank:
+    bank = await crud_services.question_bank.get(db, id=bank_id)
+    if bank is None:
+        raise HTTPException(status_code=404, detail="Question bank not found")
+    return bank
+
+@router.get("/question-banks/{bank_id}/questions", response_model=list[Question])
+async def read_questions(
+    bank_id: UUID,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Retrieve a question bank's questions in order, with their stored answers and
+    the graph entities and communities each is linked to.
+
+    `answer` is null until the question has been answered.
+    """
+    await _get_question_bank(db, bank_id)
+    return await crud_services.question.get_for_bank(db, bank_id=bank_id, skip=skip, limit=limit)
+
+@router.post("/question-banks/{bank_id}/process", response_model=IngestionJob)
+async def process_question_bank(
+    bank_id: UUID,
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Queue a question bank to be processed again, e.g. after new study materials
+    were ingested. Answers already in the query cache are reused.
+    """
+    bank = await _get_question_bank(db, bank_id)
+    job = await crud_services.ingestion_job.get_latest_for_question_bank(db, question_bank_id=bank_id)
+    if job is not None and job.status in (JobStatus.PENDING, JobStatus.RUNNING):
+        raise HTTPException(status_code=409, detail="Question bank is already queued for processing")
+    return await _queue_question_bank(db, bank)
+
+@router.get("/question-banks/{bank_id}/processing", response_model=IngestionJob)
+async def read_question_bank_processing(
+    bank_id: UUID,
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Retrieve the latest processing job for a question bank, with its progress.
+    """
+    job = await crud_services.ingestion_job.get_latest_for_question_bank(db, question_bank_id=bank_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No processing job for this question bank")
+    return job
 
 # --- Study Materials ---
 
 @router.get("/study-materials/", response_model=list[StudyMaterial])
 async def read_study_materials(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str | None = None,
+    skip: int | None = None,
     db: AsyncSession = Depends(get_session),
 ) -> Any:
     """
-    Retrieve study materials.
+    Retrieve study materials, oldest first.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` for the next page.
     """
-    return await crud_services.study_material.get_multi(db, skip=skip, limit=limit)
+    return await _read_page(crud_services.study_material, db, request, skip, cursor, limit, fields)
 
 @router.post("/study-materials/", response_model=StudyMaterial)
 async def create_study_material(
-    background_tasks: BackgroundTasks,
     title: str,
     description: str | None = None,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_session),
 ) -> Any:
     """
-    Create new study material and upload file.
+    Create new study material, upload file and queue it for ingestion.
+
+    Uploading a file identical to an existing study material returns that material
+    without ingesting it again.
     """
-    upload_dir = "uploads/study_materials"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = f"{upload_dir}/{file.filename}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    upload = await save_upload(
+        file,
+        "uploads/study_materials",
+        max_bytes=settings.UPLOAD_MAX_BYTES,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    )
+    file_path = upload.path
+
+    existing = await crud_services.study_material.get_by_content_hash(db, content_hash=upload.sha256)
+    if existing is not None:
+        await _discard_duplicate_upload(db, upload.path, existing.file_path)
+        return existing
         
-    obj_in = StudyMaterial(title=title, description=description, file_path=file_path)
+    obj_in = StudyMaterial(
+        title=title, description=description, file_path=file_path, content_hash=upload.sha256
+    )
     db_obj = await crud_services.study_material.create(db, obj_in=obj_in)
     
-    # Trigger RAG Ingestion in background
-    background_tasks.add_task(ingest_and_update, db_obj.id, file_path)
+    # Picked up by the ingestion workers (python -m app.worker)
+    job_in = IngestionJob(
+        material_id=db_obj.id,
+        file_path=file_path,
+        max_attempts=settings.INGEST_MAX_ATTEMPTS,
+    )
+    await crud_services.ingestion_job.create(db, obj_in=job_in)
     
     return db_obj
 
-async def ingest_and_update(material_id: UUID, file_path: str):
-    """Refactored task to handle async session and RAG ingestion."""
-    from app.services.pipeline import RAGService
-    from app.core.db import engine
-    from sqlmodel.ext.asyncio.session import AsyncSession
-    from sqlalchemy.orm import sessionmaker
-    
-    rag = RAGService()
-    try:
-        rag.ingest_file(file_path)
-        
-        # Update DB status
-        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-        async with async_session() as session:
-            material = await session.get(StudyMaterial, material_id)
-            if material:
-                material.is_indexed = True
-                material.indexed_at = datetime.utcnow().isoformat()
-                session.add(material)
-                await session.commit()
-    except Exception as e:
-        print(f"Ingestion failed for {file_path}: {e}")
+async def _get_idle_study_material(db: AsyncSession, material_id: UUID) -> StudyMaterial:
+    """The study material, unless it is missing or being ingested right now."""
+    material = await crud_services.study_material.get(db, id=material_id)
+    if material is None:
+        raise HTTPException(status_code=404, detail="Study material not found")
+    job = await crud_services.ingestion_job.get_latest_for_material(db, material_id=material_id)
+    if job is not None and job.status == JobStatus.RUNNING:
+        raise HTTPException(status_code=409, detail="Study material is being ingested; try again later")
+    return material
+
+async def _discard_duplicate_upload(db: AsyncSession, file_path: str, kept_path: str) -> None:
+    """Delete a just-saved upload whose content is already stored at `kept_path`.
+
+    Identical content saved under another filename lands at a new path; it is kept
+    only if some study material already points at it.
+    """
+    if file_path == kept_path:
+        return
+    if await crud_services.study_material.get_by_file_path(db, file_path=file_path):
+        return
+    Path(file_path).unlink(missing_ok=True)
+
+async def _remove_upload(db: AsyncSession, file_path: str, content_hash: str | None) -> None:
+    """Delete an uploaded file unless another study material still has the same content."""
+    if content_hash and await crud_services.study_material.get_by_content_hash(db, content_hash=content_hash):
+        return
+    Path(file_path).unlink(missing_ok=True)
+
+@router.delete("/study-materials/{material_id}", response_model=StudyMaterial)
+async def delete_study_material(
+    material_id: UUID,
+    db: AsyncSession = Depends(get_session),
+    service: RAGService = Depends(get_rag_service),
+) -> Any:
+    """
+    Delete a study material, its file and its ingestion jobs, and remove its
+    contribution to the knowledge graph.
+    """
+    await _get_idle_study_material(db, material_id)
+    # Drop queued jobs before touching the graph, so no worker can ingest the material
+    # while it is being removed. The status guard skips a job a worker has just
+    # claimed, which the second check then reports as running.
+    await crud_services.ingestion_job.remove_for_material(
+        db, material_id=material_id, status=JobStatus.PENDING
+    )
+    material = await _get_idle_study_material(db, material_id)
+    # Graph first: if that fails the material is kept and the delete can be retried
+    await asyncio.to_thread(service.remove_document, str(material_id))
+    await crud_services.ingestion_job.remove_for_material(db, material_id=material_id)
+    material = await crud_services.study_material.remove(db, id=material_id)
+    if material is None:
+        raise HTTPException(status_code=404, detail="Study material not found")
+    await _remove_upload(db, material.file_path, material.content_hash)
+    return material
+
+@router.put("/study-materials/{material_id}/file", response_model=StudyMaterial)
+async def replace_study_material_file(
+    material_id: UUID,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Replace a study material's file and queue it for ingestion.
+
+    Only chunks that changed are extracted again; what came only from removed text
+    is dropped from the knowledge graph.
+    """
+    material = await _get_idle_study_material(db, material_id)
+    upload = await save_upload(
+        file,
+        "uploads/study_materials",
+        max_bytes=settings.UPLOAD_MAX_BYTES,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    )
+    if upload.sha256 == material.content_hash:
+        await _discard_duplicate_upload(db, upload.path, material.file_path)
+        return material
+
+    previous_path, previous_hash = material.file_path, material.content_hash
+    material = await crud_services.study_material.update(
+        db,
+        db_obj=material,
+        obj_in={
+            "file_path": upload.path,
+            "content_hash": upload.sha256,
+            "is_indexed": False,
+            "indexed_at": None,
+        },
+    )
+    await _remove_upload(db, previous_path, previous_hash)
+    # A queued job for the previous file would ingest content that is gone
+    await crud_services.ingestion_job.remove_for_material(
+        db, material_id=material.id, status=JobStatus.PENDING
+    )
+
+    job_in = IngestionJob(
+        material_id=material.id,
+        file_path=upload.path,
+        max_attempts=settings.INGEST_MAX_ATTEMPTS,
+    )
+    await crud_services.ingestion_job.create(db, obj_in=job_in)
+    return material
+
+@router.get("/study-materials/{material_id}/ingestion", response_model=IngestionJob)
+async def read_study_material_ingestion(
+    material_id: UUID,
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Retrieve the latest ingestion job for a study material.
+    """
+    job = await crud_services.ingestion_job.get_latest_for_material(db, material_id=material_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No ingestion job for this study material")
+    return job
+
+def _sse(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/study-materials/{material_id}/ingestion/events")
+async def stream_study_material_ingestion(
+    material_id: UUID,
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Follow a study material's ingestion as Server-Sent Events.
+
+    Emits `progress` events (job status, stage, chunk counts and an ETA), starting
+    with the current state, then `done` once the job has succeeded or failed.
+    """
+    job = await crud_services.ingestion_job.get_latest_for_material(db, material_id=material_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No ingestion job for this study material")
+    latest = job_event(job.id, job.material_id, JobStatus(job.status).value, job.progress)
+
+    async def event_stream():
+        current = latest
+        queue = await progress_broker.subscribe(material_id)
+        try:
+            yield _sse("progress", current)
+            while current["status"] not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.INGEST_EVENTS_REFRESH_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    # Catches up on missed notifications, or replaces them without a listener
+                    async with async_session() as session:
+                        job = await crud_services.ingestion_job.get_latest_for_material(
+                            session, material_id=material_id
+                        )
+                    if job is None:
+                        # The material was deleted
+                        break
+                    event = job_event(job.id, job.material_id, JobStatus(job.status).value, job.progress)
+                    if event == current:
+                        yield ": keepalive\n\n"
+                        continue
+                current = event
+                yield _sse("progress", current)
+            yield _sse("done", {})
+        finally:
+            progress_broker.unsubscribe(material_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/ingestion-jobs/{job_id}", response_model=IngestionJob)
+async def read_ingestion_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_session),
+) -> Any:
+    """
+    Retrieve an ingestion job.
+    """
+    job = await crud_services.ingestion_job.get(db, id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
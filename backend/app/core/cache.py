@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class LRUCache:
+    """In-process cache with a size bound and a time-to-live per entry."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 5.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Shared cache on Redis, so every API and worker process sees the same versions."""
+
+    def __init__(self, url: str, ttl: float = 300.0) -> None:
+        # Optional dependency, only needed when a shared cache is configured
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Any | None:
+        value = await self.client.get(key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.client.set(key, json.dumps(value), px=int(self.ttl * 1000))
+
+    async def get_version(self, namespace: str) -> int:
+        return int(await self.client.get(f"version:{namespace}") or 0)
+
+    async def incr_version(self, namespace: str) -> int:
+        return await self.client.incr(f"version:{namespace}")
+
+
+class ListingCache:
+    """Read-through cache for list responses, keyed by a per-table version.
+
+    Writes bump the table's version, so entries of the old version are never read
+    again and simply age out. Versions and entries live in Redis when a shared
+    backend is given; otherwise versions are per process and the local TTL bounds
+    how long a change made by another process (an ingestion worker) goes unseen.
+    """
+
+    def __init__(self, local: LRUCache, shared: RedisCache | None = None) -> None:
+        self.local = local
+        self.shared = shared
+        self._versions: dict[str, int] = {}
+
+    async def version(self, namespace: str) -> int:
+        if self.shared is not None:
+            try:
+                return await self.shared.get_version(namespace)
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable, using local versions: {e}")
+        return self._versions.get(namespace, 0)
+
+    async def invalidate(self, namespace: str) -> None:
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        if self.shared is not None:
+            try:
+                await self.shared.incr_version(namespace)
+            except Exception as e:
+                logger.warning(f"Could not invalidate shared cache for {namespace}: {e}")
+
+    async def get_or_load(
+        self, namespace: str, key: str, load: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """The cached value for `key` at the table's current version, loading it on a miss."""
+        versioned = f"{namespace}:{await self.version(namespace)}:{key}"
+        value = self.local.get(versioned)
+        if value is not None:
+            return value
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(versioned)
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable: {e}")
+        if value is None:
+            value = await load()
+            if self.shared is not None:
+                try:
+                    await self.shared.set(versioned, value)
+                except Exception as e:
+                    logger.warning(f"Could not write to shared cache: {e}")
+        self.local.set(versioned, value)
+        return value
+
+
+def etag_for(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an `If-None-Match` header already names `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _create_listing_cache() -> ListingCache | None:
+    if not settings.LISTING_CACHE_ENABLED:
+        return None
+    local = LRUCache(max_entries=settings.LISTING_CACHE_MAX_ENTRIES, ttl=settings.LISTING_CACHE_TTL)
+    shared = None
+    if settings.LISTING_CACHE_REDIS_URL:
+        shared = RedisCache(settings.LISTING_CACHE_REDIS_URL, ttl=settings.LISTING_CACHE_SHARED_TTL)
+    return ListingCache(local, shared)
+
+
+listing_cache = _create_listing_cache()
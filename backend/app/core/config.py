@@ -10,12 +10,98 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str | None = os.getenv("SUPABASE_KEY")
     MISTRAL_API_KEY: str | None = os.getenv("MISTRAL_API_KEY")
 
+    # RAG
+    RAG_STORAGE_DIR: str = "storage"
+    # SQLAlchemy URL for the graph and document store; defaults to a SQLite file in RAG_STORAGE_DIR
+    RAG_GRAPH_STORE_URL: str | None = None
+    RAG_EXTRACTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Cosine similarity above which new entity names merge into a known entity; None for name matching only
+    RAG_ENTITY_MERGE_THRESHOLD: float | None = None
+    RAG_EXTRACT_WORKERS: int = 4
+    RAG_EXTRACT_MAX_WORKERS: int = 16
+    RAG_EXTRACT_MAX_RETRIES: int = 5
+    RAG_EXTRACT_BATCH_MAX_CHARS: int = 4000
+    RAG_EXTRACT_BATCH_MAX_CHUNKS: int = 4
+    RAG_SUMMARY_CONCURRENCY: int = 8
+    # Token budget for one community summary call; larger communities are map-reduced
+    RAG_SUMMARY_MAX_TOKENS: int = 6000
+    RAG_SUMMARY_MAX_RETRIES: int = 5
+    RAG_QUERY_CONCURRENCY: int = 8
+    RAG_QUERY_TIMEOUT: float = 60.0
+    RAG_QUERY_TOP_K: int = 10
+    RAG_QUERY_KEYWORD_PREFILTER: bool = True
+    RAG_QUERY_HIERARCHICAL: bool = True
+    RAG_QUERY_MAX_LEVEL: int | None = None
+    # "auto" routes narrow queries about named entities to the local mode, the rest to global
+    RAG_QUERY_MODE: str = "auto"
+    RAG_LOCAL_HOPS: int = 2
+    RAG_LOCAL_MAX_TRIPLETS: int = 40
+    RAG_LOCAL_MAX_CHUNKS: int = 4
+    # Answer cache shared by all workers; near-duplicate queries above the similarity
+    # also hit it (None for exact matches on the normalized query only)
+    RAG_QUERY_CACHE_ENABLED: bool = True
+    RAG_QUERY_CACHE_TTL: float = 24 * 3600
+    RAG_QUERY_CACHE_MAX_ENTRIES: int = 10000
+    RAG_QUERY_CACHE_SIMILARITY: float | None = 0.95
+    # Memo of per-community answers, reused by any query that selects the same community
+    RAG_PARTIAL_ANSWER_CACHE_ENABLED: bool = True
+    RAG_PARTIAL_ANSWER_CACHE_MAX_ENTRIES: int = 100000
+
+    # Uploads are streamed to disk in chunks and rejected past the size limit
+    UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # Study material / question bank listings, cached until the table is written to.
+    # Without a shared (Redis) backend, writes by other processes show after the TTL
+    LISTING_CACHE_ENABLED: bool = True
+    LISTING_CACHE_TTL: float = 5.0
+    LISTING_CACHE_MAX_ENTRIES: int = 1024
+    # e.g. redis://localhost:6379/0 (needs the redis package)
+    LISTING_CACHE_REDIS_URL: str | None = None
+    LISTING_CACHE_SHARED_TTL: float = 300.0
+
+    # Ingestion workers (python -m app.worker)
+    # Chunks extracted and inserted per batch, bounding memory for large documents
+    INGEST_BATCH_NODES: int = 128
+    INGEST_WORKERS: int = 2
+    INGEST_POLL_INTERVAL: float = 2.0
+    INGEST_MAX_ATTEMPTS: int = 5
+    INGEST_RETRY_BASE_DELAY: float = 30.0
+    INGEST_RETRY_MAX_DELAY: float = 3600.0
+    INGEST_HEARTBEAT_INTERVAL: float = 30.0
+    INGEST_STALE_AFTER: float = 300.0
+    # Progress events are relayed with Postgres LISTEN/NOTIFY; LISTEN needs a direct
+    # (session) connection, so set this when the main URL goes through a transaction pooler
+    INGEST_EVENTS_DB_URL: str | None = None
+    # Event streams also re-read the job this often, in case a notification was missed
+    INGEST_EVENTS_REFRESH_INTERVAL: float = 15.0
+    # Question banks are processed by the same workers: questions are embedded this
+    # many per call, answered with RAG_QUERY_CONCURRENCY LLM calls in flight for the
+    # whole bank, and their answers written this many at a time
+    QUESTION_EMBED_BATCH_SIZE: int = 64
+    QUESTION_ANSWER_FLUSH_SIZE: int = 25
+
     # Database
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_DB: str = "studius_db"
     SUPABASE_DB_URL: str | None = os.getenv("SUPABASE_DB_URL")
+    # Log every SQL statement (debugging only; it is synchronous on the request path)
+    DB_ECHO: bool = False
+    # Connections kept open per process, plus bursts beyond that closed again when idle
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Reconnect before the pooler or server drops idle connections
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Seconds before a statement is cancelled; None for no limit
+    DB_STATEMENT_TIMEOUT: float | None = 30.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Behind a transaction-mode pooler (pgbouncer / Supavisor) prepared statements
+    # cannot be cached per connection; None detects Supabase's pooler from the URL
+    DB_PGBOUNCER: bool | None = None
     
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
@@ -1,25 +1,61 @@
-from typing import Any, Generic, Type, TypeVar, Union
+import base64
+import json
+from datetime import datetime
+from typing import Any, Generic, Sequence, Type, TypeVar, Union
 from uuid import UUID
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, tuple_, update
 from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache import ListingCache, etag_for
+from app.core.exceptions import InvalidCursorException, UnknownFieldsException
+
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=SQLModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=SQLModel)
 
 
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Opaque cursor pointing just after the row with this (created_at, id)."""
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except ValueError:
+        raise InvalidCursorException()
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], cache: ListingCache | None = None):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
         **Parameters**
 
         * `model`: A SQLModel class
+        * `cache`: Optional cache for `get_listing`, invalidated by every write through this object
         """
         self.model = model
+        self.cache = cache
+
+    async def invalidate_cache(self) -> None:
+        """Drop cached listings; call after writing to the table without this object."""
+        if self.cache is not None:
+            await self.cache.invalidate(self.model.__tablename__)
+
+    def _columns(self, fields: Sequence[str]) -> list:
+        """Columns for a projection; `id` and `created_at` are always included for paging."""
+        names = list(dict.fromkeys(["id", "created_at", *fields]))
+        unknown = [name for name in names if name not in self.model.__table__.columns]
+        if unknown:
+            raise UnknownFieldsException(unknown)
+        return [self.model.__table__.columns[name] for name in names]
 
     async def get(self, db: AsyncSession, id: UUID) -> ModelType | None:
         statement = select(self.model).where(self.model.id == id)
@@ -27,19 +63,104 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return result.scalar_one_or_none()
 
     async def get_multi(
-        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
-    ) -> list[ModelType]:
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> list[Any]:
+        """Offset paging. With `fields`, rows are dicts holding only those columns."""
+        if fields:
+            statement = select(*self._columns(fields)).offset(skip).limit(limit)
+            result = await db.execute(statement)
+            return [dict(row) for row in result.mappings().all()]
         statement = select(self.model).offset(skip).limit(limit)
         result = await db.execute(statement)
         return result.scalars().all()
 
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[Any], str | None]:
+        """
+        One page ordered by `(created_at, id)` and the cursor of the next page (None on the last).
+
+        Seeks past the cursor on the `(created_at, id)` index, so deep pages cost the
+        same as the first. With `fields`, rows are mappings holding only those columns.
+        """
+        if fields:
+            statement = select(*self._columns(fields))
+        else:
+            statement = select(self.model)
+        if cursor is not None:
+            statement = statement.where(
+                tuple_(self.model.created_at, self.model.id) > tuple_(*decode_cursor(cursor))
+            )
+        statement = statement.order_by(self.model.created_at, self.model.id).limit(limit + 1)
+        result = await db.execute(statement)
+        rows = result.mappings().all() if fields else result.scalars().all()
+        if len(rows) <= limit:
+            return list(rows), None
+        rows = rows[:limit]
+        last = rows[-1]
+        if fields:
+            return [dict(row) for row in rows], encode_cursor(last["created_at"], last["id"])
+        return list(rows), encode_cursor(last.created_at, last.id)
+
+    async def get_listing(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+        skip: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        A page as a JSON `body` with its `etag` and `next_cursor`, read through the cache.
+
+        `skip` selects offset paging (`get_multi`) instead of `get_page`.
+        """
+        async def load() -> dict[str, Any]:
+            if skip is not None:
+                rows = await self.get_multi(db, skip=skip, limit=limit, fields=fields)
+                next_cursor = None
+            else:
+                rows, next_cursor = await self.get_page(db, cursor=cursor, limit=limit, fields=fields)
+            body = json.dumps(jsonable_encoder(rows))
+            return {"body": body, "etag": etag_for(body), "next_cursor": next_cursor}
+
+        if self.cache is None:
+            return await load()
+        key = json.dumps([cursor, limit, list(fields or ()), skip])
+        return await self.cache.get_or_load(self.model.__tablename__, key, load)
+
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         db_obj = self.model.model_validate(obj_in)
         db.add(db_obj)
         await db.commit()
+        await self.invalidate_cache()
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many(
+        self, db: AsyncSession, *, objs_in: Sequence[CreateSchemaType]
+    ) -> list[ModelType]:
+        """Insert every object in one INSERT ... RETURNING and a single commit."""
+        if not objs_in:
+            return []
+        rows = [self.model.model_validate(obj_in).model_dump() for obj_in in objs_in]
+        result = await db.execute(insert(self.model).returning(self.model), rows)
+        db_objs = result.scalars().all()
+        await db.commit()
+        await self.invalidate_cache()
+        return list(db_objs)
+
     async def update(
         self,
         db: AsyncSession,
@@ -57,11 +178,49 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         await db.commit()
+        await self.invalidate_cache()
         await db.refresh(db_obj)
         return db_obj
 
-    async def remove(self, db: AsyncSession, *, id: UUID) -> ModelType:
-        db_obj = await self.get(db, id)
-        await db.delete(db_obj)
+    async def update_many(
+        self, db: AsyncSession, *, ids: Sequence[UUID], obj_in: Union[UpdateSchemaType, dict[str, Any]]
+    ) -> int:
+        """Apply the same changes to every row in `ids` with one UPDATE. Returns the rows updated."""
+        if not ids:
+            return 0
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        statement = (
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(**update_data)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(statement)
+        await db.commit()
+        await self.invalidate_cache()
+        return result.rowcount
+
+    async def remove(self, db: AsyncSession, *, id: UUID) -> ModelType | None:
+        statement = delete(self.model).where(self.model.id == id).returning(self.model)
+        result = await db.execute(statement)
+        db_obj = result.scalar_one_or_none()
         await db.commit()
+        await self.invalidate_cache()
         return db_obj
+
+    async def remove_many(self, db: AsyncSession, *, ids: Sequence[UUID]) -> int:
+        """Delete every row in `ids` with one DELETE. Returns the rows deleted."""
+        if not ids:
+            return 0
+        statement = (
+            delete(self.model)
+            .where(self.model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(statement)
+        await db.commit()
+        await self.invalidate_cache()
+        return result.rowcount
@@ -1,14 +1,119 @@
+import threading
+import time
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=True, future=True)
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
+class PoolStats:
+    """Time spent waiting for a pooled connection, across the process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.waits += 1
+            self.timeouts += timed_out
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+
+pool_stats = PoolStats()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def _behind_pgbouncer(url) -> bool:
+    if settings.DB_PGBOUNCER is not None:
+        return settings.DB_PGBOUNCER
+    # Supabase's transaction pooler
+    return url.port == 6543 or (url.host or "").endswith("pooler.supabase.com")
+
+
+def _engine_kwargs(uri: str) -> dict:
+    url = make_url(uri)
+    if url.get_backend_name() != "postgresql":
+        return {}
+    connect_args = {"command_timeout": settings.DB_STATEMENT_TIMEOUT}
+    if _behind_pgbouncer(url):
+        # Each transaction may run on another server connection: no per-connection
+        # statement cache, and unique names so statements never collide
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        if settings.DB_STATEMENT_TIMEOUT:
+            # Also enforced by the server, which cancels the query instead of the client
+            connect_args["server_settings"] = {
+                "statement_timeout": str(int(settings.DB_STATEMENT_TIMEOUT * 1000))
+            }
+    return {
+        "poolclass": MeteredPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(
+    settings.SQLALCHEMY_DATABASE_URI,
+    echo=settings.DB_ECHO,
+    future=True,
+    **_engine_kwargs(settings.SQLALCHEMY_DATABASE_URI),
+)
+
+# One factory for the process; sessions are cheap, the engine and its pool are shared
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def pool_status() -> dict:
+    """Connection pool usage and checkout wait times for this process."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    waits = pool_stats.waits
+    status.update(
+        checkouts=waits,
+        checkout_timeouts=pool_stats.timeouts,
+        avg_wait_ms=round(1000 * pool_stats.total_wait / waits, 3) if waits else 0.0,
+        max_wait_ms=round(1000 * pool_stats.max_wait, 3),
     )
+    return status
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
@@ -1,6 +1,7 @@
 # backend/app/core/exceptions.py
 from fastapi import HTTPException, status
 
+
 class UserNotFoundException(HTTPException):
     def __init__(self):
         super().__init__(
@@ -8,9 +9,34 @@ class UserNotFoundException(HTTPException):
             detail="User not found"
         )
 
+
 class NotAuthorizedException(HTTPException):
     def __init__(self):
         super().__init__(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
-        )
\ No newline at end of file
+        )
+
+
+class UploadTooLargeException(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds the {max_bytes} byte limit"
+        )
+
+
+class InvalidCursorException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+class UnknownFieldsException(HTTPException):
+    def __init__(self, fields: list[str]):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(fields)}"
+        )
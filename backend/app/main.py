@@ -1,10 +1,26 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 from app.api.api_v1.api import api_router
+from app.core.db import pool_status
+from app.services.ingest_progress import progress_broker
+from app.services.pipeline import get_rag_service, close_rag_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the index once at startup so the first query doesn't pay for it
+    app.state.rag_service = await run_in_threadpool(get_rag_service)
+    yield
+    await progress_broker.close()
+    close_rag_service()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -16,3 +32,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/health/db")
+async def db_pool_health():
+    return pool_status()
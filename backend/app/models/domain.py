@@ -1,8 +1,15 @@
-from typing import Optional
-from sqlmodel import Field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+from uuid import UUID
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, Index
 from app.models.base import UUIDModel, TimestampModel
 
 class QuestionBank(UUIDModel, TimestampModel, table=True):
+    # Keyset pagination seeks on (created_at, id)
+    __table_args__ = (Index("ix_questionbank_created_at_id", "created_at", "id"),)
+
     title: str = Field(index=True)
     description: Optional[str] = None
     file_path: str = Field(nullable=False) # Path to the stored file (local or cloud)
@@ -10,8 +17,45 @@ class QuestionBank(UUIDModel, TimestampModel, table=True):
     processed_at: Optional[str] = None
 
 class StudyMaterial(UUIDModel, TimestampModel, table=True):
+    __table_args__ = (Index("ix_studymaterial_created_at_id", "created_at", "id"),)
+
     title: str = Field(index=True)
     description: Optional[str] = None
     file_path: str = Field(nullable=False)
+    content_hash: Optional[str] = Field(default=None, index=True) # SHA-256 of the uploaded file
     is_indexed: bool = Field(default=False)
     indexed_at: Optional[str] = None
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class IngestionJob(UUIDModel, TimestampModel, table=True):
+    # A job processes either a study material or a question bank
+    material_id: Optional[UUID] = Field(default=None, foreign_key="studymaterial.id", index=True)
+    question_bank_id: Optional[UUID] = Field(default=None, foreign_key="questionbank.id", index=True)
+    file_path: str = Field(nullable=False)
+    status: JobStatus = Field(default=JobStatus.PENDING, index=True)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_after: datetime = Field(default_factory=datetime.utcnow, index=True) # Not picked up before this time (retry backoff)
+    worker_id: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None # Refreshed while running; stale jobs are requeued
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    progress: Optional[dict[str, Any]] = Field(default=None, sa_column=Column(JSON)) # Latest ingest progress snapshot
+
+class Question(UUIDModel, TimestampModel, table=True):
+    __table_args__ = (Index("ix_question_bank_id_position", "bank_id", "position"),)
+
+    bank_id: UUID = Field(foreign_key="questionbank.id", index=True)
+    position: int = Field(nullable=False) # Order within the bank, from 0
+    text: str = Field(nullable=False)
+    mode: Optional[str] = None # Query mode it is answered in ("local" or "global")
+    entities: list[str] = Field(default_factory=list, sa_column=Column(JSON)) # Graph entities it names
+    communities: list[Any] = Field(default_factory=list, sa_column=Column(JSON)) # Communities it is answered from
+    answer: Optional[str] = None
+    answered_at: Optional[datetime] = None
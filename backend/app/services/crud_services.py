@@ -1,11 +1,220 @@
+import json
+import random
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlmodel import delete, insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import listing_cache
 from app.core.crud import CRUDBase
-from app.models.domain import QuestionBank, StudyMaterial
+from app.models.domain import IngestionJob, JobStatus, Question, QuestionBank, StudyMaterial
+from app.services.ingest_progress import CHANNEL, job_event
 
 class CRUDQuestionBank(CRUDBase[QuestionBank, QuestionBank, QuestionBank]):
     pass
 
+class CRUDQuestion(CRUDBase[Question, Question, Question]):
+    async def get_for_bank(
+        self, db: AsyncSession, *, bank_id: UUID, skip: int = 0, limit: int = 100
+    ) -> list[Question]:
+        statement = (
+            select(Question)
+            .where(Question.bank_id == bank_id)
+            .order_by(Question.position)
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await db.execute(statement)
+        return result.scalars().all()
+
+    async def replace_for_bank(
+        self, db: AsyncSession, *, bank_id: UUID, objs_in: list[Question]
+    ) -> list[Question]:
+        """Swap a bank's questions for `objs_in` in one transaction. Returns them by position."""
+        await db.execute(delete(Question).where(Question.bank_id == bank_id))
+        db_objs = []
+        if objs_in:
+            rows = [Question.model_validate(obj_in).model_dump() for obj_in in objs_in]
+            result = await db.execute(insert(Question).returning(Question), rows)
+            db_objs = result.scalars().all()
+        await db.commit()
+        return sorted(db_objs, key=lambda question: question.position)
+
+    async def set_answers(self, db: AsyncSession, *, answers: dict[UUID, str]) -> None:
+        """Store many answers with one executemany UPDATE by primary key."""
+        if not answers:
+            return
+        now = datetime.utcnow()
+        await db.execute(
+            update(Question),
+            [{"id": id, "answer": answer, "answered_at": now} for id, answer in answers.items()],
+        )
+        await db.commit()
+
 class CRUDStudyMaterial(CRUDBase[StudyMaterial, StudyMaterial, StudyMaterial]):
-    pass
+    async def get_by_content_hash(
+        self, db: AsyncSession, *, content_hash: str
+    ) -> StudyMaterial | None:
+        statement = (
+            select(StudyMaterial)
+            .where(StudyMaterial.content_hash == content_hash)
+            .order_by(StudyMaterial.created_at)
+            .limit(1)
+        )
+        result = await db.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def get_by_file_path(self, db: AsyncSession, *, file_path: str) -> StudyMaterial | None:
+        statement = select(StudyMaterial).where(StudyMaterial.file_path == file_path).limit(1)
+        result = await db.execute(statement)
+        return result.scalar_one_or_none()
+
+class CRUDIngestionJob(CRUDBase[IngestionJob, IngestionJob, IngestionJob]):
+    async def get_latest_for_material(
+        self, db: AsyncSession, *, material_id: UUID
+    ) -> IngestionJob | None:
+        statement = (
+            select(IngestionJob)
+            .where(IngestionJob.material_id == material_id)
+            .order_by(IngestionJob.created_at.desc())
+            .limit(1)
+            # Workers change jobs; refresh a copy already loaded in this session
+            .execution_options(populate_existing=True)
+        )
+        result = await db.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def get_latest_for_question_bank(
+        self, db: AsyncSession, *, question_bank_id: UUID
+    ) -> IngestionJob | None:
+        statement = (
+            select(IngestionJob)
+            .where(IngestionJob.question_bank_id == question_bank_id)
+            .order_by(IngestionJob.created_at.desc())
+            .limit(1)
+        )
+        result = await db.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def remove_for_material(
+        self, db: AsyncSession, *, material_id: UUID, status: JobStatus | None = None
+    ) -> int:
+        statement = delete(IngestionJob).where(IngestionJob.material_id == material_id)
+        if status is not None:
+            statement = statement.where(IngestionJob.status == status)
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount
+
+    async def claim_next(self, db: AsyncSession, *, worker_id: str) -> IngestionJob | None:
+        """Lock the oldest runnable job and mark it running.
+
+        `SKIP LOCKED` lets several workers poll concurrently without claiming the same job.
+        """
+        now = datetime.utcnow()
+        statement = (
+            select(IngestionJob)
+            .where(IngestionJob.status == JobStatus.PENDING, IngestionJob.run_after <= now)
+            .order_by(IngestionJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(statement)
+        job = result.scalar_one_or_none()
+        if job is None:
+            return None
+        job.status = JobStatus.RUNNING
+        job.attempts += 1
+        job.worker_id = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    async def heartbeat(self, db: AsyncSession, *, id: UUID) -> None:
+        statement = (
+            update(IngestionJob)
+            .where(IngestionJob.id == id, IngestionJob.status == JobStatus.RUNNING)
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        await db.execute(statement)
+        await db.commit()
+
+    async def set_progress(
+        self, db: AsyncSession, *, job: IngestionJob, progress: dict | None = None
+    ) -> dict:
+        """Store a progress snapshot on the job and announce it (Postgres NOTIFY). Returns the event."""
+        if progress is not None:
+            await db.execute(
+                update(IngestionJob).where(IngestionJob.id == job.id).values(progress=progress)
+            )
+            job.progress = progress
+        event = job_event(job.id, job.material_id, JobStatus(job.status).value, job.progress)
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": json.dumps(event)},
+            )
+        await db.commit()
+        return event
+
+    async def mark_succeeded(self, db: AsyncSession, *, job: IngestionJob) -> IngestionJob:
+        return await self.update(
+            db,
+            db_obj=job,
+            obj_in={"status": JobStatus.SUCCEEDED, "finished_at": datetime.utcnow(), "last_error": None},
+        )
+
+    async def mark_failed(
+        self,
+        db: AsyncSession,
+        *,
+        job: IngestionJob,
+        error: str,
+        base_delay: float,
+        max_delay: float,
+    ) -> IngestionJob:
+        """Schedule a retry with jittered exponential backoff, or fail the job for good."""
+        if job.attempts >= job.max_attempts:
+            obj_in = {"status": JobStatus.FAILED, "finished_at": datetime.utcnow(), "last_error": error}
+        else:
+            delay = min(base_delay * 2 ** (job.attempts - 1), max_delay) * random.uniform(0.5, 1.5)
+            obj_in = {
+                "status": JobStatus.PENDING,
+                "run_after": datetime.utcnow() + timedelta(seconds=delay),
+                "last_error": error,
+            }
+        return await self.update(db, db_obj=job, obj_in=obj_in)
+
+    async def requeue_stale(self, db: AsyncSession, *, stale_after: float) -> int:
+        """Return running jobs whose worker stopped sending heartbeats to the queue.
+
+        A job that has used all its attempts fails instead, so a file that keeps
+        killing its worker is not claimed forever. Returns the jobs requeued or failed.
+        """
+        now = datetime.utcnow()
+        stale = (
+            IngestionJob.status == JobStatus.RUNNING,
+            IngestionJob.heartbeat_at < now - timedelta(seconds=stale_after),
+        )
+        failed = await db.execute(
+            update(IngestionJob)
+            .where(*stale, IngestionJob.attempts >= IngestionJob.max_attempts)
+            .values(status=JobStatus.FAILED, finished_at=now, worker_id=None, last_error="worker lost")
+        )
+        requeued = await db.execute(
+            update(IngestionJob)
+            .where(*stale, IngestionJob.attempts < IngestionJob.max_attempts)
+            .values(status=JobStatus.PENDING, run_after=now, worker_id=None, last_error="worker lost")
+        )
+        await db.commit()
+        return failed.rowcount + requeued.rowcount
 
-question_bank = CRUDQuestionBank(QuestionBank)
-study_material = CRUDStudyMaterial(StudyMaterial)
+question_bank = CRUDQuestionBank(QuestionBank, cache=listing_cache)
+question = CRUDQuestion(Question)
+study_material = CRUDStudyMaterial(StudyMaterial, cache=listing_cache)
+ingestion_job = CRUDIngestionJob(IngestionJob)
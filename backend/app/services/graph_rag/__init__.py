@@ -8,26 +8,46 @@ pipelines, including knowledge graph extraction, storage, and querying.
 Exposed Classes:
     - GraphRAGExtractor: Extracts entities and relationships from text.
     - GraphRAGStore: Manages the graph storage and community detection.
+    - EntitySourceRecorder: Records every chunk that names a stored entity.
     - GraphRAGQueryEngine: Handles query processing over the graph.
+    - ExtractionCache: Caches extraction results by chunk content.
+    - EntityResolver: Canonicalizes entity names so duplicates merge.
+    - SQLGraphBackend: Database storage for the graph behind GraphRAGStore.
+    - SQLKVStore: Database key-value store for the docstore and index store.
+    - SQLVectorStore: Database vector store for the index's entity embeddings.
+    - QueryCache: Shared cache of final query answers.
+    - PartialAnswerCache: Shared memo of per-community answers.
 """
 __version__ = "0.1.0"
 
 from typing import TYPE_CHECKING
-from .templates import KG_TRIPLET_EXTRACT_TMPL
+from .templates import KG_TRIPLET_EXTRACT_BATCH_TMPL, KG_TRIPLET_EXTRACT_TMPL
 
 # Define __all__ explicitly so tools know what is available
-__all__ = ["GraphRAGExtractor", "GraphRAGQueryEngine", "GraphRAGStore", "KG_TRIPLET_EXTRACT_TMPL"]
+__all__ = ["EntityResolver", "EntitySourceRecorder", "ExtractionCache", "GraphRAGExtractor", "GraphRAGQueryEngine", "GraphRAGStore", "KG_TRIPLET_EXTRACT_BATCH_TMPL", "KG_TRIPLET_EXTRACT_TMPL", "PartialAnswerCache", "QueryCache", "SQLGraphBackend", "SQLKVStore", "SQLVectorStore", "create_storage_engine", "normalize_query"]
 
 if TYPE_CHECKING:
     # These imports are only for IDE autocompletion and type checkers
+    from .backend import SQLGraphBackend, SQLKVStore, SQLVectorStore, create_storage_engine
+    from .cache import ExtractionCache
     from .extractor import GraphRAGExtractor
+    from .query_cache import PartialAnswerCache, QueryCache, normalize_query
     from .query_engine import GraphRAGQueryEngine
-    from .store import GraphRAGStore
+    from .resolver import EntityResolver
+    from .store import EntitySourceRecorder, GraphRAGStore
 
 def __getattr__(name: str):
     """
     Lazy load modules only when they are accessed.
     """
+    if name in ("SQLGraphBackend", "SQLKVStore", "SQLVectorStore", "create_storage_engine"):
+        from . import backend
+        return getattr(backend, name)
+
+    if name == "ExtractionCache":
+        from .cache import ExtractionCache
+        return ExtractionCache
+
     if name == "GraphRAGExtractor":
         from .extractor import GraphRAGExtractor
         return GraphRAGExtractor
@@ -36,8 +56,16 @@ def __getattr__(name: str):
         from .query_engine import GraphRAGQueryEngine
         return GraphRAGQueryEngine
         
-    if name == "GraphRAGStore":
-        from .store import GraphRAGStore
-        return GraphRAGStore
+    if name in ("PartialAnswerCache", "QueryCache", "normalize_query"):
+        from . import query_cache
+        return getattr(query_cache, name)
+
+    if name == "EntityResolver":
+        from .resolver import EntityResolver
+        return EntityResolver
+
+    if name in ("EntitySourceRecorder", "GraphRAGStore"):
+        from . import store
+        return getattr(store, name)
         
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
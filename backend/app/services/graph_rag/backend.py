@@ -0,0 +1,839 @@
+import asyncio
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Engine,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    create_engine,
+    delete,
+    event,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+import numpy as np
+
+from llama_index.core.graph_stores.types import (
+    TRIPLET_SOURCE_KEY,
+    ChunkNode,
+    EntityNode,
+    LabelledNode,
+    Relation,
+    Triplet,
+)
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+metadata = MetaData()
+
+graph_nodes = Table(
+    "graph_nodes",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("kind", String, nullable=False),
+    Column("label", String, nullable=False),
+    Column("source_id", String, nullable=True),
+    Column("data", Text, nullable=False),
+    Index("ix_graph_nodes_kind", "kind"),
+    Index("ix_graph_nodes_source_id", "source_id"),
+)
+
+graph_relations = Table(
+    "graph_relations",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("label", String, nullable=False),
+    Column("source", String, nullable=False),
+    Column("target", String, nullable=False),
+    Column("description", Text, nullable=False, default=""),
+    Column("source_id", String, nullable=True),
+    Column("data", Text, nullable=False),
+    Index("ix_graph_relations_source", "source"),
+    Index("ix_graph_relations_target", "target"),
+    Index("ix_graph_relations_label", "label"),
+    Index("ix_graph_relations_source_id", "source_id"),
+)
+
+# Every chunk each entity and relation was extracted from. graph_nodes/graph_relations
+# keep only the first source; this table lets an item outlive the removal of one chunk
+graph_provenance = Table(
+    "graph_provenance",
+    metadata,
+    Column("source_id", String, primary_key=True),
+    Column("item_id", String, primary_key=True),
+    Column("kind", String, nullable=False),
+    Index("ix_graph_provenance_item_id", "item_id"),
+)
+
+graph_aliases = Table(
+    "graph_aliases",
+    metadata,
+    Column("alias", String, primary_key=True),
+    Column("canonical", String, nullable=False, index=True),
+)
+
+graph_entity_vectors = Table(
+    "graph_entity_vectors",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("block", String, nullable=False, index=True),
+    Column("vector", LargeBinary, nullable=False),
+)
+
+graph_meta = Table(
+    "graph_meta",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+query_cache = Table(
+    "query_cache",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("version", String, nullable=False, index=True),
+    Column("query", Text, nullable=False),
+    Column("answer", Text, nullable=False),
+    Column("vector", LargeBinary, nullable=True),
+    Column("created_at", Float, nullable=False),
+    Column("last_used", Float, nullable=False, index=True),
+)
+
+partial_answers = Table(
+    "partial_answers",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("answer", Text, nullable=False),
+    Column("relevant", Boolean, nullable=False),
+    Column("created_at", Float, nullable=False),
+    Column("last_used", Float, nullable=False, index=True),
+)
+
+# Embeddings of the index's vector store (entity nodes), stored without text
+node_vectors = Table(
+    "node_vectors",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("ref_doc_id", String, nullable=True, index=True),
+    Column("vector", LargeBinary, nullable=False),
+)
+
+kv_store = Table(
+    "kv_store",
+    metadata,
+    Column("collection", String, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("value", Text, nullable=False),
+)
+
+
+def create_storage_engine(url: str) -> Engine:
+    """Engine for the graph/doc store; SQLite files get WAL so readers never block the writer."""
+    engine = create_engine(url, future=True)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+    metadata.create_all(engine)
+    return engine
+
+
+def _insert(engine: Engine, table: Table):
+    """Dialect insert supporting ON CONFLICT (SQLite and Postgres share the API)."""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _batches(items: Sequence, size: int = BATCH_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _relation_key(source: str, label: str, target: str) -> str:
+    # Same key as LabelledPropertyGraph, so one triplet is one row
+    return f"{source}_{label}_{target}"
+
+
+def _load_node(kind: str, data: str) -> LabelledNode:
+    if kind == "chunk":
+        return ChunkNode.model_validate_json(data)
+    return EntityNode.model_validate_json(data)
+
+
+def _matches(properties: Dict, wanted: Optional[dict]) -> bool:
+    return not wanted or any(properties.get(k) == v for k, v in wanted.items())
+
+
+class SQLGraphBackend:
+    """Graph storage for GraphRAGStore in a SQL database (SQLite file or Postgres).
+
+    Nodes and relations are rows indexed by id, endpoint, label and source chunk,
+    so each ingest only writes its own rows in one transaction and lookups never
+    load the whole graph. Semantics follow SimplePropertyGraphStore: nodes are
+    replaced on upsert, a triplet keeps its first relation, and relation endpoints
+    missing from the store are created as bare entities.
+    """
+
+    def __init__(self, url: Optional[str] = None, engine: Optional[Engine] = None) -> None:
+        if engine is None:
+            if url is None:
+                raise ValueError("SQLGraphBackend needs a database url or engine")
+            engine = create_storage_engine(url)
+        self.engine = engine
+        self._backfill_provenance()
+
+    def _backfill_provenance(self) -> None:
+        """Record the stored source of items written before provenance was tracked (once)."""
+        with self.engine.begin() as conn:
+            done = conn.execute(
+                select(graph_meta.c.value).where(graph_meta.c.key == "provenance")
+            ).scalar()
+            if done:
+                return
+            for table, kind in ((graph_nodes, "entity"), (graph_relations, "relation")):
+                query = select(table.c.source_id, table.c.id).where(table.c.source_id.is_not(None))
+                if table is graph_nodes:
+                    query = query.where(graph_nodes.c.kind == "entity")
+                rows = [
+                    {"source_id": row.source_id, "item_id": row.id, "kind": kind}
+                    for row in conn.execute(query)
+                ]
+                self._record_provenance(conn, rows)
+            stmt = _insert(self.engine, graph_meta).values(key="provenance", value=1)
+            conn.execute(stmt.on_conflict_do_nothing(index_elements=["key"]))
+
+    def _record_provenance(self, conn, rows: List[dict]) -> None:
+        stmt = _insert(self.engine, graph_provenance).on_conflict_do_nothing(
+            index_elements=["source_id", "item_id"]
+        )
+        for batch in _batches(rows):
+            conn.execute(stmt, batch)
+
+    def _bump_revision(self, conn) -> None:
+        stmt = _insert(self.engine, graph_meta).values(key="revision", value=1)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["key"], set_={"value": graph_meta.c.value + 1}
+            )
+        )
+
+    def revision(self) -> int:
+        """Counter bumped by every write, from any process."""
+        with self.engine.connect() as conn:
+            value = conn.execute(
+                select(graph_meta.c.value).where(graph_meta.c.key == "revision")
+            ).scalar()
+        return value or 0
+
+    def is_empty(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(select(graph_nodes.c.id).limit(1)).first() is None
+
+    def upsert_nodes(
+        self, nodes: Sequence[LabelledNode], sources: Optional[Dict[str, set]] = None
+    ) -> None:
+        """Insert or replace nodes.
+
+        ``sources`` adds chunks an entity was also extracted from to its provenance,
+        beyond the one stored on the node (e.g. when a repeated entity was folded
+        into its stored node).
+        """
+        rows = {
+            node.id: {
+                "id": node.id,
+                "kind": "chunk" if isinstance(node, ChunkNode) else "entity",
+                "label": node.label,
+                "source_id": node.properties.get(TRIPLET_SOURCE_KEY),
+                "data": node.model_dump_json(),
+            }
+            for node in nodes
+        }
+        if not rows:
+            return
+        stmt = _insert(self.engine, graph_nodes)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={col: stmt.excluded[col] for col in ("kind", "label", "source_id", "data")},
+        )
+        provenance = [
+            {"source_id": row["source_id"], "item_id": row["id"], "kind": "entity"}
+            for row in rows.values()
+            if row["kind"] == "entity" and row["source_id"] is not None
+        ]
+        provenance.extend(
+            {"source_id": source_id, "item_id": item_id, "kind": "entity"}
+            for item_id, source_ids in (sources or {}).items()
+            for source_id in source_ids
+            if item_id in rows
+        )
+        with self.engine.begin() as conn:
+            for batch in _batches(list(rows.values())):
+                conn.execute(stmt, batch)
+            self._record_provenance(conn, provenance)
+            self._bump_revision(conn)
+
+    def add_entity_sources(self, sources: Dict[str, set]) -> None:
+        """Add chunks to the provenance of stored entities (``{entity id: chunk ids}``).
+
+        Ids that are not stored entities are skipped; they get their provenance
+        when they are upserted.
+        """
+        with self.engine.begin() as conn:
+            stored = set()
+            for batch in _batches(list(sources)):
+                stored.update(
+                    conn.execute(
+                        select(graph_nodes.c.id).where(
+                            graph_nodes.c.id.in_(batch), graph_nodes.c.kind == "entity"
+                        )
+                    ).scalars()
+                )
+            self._record_provenance(
+                conn,
+                [
+                    {"source_id": source_id, "item_id": item_id, "kind": "entity"}
+                    for item_id in stored
+                    for source_id in sources[item_id]
+                ],
+            )
+
+    def upsert_relations(self, relations: Sequence[Relation]) -> None:
+        if not relations:
+            return
+        endpoints = {rel.source_id for rel in relations} | {rel.target_id for rel in relations}
+        bare_nodes = [
+            {
+                "id": node_id,
+                "kind": "entity",
+                "label": "entity",
+                "source_id": None,
+                "data": EntityNode(name=node_id).model_dump_json(),
+            }
+            for node_id in endpoints
+        ]
+        rows, provenance = {}, {}
+        for rel in relations:
+            key = _relation_key(rel.source_id, rel.label, rel.target_id)
+            source = rel.properties.get(TRIPLET_SOURCE_KEY)
+            if source is not None:
+                # A repeated triplet keeps its first row but gains every chunk it came from
+                provenance[(source, key)] = {"source_id": source, "item_id": key, "kind": "relation"}
+            rows.setdefault(key, {
+                "id": key,
+                "label": rel.label,
+                "source": rel.source_id,
+                "target": rel.target_id,
+                "description": str(rel.properties.get("relationship_description", "")),
+                "source_id": source,
+                "data": rel.model_dump_json(),
+            })
+        with self.engine.begin() as conn:
+            node_stmt = _insert(self.engine, graph_nodes).on_conflict_do_nothing(index_elements=["id"])
+            for batch in _batches(bare_nodes):
+                conn.execute(node_stmt, batch)
+            rel_stmt = _insert(self.engine, graph_relations).on_conflict_do_nothing(index_elements=["id"])
+            for batch in _batches(list(rows.values())):
+                conn.execute(rel_stmt, batch)
+            self._record_provenance(conn, list(provenance.values()))
+            self._bump_revision(conn)
+
+    def _select_nodes(self, conn, ids: Iterable[str]) -> Dict[str, LabelledNode]:
+        found = {}
+        for batch in _batches(list(set(ids))):
+            for row in conn.execute(
+                select(graph_nodes.c.id, graph_nodes.c.kind, graph_nodes.c.data)
+                .where(graph_nodes.c.id.in_(batch))
+            ):
+                found[row.id] = _load_node(row.kind, row.data)
+        return found
+
+    def get(self, properties: Optional[dict] = None, ids: Optional[List[str]] = None) -> List[LabelledNode]:
+        """Nodes by id and/or property (any property matching, as in SimplePropertyGraphStore)."""
+        with self.engine.connect() as conn:
+            if ids:
+                nodes = list(self._select_nodes(conn, ids).values())
+            elif properties and set(properties) == {TRIPLET_SOURCE_KEY}:
+                rows = conn.execute(
+                    select(graph_nodes.c.kind, graph_nodes.c.data)
+                    .where(graph_nodes.c.source_id == properties[TRIPLET_SOURCE_KEY])
+                )
+                nodes = [_load_node(row.kind, row.data) for row in rows]
+            else:
+                rows = conn.execute(select(graph_nodes.c.kind, graph_nodes.c.data))
+                nodes = [_load_node(row.kind, row.data) for row in rows]
+        return [node for node in nodes if _matches(node.properties, properties)]
+
+    def get_triplets(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[Triplet]:
+        """Triplets matching every given filter; no filter returns nothing."""
+        if not ids and not properties and not entity_names and not relation_names:
+            return []
+
+        conditions = []
+        for names in (entity_names, ids):
+            if names:
+                names = list(set(names))
+                conditions.append(
+                    or_(graph_relations.c.source.in_(names), graph_relations.c.target.in_(names))
+                )
+        if relation_names:
+            conditions.append(graph_relations.c.label.in_(list(set(relation_names))))
+        if properties and set(properties) == {TRIPLET_SOURCE_KEY}:
+            conditions.append(graph_relations.c.source_id == properties[TRIPLET_SOURCE_KEY])
+
+        query = select(graph_relations.c.data)
+        if conditions:
+            query = query.where(and_(*conditions))
+        with self.engine.connect() as conn:
+            relations = [
+                Relation.model_validate_json(row.data) for row in conn.execute(query)
+            ]
+            nodes = self._select_nodes(
+                conn,
+                [rel.source_id for rel in relations] + [rel.target_id for rel in relations],
+            )
+
+        triplets = []
+        for rel in relations:
+            subj, obj = nodes.get(rel.source_id), nodes.get(rel.target_id)
+            if subj is None or obj is None:
+                continue
+            if properties and not (
+                _matches(subj.properties, properties)
+                or _matches(rel.properties, properties)
+                or _matches(obj.properties, properties)
+            ):
+                continue
+            triplets.append((subj, rel, obj))
+        return triplets
+
+    def delete(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        """Delete matching triplets and nodes, plus any relation left dangling by a deleted node.
+
+        Unlike SimplePropertyGraphStore, deleting a triplet keeps its endpoint entities,
+        which other triplets may still share.
+        """
+        relation_keys = [
+            _relation_key(rel.source_id, rel.label, rel.target_id)
+            for _, rel, _ in self.get_triplets(entity_names, relation_names, properties, ids)
+        ]
+        node_ids = (
+            [node.id for node in self.get(properties=properties, ids=ids)]
+            if properties or ids
+            else []
+        )
+        if not relation_keys and not node_ids:
+            return
+        with self.engine.begin() as conn:
+            for batch in _batches(relation_keys):
+                conn.execute(delete(graph_relations).where(graph_relations.c.id.in_(batch)))
+                conn.execute(delete(graph_provenance).where(graph_provenance.c.item_id.in_(batch)))
+            for batch in _batches(node_ids):
+                conn.execute(
+                    delete(graph_relations).where(
+                        or_(graph_relations.c.source.in_(batch), graph_relations.c.target.in_(batch))
+                    )
+                )
+                conn.execute(delete(graph_nodes).where(graph_nodes.c.id.in_(batch)))
+                conn.execute(
+                    delete(graph_provenance).where(
+                        or_(graph_provenance.c.item_id.in_(batch), graph_provenance.c.source_id.in_(batch))
+                    )
+                )
+            self._forget_entities(conn, node_ids)
+            self._bump_revision(conn)
+
+    def _forget_entities(self, conn, entity_ids: Iterable[str]) -> None:
+        """Drop the aliases and name vectors of deleted entities, so their names stop resolving."""
+        for batch in _batches(list(entity_ids)):
+            conn.execute(delete(graph_aliases).where(graph_aliases.c.canonical.in_(batch)))
+            conn.execute(delete(graph_entity_vectors).where(graph_entity_vectors.c.id.in_(batch)))
+
+    def _supported(self, conn, item_ids: Iterable[str]) -> Dict[str, str]:
+        """A remaining source chunk for each item that still has one."""
+        found = {}
+        for batch in _batches(list(item_ids)):
+            for row in conn.execute(
+                select(graph_provenance.c.item_id, func.min(graph_provenance.c.source_id))
+                .where(graph_provenance.c.item_id.in_(batch))
+                .group_by(graph_provenance.c.item_id)
+            ):
+                found[row[0]] = row[1]
+        return found
+
+    def _move_sources(self, conn, table: Table, sources: Dict[str, str], deleted: set) -> None:
+        """Point items whose stored source chunk was deleted at one of their remaining chunks."""
+        for batch in _batches(list(sources)):
+            rows = conn.execute(
+                select(table.c.id, table.c.source_id, table.c.data).where(table.c.id.in_(batch))
+            ).all()
+            for row in rows:
+                if row.source_id not in deleted:
+                    continue
+                data = json.loads(row.data)
+                data.setdefault("properties", {})[TRIPLET_SOURCE_KEY] = sources[row.id]
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == row.id)
+                    .values(source_id=sources[row.id], data=json.dumps(data))
+                )
+
+    def delete_sources(self, source_ids: Sequence[str]) -> Tuple[set, set]:
+        """Delete chunks, then everything that was extracted from them and nowhere else.
+
+        A relation goes once none of the chunks it was extracted from remains; an
+        entity goes once it has no relation left and no remaining chunk mentions it.
+        Surviving items whose stored source was deleted are pointed at a remaining
+        one. Removed entities' aliases and name vectors go with them. Returns (removed
+        entity ids, ids of remaining entities that lost a relation).
+        """
+        source_ids = set(source_ids)
+        if not source_ids:
+            return set(), set()
+        items = {"entity": set(), "relation": set()}
+        with self.engine.begin() as conn:
+            for batch in _batches(list(source_ids)):
+                for row in conn.execute(
+                    select(graph_provenance.c.item_id, graph_provenance.c.kind)
+                    .where(graph_provenance.c.source_id.in_(batch))
+                ):
+                    items[row.kind].add(row.item_id)
+                conn.execute(delete(graph_provenance).where(graph_provenance.c.source_id.in_(batch)))
+                conn.execute(
+                    delete(graph_nodes).where(graph_nodes.c.id.in_(batch), graph_nodes.c.kind == "chunk")
+                )
+
+            kept_relations = self._supported(conn, items["relation"])
+            dead = list(items["relation"] - set(kept_relations))
+            endpoints = set()
+            for batch in _batches(dead):
+                for row in conn.execute(
+                    select(graph_relations.c.source, graph_relations.c.target)
+                    .where(graph_relations.c.id.in_(batch))
+                ):
+                    endpoints.update((row.source, row.target))
+                conn.execute(delete(graph_relations).where(graph_relations.c.id.in_(batch)))
+            self._move_sources(conn, graph_relations, kept_relations, source_ids)
+
+            candidates = items["entity"] | endpoints
+            kept_entities = self._supported(conn, candidates)
+            # Chunk of a remaining relation, for entities kept only through one
+            connected = {}
+            for batch in _batches(list(candidates)):
+                for row in conn.execute(
+                    select(
+                        graph_relations.c.source, graph_relations.c.target, graph_relations.c.source_id
+                    ).where(
+                        or_(graph_relations.c.source.in_(batch), graph_relations.c.target.in_(batch))
+                    )
+                ):
+                    connected.setdefault(row.source, row.source_id)
+                    connected.setdefault(row.target, row.source_id)
+            removed = set()
+            for batch in _batches(list(candidates - set(connected) - set(kept_entities))):
+                removed.update(
+                    conn.execute(
+                        select(graph_nodes.c.id).where(
+                            graph_nodes.c.id.in_(batch), graph_nodes.c.kind == "entity"
+                        )
+                    ).scalars()
+                )
+                conn.execute(
+                    delete(graph_nodes).where(graph_nodes.c.id.in_(batch), graph_nodes.c.kind == "entity")
+                )
+            sources = {k: v for k, v in connected.items() if k in candidates and v is not None}
+            sources.update((k, v) for k, v in kept_entities.items() if k in candidates)
+            self._move_sources(conn, graph_nodes, sources, source_ids)
+            self._forget_entities(conn, removed)
+            self._bump_revision(conn)
+        return removed, endpoints - removed
+
+    def has_entities_without_aliases(self) -> bool:
+        """Whether entities exist but no alias was ever registered (a graph from before resolution)."""
+        with self.engine.connect() as conn:
+            if conn.execute(select(graph_aliases.c.alias).limit(1)).first() is not None:
+                return False
+            return conn.execute(
+                select(graph_nodes.c.id).where(graph_nodes.c.kind == "entity").limit(1)
+            ).first() is not None
+
+    def get_aliases(self, aliases: Iterable[str]) -> Dict[str, str]:
+        """Canonical entity id for each known alias key."""
+        found = {}
+        with self.engine.connect() as conn:
+            for batch in _batches(list(aliases)):
+                for row in conn.execute(
+                    select(graph_aliases.c.alias, graph_aliases.c.canonical)
+                    .where(graph_aliases.c.alias.in_(batch))
+                ):
+                    found[row.alias] = row.canonical
+        return found
+
+    def add_aliases(self, aliases: Dict[str, str]) -> None:
+        """Record alias keys; an alias another process registered first keeps its entity."""
+        rows = [{"alias": alias, "canonical": canonical} for alias, canonical in aliases.items()]
+        stmt = _insert(self.engine, graph_aliases).on_conflict_do_nothing(index_elements=["alias"])
+        with self.engine.begin() as conn:
+            for batch in _batches(rows):
+                conn.execute(stmt, batch)
+
+    def get_entity_vectors(self, blocks: Iterable[str]) -> Dict[str, tuple]:
+        """(block, vector) of every embedded entity in the given blocks."""
+        found = {}
+        with self.engine.connect() as conn:
+            for batch in _batches(list(blocks)):
+                for row in conn.execute(
+                    select(graph_entity_vectors).where(graph_entity_vectors.c.block.in_(batch))
+                ):
+                    found[row.id] = (row.block, np.frombuffer(row.vector, dtype=np.float32))
+        return found
+
+    def add_entity_vectors(self, vectors: Dict[str, tuple]) -> None:
+        rows = [
+            {"id": entity_id, "block": block, "vector": np.asarray(vector, dtype=np.float32).tobytes()}
+            for entity_id, (block, vector) in vectors.items()
+        ]
+        stmt = _insert(self.engine, graph_entity_vectors).on_conflict_do_nothing(index_elements=["id"])
+        with self.engine.begin() as conn:
+            for batch in _batches(rows):
+                conn.execute(stmt, batch)
+
+    def entity_ids(self) -> set:
+        with self.engine.connect() as conn:
+            return set(
+                conn.execute(select(graph_nodes.c.id).where(graph_nodes.c.kind == "entity")).scalars()
+            )
+
+    def iter_edges(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(source, target, label, description) for every relation, streamed without decoding rows."""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                select(
+                    graph_relations.c.id,
+                    graph_relations.c.source,
+                    graph_relations.c.target,
+                    graph_relations.c.label,
+                    graph_relations.c.description,
+                ).order_by(graph_relations.c.id)
+            )
+            for row in result:
+                yield row.source, row.target, row.label, row.description
+
+    def count(self) -> Tuple[int, int]:
+        """(nodes, relations) in the store."""
+        with self.engine.connect() as conn:
+            return (
+                conn.execute(select(func.count()).select_from(graph_nodes)).scalar(),
+                conn.execute(select(func.count()).select_from(graph_relations)).scalar(),
+            )
+
+
+class SQLKVStore(BaseKVStore):
+    """Key-value store on the same database, for a KVDocumentStore / KVIndexStore.
+
+    Writes go straight to the database, so persisting the storage context no
+    longer rewrites the docstore.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put_all([(key, val)], collection=collection)
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        await asyncio.to_thread(self.put, key, val, collection)
+
+    def put_all(
+        self,
+        kv_pairs: List[Tuple[str, dict]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        if not kv_pairs:
+            return
+        rows = {
+            key: {"collection": collection, "key": key, "value": json.dumps(val)}
+            for key, val in kv_pairs
+        }
+        stmt = _insert(self.engine, kv_store)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["collection", "key"], set_={"value": stmt.excluded.value}
+        )
+        with self.engine.begin() as conn:
+            for batch in _batches(list(rows.values()), batch_size):
+                conn.execute(stmt, batch)
+
+    async def aput_all(
+        self,
+        kv_pairs: List[Tuple[str, dict]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        await asyncio.to_thread(self.put_all, kv_pairs, collection, batch_size)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        with self.engine.connect() as conn:
+            value = conn.execute(
+                select(kv_store.c.value).where(
+                    kv_store.c.collection == collection, kv_store.c.key == key
+                )
+            ).scalar()
+        return None if value is None else json.loads(value)
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(kv_store.c.key, kv_store.c.value).where(kv_store.c.collection == collection)
+            )
+            return {row.key: json.loads(row.value) for row in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return await asyncio.to_thread(self.get_all, collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                delete(kv_store).where(kv_store.c.collection == collection, kv_store.c.key == key)
+            )
+        return result.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return await asyncio.to_thread(self.delete, key, collection)
+
+    def is_empty(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(select(kv_store.c.key).limit(1)).first() is None
+
+
+class SQLVectorStore(BasePydanticVectorStore):
+    """Vector store on the same database, in place of the index's JSON SimpleVectorStore.
+
+    Rows are written as nodes are added, so persisting the storage context no
+    longer rewrites every embedding and a reload reads none of them. Queries are
+    a brute-force cosine scan, as in SimpleVectorStore; metadata filters are not
+    supported.
+    """
+
+    stores_text: bool = False
+    _engine: Engine = PrivateAttr()
+
+    def __init__(self, engine: Engine, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._engine = engine
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SQLVectorStore"
+
+    @property
+    def client(self) -> Engine:
+        return self._engine
+
+    def add_embeddings(self, embeddings: Dict[str, Sequence[float]], ref_doc_ids: Dict[str, str]) -> None:
+        """Insert or replace ``{id: embedding}`` rows."""
+        rows = [
+            {
+                "id": node_id,
+                "ref_doc_id": ref_doc_ids.get(node_id),
+                "vector": np.asarray(embedding, dtype=np.float32).tobytes(),
+            }
+            for node_id, embedding in embeddings.items()
+        ]
+        if not rows:
+            return
+        stmt = _insert(self._engine, node_vectors)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"], set_={col: stmt.excluded[col] for col in ("ref_doc_id", "vector")}
+        )
+        with self._engine.begin() as conn:
+            for batch in _batches(rows):
+                conn.execute(stmt, batch)
+
+    def add(self, nodes: Sequence[BaseNode], **kwargs) -> List[str]:
+        self.add_embeddings(
+            {node.node_id: node.get_embedding() for node in nodes},
+            {node.node_id: node.ref_doc_id for node in nodes if node.ref_doc_id is not None},
+        )
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(delete(node_vectors).where(node_vectors.c.ref_doc_id == ref_doc_id))
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs) -> None:
+        if filters is not None:
+            raise NotImplementedError("Metadata filters are not supported")
+        with self._engine.begin() as conn:
+            for batch in _batches(list(node_ids or [])):
+                conn.execute(delete(node_vectors).where(node_vectors.c.id.in_(batch)))
+
+    def clear(self) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(delete(node_vectors))
+
+    def query(self, query: VectorStoreQuery, **kwargs) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("Metadata filters are not supported")
+        statement = select(node_vectors.c.id, node_vectors.c.vector)
+        ids, vectors = [], []
+        batches = _batches(list(query.node_ids)) if query.node_ids else [None]
+        with self._engine.connect() as conn:
+            for batch in batches:
+                rows = conn.execute(
+                    statement if batch is None else statement.where(node_vectors.c.id.in_(batch))
+                )
+                for row in rows:
+                    ids.append(row.id)
+                    vectors.append(np.frombuffer(row.vector, dtype=np.float32))
+        if not ids or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+        matrix = np.stack(vectors)
+        vector = np.asarray(query.query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+        scores = (matrix @ vector) / np.where(norms == 0, 1, norms)
+        top = np.argsort(-scores)[: query.similarity_top_k]
+        return VectorStoreQueryResult(
+            nodes=None, similarities=[float(scores[i]) for i in top], ids=[ids[i] for i in top]
+        )
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple, Union
+
+
+class ExtractionCache:
+    """On-disk cache of parsed extraction results, keyed by content.
+
+    Entries live in a single SQLite file so several ingestion workers can share
+    it. When the stored size exceeds ``max_bytes``, least recently used entries
+    are evicted until it is back under 90% of the limit.
+
+    Args:
+        path (Union[str, Path]):
+            The SQLite file to store entries in.
+        max_bytes (int):
+            The maximum total size of stored values.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_extraction_last_used ON extraction (last_used)")
+        self._conn.commit()
+        # Running estimate of the stored size; the exact total is only summed when it
+        # looks like the limit was crossed
+        self._size = self._total_size()
+
+    def _total_size(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction").fetchone()
+        return total
+
+    @staticmethod
+    def make_key(text: str, prompt: str, model_name: str, max_paths_per_chunk: int) -> str:
+        """Hash everything that determines an extraction result."""
+        digest = hashlib.sha256()
+        for part in (text, prompt, model_name, str(max_paths_per_chunk)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[list, list]]:
+        """Return cached ``(entities, relationships)`` for ``key``, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM extraction WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE extraction SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        entities, relationships = json.loads(row[0])
+        return [tuple(e) for e in entities], [tuple(r) for r in relationships]
+
+    def set(self, key: str, value: Tuple[Any, Any]) -> None:
+        """Store ``(entities, relationships)`` for ``key``, evicting old entries if needed."""
+        data = json.dumps([list(value[0]), list(value[1])])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._size = self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> int:
+        """Drop least recently used entries if over the limit. Returns the remaining size."""
+        total = self._total_size()
+        if total <= self.max_bytes:
+            return total
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM extraction ORDER BY last_used")
+        evict = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM extraction WHERE key = ?", evict)
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process, plus the size of the shared cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
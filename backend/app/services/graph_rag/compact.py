@@ -0,0 +1,206 @@
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
+
+
+class CompactGraph:
+    """Undirected entity graph with interned integer node ids, for community detection.
+
+    Relations are appended to NumPy id arrays (source, target, label) with their
+    descriptions in a side table, so the graph can be kept up to date as relations
+    are upserted instead of being rebuilt. A relation is identified by
+    (source, label, target) and, as in the graph stores, the first one added wins.
+    Adjacency is exposed in CSR form.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        # Over-allocated like a list; the first _count entries are in use
+        self._src = np.zeros(0, dtype=np.int32)
+        self._dst = np.zeros(0, dtype=np.int32)
+        self._lab = np.zeros(0, dtype=np.int32)
+        self._count = 0
+        self.descriptions: List[str] = []
+        self._deduplicated = True
+        self._csr: Optional[csr_array] = None
+
+    def _intern(self, node_id: str) -> int:
+        index = self.index.get(node_id)
+        if index is None:
+            index = self.index[node_id] = len(self.ids)
+            self.ids.append(node_id)
+            self._csr = None
+        return index
+
+    def add_nodes(self, node_ids: Iterable[str]) -> None:
+        for node_id in node_ids:
+            self._intern(node_id)
+
+    def add_edges(self, edges: Iterable[Tuple[str, str, str, str]]) -> None:
+        """Add (source, target, relationship, description) relations."""
+        src, dst, lab = [], [], []
+        for source, target, relationship, description in edges:
+            src.append(self._intern(source))
+            dst.append(self._intern(target))
+            label = self._label_index.get(relationship)
+            if label is None:
+                label = self._label_index[relationship] = len(self._labels)
+                self._labels.append(relationship)
+            lab.append(label)
+            self.descriptions.append(description)
+        if not src:
+            return
+        start, end = self._count, self._count + len(src)
+        if end > len(self._src):
+            capacity = max(end, 2 * len(self._src), 1024)
+            for name in ("_src", "_dst", "_lab"):
+                grown = np.empty(capacity, dtype=np.int32)
+                grown[:start] = getattr(self, name)[:start]
+                setattr(self, name, grown)
+        self._src[start:end] = src
+        self._dst[start:end] = dst
+        self._lab[start:end] = lab
+        self._count = end
+        self._deduplicated = False
+        self._csr = None
+
+    def _edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(source, target, label) id arrays of the distinct relations."""
+        self._deduplicate()
+        n = self._count
+        return self._src[:n], self._dst[:n], self._lab[:n]
+
+    def _deduplicate(self) -> None:
+        """Drop repeated (source, label, target) relations, keeping the first of each."""
+        if self._deduplicated:
+            return
+        n = self._count
+        _, first = np.unique(
+            self._pack(self._src[:n], self._lab[:n], self._dst[:n], len(self._labels)),
+            return_index=True,
+        )
+        if len(first) < n:
+            first.sort()
+            count = len(first)
+            for name in ("_src", "_dst", "_lab"):
+                array = getattr(self, name)
+                array[:count] = array[first]
+            self.descriptions = [self.descriptions[i] for i in first]
+            self._count = count
+        self._deduplicated = True
+
+    def _pack(self, high: np.ndarray, middle: np.ndarray, low: np.ndarray, middle_size: int) -> np.ndarray:
+        """One sortable key per row of ids: a 1-D unique is far faster than a row-wise one."""
+        nodes = max(len(self.ids), 1)
+        if nodes * max(middle_size, 1) * nodes < 2 ** 63:
+            return (high.astype(np.int64) * middle_size + middle) * nodes + low
+        rows = np.stack([high, middle, low], axis=1)
+        return np.unique(rows, axis=0, return_inverse=True)[1].ravel()
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def number_of_edges(self) -> int:
+        self._deduplicate()
+        return self._count
+
+    def csr(self) -> csr_array:
+        """Symmetric adjacency matrix; entry (i, j) counts the relations between i and j."""
+        src, dst, _ = self._edges()
+        if self._csr is None:
+            n = len(self.ids)
+            self._csr = csr_array(
+                (
+                    np.ones(2 * len(src), dtype=np.float64),
+                    (np.concatenate([src, dst]), np.concatenate([dst, src])),
+                ),
+                shape=(n, n),
+            )
+        return self._csr
+
+    def components_containing(self, node_ids: Iterable[str]) -> set:
+        """Ids of every node connected to any of ``node_ids``."""
+        seeds = [self.index[node_id] for node_id in node_ids if node_id in self.index]
+        if not seeds:
+            return set()
+        _, labels = connected_components(self.csr(), directed=False)
+        wanted = np.isin(labels, labels[seeds])
+        return {self.ids[i] for i in np.flatnonzero(wanted)}
+
+    def subgraph(self, node_ids: Iterable[str]) -> "CompactGraph":
+        """The induced subgraph on ``node_ids``."""
+        src, dst, lab = self._edges()
+        keep = sorted(self.index[node_id] for node_id in node_ids if node_id in self.index)
+        sub = CompactGraph()
+        sub.add_nodes(self.ids[i] for i in keep)
+        inside = np.zeros(len(self.ids), dtype=bool)
+        inside[keep] = True
+        edges = np.flatnonzero(inside[src] & inside[dst])
+        sub.add_edges(
+            (self.ids[src[e]], self.ids[dst[e]], self._labels[lab[e]], self.descriptions[e])
+            for e in edges
+        )
+        return sub
+
+    def leiden_edges(self) -> List[Tuple[str, str, float]]:
+        """Unique undirected node pairs as a weighted edge list for graspologic's Leiden.
+
+        graspologic turns any input into such a list; building it from the arrays
+        skips the per-entry walk it does over a CSR matrix. Nodes are given by id
+        (graspologic wants string keys for starting communities).
+        """
+        src, dst, _ = self._edges()
+        low, high = np.minimum(src, dst), np.maximum(src, dst)
+        _, first = np.unique(self._pack(low, np.zeros_like(low), high, 1), return_index=True)
+        first.sort()
+        ids = self.ids
+        return [
+            (ids[a], ids[b], weight)
+            for a, b, weight in zip(low[first].tolist(), high[first].tolist(), repeat(1.0))
+        ]
+
+    def has_edges(self) -> np.ndarray:
+        """Boolean mask of nodes with at least one relation."""
+        src, dst, _ = self._edges()
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[src] = True
+        mask[dst] = True
+        return mask
+
+    def community_details(self, clusters) -> Dict[int, List[str]]:
+        """Relations inside each community, per level, as "a -> b -> relation -> description".
+
+        Every relation is listed from both ends, as walking each member's neighbors would.
+        """
+        src, dst, lab = self._edges()
+        details: Dict[int, List[str]] = {}
+        by_level: Dict[int, Tuple[List[int], List[int]]] = {}
+        for item in clusters:
+            details.setdefault(item.cluster, [])
+            nodes, communities = by_level.setdefault(item.level, ([], []))
+            nodes.append(self.index[item.node])
+            communities.append(item.cluster)
+
+        for nodes, communities in by_level.values():
+            membership = np.full(len(self.ids), -1, dtype=np.int64)
+            membership[nodes] = communities
+            source_community = membership[src]
+            inside = np.flatnonzero((source_community >= 0) & (source_community == membership[dst]))
+            for e in inside:
+                source, target = self.ids[src[e]], self.ids[dst[e]]
+                relation = f"{self._labels[lab[e]]} -> {self.descriptions[e]}"
+                community = details[int(source_community[e])]
+                community.append(f"{source} -> {target} -> {relation}")
+                if source != target:
+                    community.append(f"{target} -> {source} -> {relation}")
+
+        # The same pair can be related in both directions; list each line once
+        return {cluster: list(dict.fromkeys(lines)) for cluster, lines in details.items()}
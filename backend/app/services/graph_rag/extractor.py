@@ -10,13 +10,16 @@ Settings.llm = llm
 Settings.embed_model = embed_model
 
 import asyncio
+import json
+import re
 import nest_asyncio
 
 nest_asyncio.apply()
 
-from typing import Any, List, Callable, Optional, Union, Dict
+from typing import Any, List, Callable, Optional, Union, Dict, Tuple
 
 from llama_index.core.async_utils import run_jobs
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.core.indices.property_graph.utils import (
     default_parse_triplets_fn,
 )
@@ -33,11 +36,20 @@ from llama_index.core.prompts.default_prompts import (
 )
 from llama_index.core.schema import TransformComponent, BaseNode
 
+from .cache import ExtractionCache
+from .scheduler import AdaptiveLimiter, call_with_retries
+
 class GraphRAGExtractor(TransformComponent):
     """Extract triples from a graph.
 
     Uses an LLM and a simple prompt + output parsing to extract paths (i.e. triples) and entity, relation descriptions from text.
 
+    LLM calls go through an adaptive scheduler: concurrency starts at num_workers and
+    follows observed latency and rate-limit responses up to max_workers, failed calls
+    are retried with jittered backoff, and with extract_batch_prompt set, small chunks
+    are packed several to a prompt. Each chunk's result is written to the cache as soon
+    as it arrives, so an interrupted ingest resumes from the chunks it had not reached.
+
     Args:
         llm (LLM):
             The language model to use.
@@ -46,9 +58,24 @@ class GraphRAGExtractor(TransformComponent):
         parse_fn (callable):
             A function to parse the output of the language model.
         num_workers (int):
-            The number of workers to use for parallel processing.
+            The initial number of concurrent LLM calls.
         max_paths_per_chunk (int):
             The maximum number of paths to extract per chunk.
+        cache (Optional[ExtractionCache]):
+            Cache of parsed results; chunks seen before skip the LLM call.
+        extract_batch_prompt (Optional[Union[str, PromptTemplate]]):
+            Prompt for several numbered chunks at once; each chunk object of its
+            output is handed to parse_fn. None disables packing.
+        batch_max_chars (int):
+            Text budget of a packed prompt; chunks over half of it go alone.
+        batch_max_chunks (int):
+            The maximum number of chunks per packed prompt.
+        max_workers (int):
+            Upper bound for the adaptive concurrency.
+        max_retries (int):
+            Retries for rate-limited, timed out or otherwise transient LLM calls.
+        target_latency (float):
+            Call latency (seconds) above which concurrency is reduced.
     """
 
     llm: LLM
@@ -56,6 +83,14 @@ class GraphRAGExtractor(TransformComponent):
     parse_fn: Callable
     num_workers: int
     max_paths_per_chunk: int
+    cache: Optional[ExtractionCache] = None
+    extract_batch_prompt: Optional[PromptTemplate] = None
+    batch_max_chars: int = 4000
+    batch_max_chunks: int = 4
+    max_workers: int = 16
+    max_retries: int = 5
+    target_latency: float = 30.0
+    _prepared: Dict[str, Tuple[list, list]] = PrivateAttr(default_factory=dict)
 
     def __init__(
         self,
@@ -64,12 +99,21 @@ class GraphRAGExtractor(TransformComponent):
         parse_fn: Callable = default_parse_triplets_fn,
         max_paths_per_chunk: int = 10,
         num_workers: int = 4,
+        cache: Optional[ExtractionCache] = None,
+        extract_batch_prompt: Optional[Union[str, PromptTemplate]] = None,
+        batch_max_chars: int = 4000,
+        batch_max_chunks: int = 4,
+        max_workers: int = 16,
+        max_retries: int = 5,
+        target_latency: float = 30.0,
     ) -> None:
         """Init params."""
         from llama_index.core import Settings
 
         if isinstance(extract_prompt, str):
             extract_prompt = PromptTemplate(extract_prompt)
+        if isinstance(extract_batch_prompt, str):
+            extract_batch_prompt = PromptTemplate(extract_batch_prompt)
 
         super().__init__(
             llm=llm or Settings.llm,
@@ -77,12 +121,37 @@ class GraphRAGExtractor(TransformComponent):
             parse_fn=parse_fn,
             num_workers=num_workers,
             max_paths_per_chunk=max_paths_per_chunk,
+            cache=cache,
+            extract_batch_prompt=extract_batch_prompt,
+            batch_max_chars=batch_max_chars,
+            batch_max_chunks=batch_max_chunks,
+            max_workers=max(max_workers, num_workers),
+            max_retries=max_retries,
+            target_latency=target_latency,
         )
 
     @classmethod
     def class_name(cls) -> str:
         return "GraphExtractor"
 
+    def prepare(
+        self,
+        nodes: List[BaseNode],
+        show_progress: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Extract triples ahead of insertion.
+
+        Results are held here rather than in node metadata (which the docstore would
+        persist) and attached when the nodes next pass through this extractor.
+        ``progress`` is called with (chunks extracted, chunks) as extraction advances.
+        """
+        for node in self(nodes, show_progress=show_progress, progress=progress):
+            self._prepared[node.node_id] = (
+                node.metadata.pop(KG_NODES_KEY, []),
+                node.metadata.pop(KG_RELATIONS_KEY, []),
+            )
+
     def __call__(
         self, nodes: List[BaseNode], show_progress: bool = False, **kwargs: Any
     ) -> List[BaseNode]:
@@ -91,65 +160,255 @@ class GraphRAGExtractor(TransformComponent):
             self.acall(nodes, show_progress=show_progress, **kwargs)
         )
 
-    async def _aextract(self, node: BaseNode) -> BaseNode:
-        """Extract triples from a node."""
-        assert hasattr(node, "text")
+    def _new_limiter(self) -> AdaptiveLimiter:
+        return AdaptiveLimiter(
+            initial=self.num_workers,
+            maximum=self.max_workers,
+            target_latency=self.target_latency,
+        )
 
-        text = node.get_content(metadata_mode="llm")
-        try:
-            llm_response = await self.llm.apredict(
-                self.extract_prompt,
-                text=text,
-                max_knowledge_triplets=self.max_paths_per_chunk,
-            )
-            entities, entities_relationship = self.parse_fn(llm_response)
-        except ValueError:
-            entities = []
-            entities_relationship = []
+    def _cache_key(self, node: BaseNode) -> Optional[str]:
+        if self.cache is None:
+            return None
+        # Keyed on the chunk body, not its metadata, so identical content shared
+        # between files is only extracted once. Packed prompts store under the same
+        # key, so a chunk is found again however it was batched.
+        return ExtractionCache.make_key(
+            node.get_content(metadata_mode="none"),
+            self.extract_prompt.get_template(),
+            self.llm.metadata.model_name,
+            self.max_paths_per_chunk,
+        )
+
+    def _resolve(self, node: BaseNode) -> bool:
+        """Attach triples that need no LLM call (prepared or cached). Returns True if found."""
+        # Already extracted ahead of insertion (see prepare)
+        prepared = self._prepared.pop(node.node_id, None)
+        if prepared is not None:
+            node.metadata[KG_NODES_KEY], node.metadata[KG_RELATIONS_KEY] = prepared
+            return True
+
+        cache_key = self._cache_key(node)
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        if cached is None:
+            return False
+        self._attach(node, *cached)
+        return True
+
+    def _checkpoint(self, node: BaseNode, entities: list, entities_relationship: list) -> None:
+        # Empty results are usually unparseable responses; leave them uncached to retry
+        cache_key = self._cache_key(node)
+        if cache_key is not None and (entities or entities_relationship):
+            self.cache.set(cache_key, (entities, entities_relationship))
+
+    async def _apredict(self, limiter: AdaptiveLimiter, prompt: PromptTemplate, **prompt_args: Any) -> Any:
+        """Run one LLM call under the limiter, retrying transient failures with jittered backoff."""
+        return await call_with_retries(
+            limiter,
+            lambda: self.llm.apredict(prompt, **prompt_args),
+            max_retries=self.max_retries,
+        )
+
+    def _attach(self, node: BaseNode, entities: list, entities_relationship: list) -> BaseNode:
+        """Turn parsed triples into graph nodes and relations in the node's metadata.
 
+        Each entity appears once per chunk, and nodes and relations carry only their
+        own description: the chunk's metadata stays on the chunk, which the index links
+        to every node and relation through its triplet source id.
+        """
         existing_nodes = node.metadata.pop(KG_NODES_KEY, [])
         existing_relations = node.metadata.pop(KG_RELATIONS_KEY, [])
-        metadata = node.metadata.copy()
+        entity_nodes: Dict[str, EntityNode] = {}
         for entity, entity_type, description in entities:
-            metadata[
-                "entity_description"
-            ] = description  # Not used in the current implementation. But will be useful in future work.
-            entity_node = EntityNode(
-                name=entity, label=entity_type, properties=metadata
-            )
-            existing_nodes.append(entity_node)
+            if entity not in entity_nodes:
+                entity_nodes[entity] = EntityNode(
+                    name=entity,
+                    label=entity_type,
+                    # Not used in the current implementation. But will be useful in future work.
+                    properties={"entity_description": description},
+                )
 
-        metadata = node.metadata.copy()
         for triple in entities_relationship:
             subj, obj, rel, description = triple
-            subj_node = EntityNode(name=subj, properties=metadata)
-            obj_node = EntityNode(name=obj, properties=metadata)
-            metadata["relationship_description"] = description
+            for name in (subj, obj):
+                if name not in entity_nodes:
+                    entity_nodes[name] = EntityNode(name=name)
             rel_node = Relation(
                 label=rel,
-                source_id=subj_node.id,
-                target_id=obj_node.id,
-                properties=metadata,
+                source_id=entity_nodes[subj].id,
+                target_id=entity_nodes[obj].id,
+                properties={"relationship_description": description},
             )
-
-            existing_nodes.extend([subj_node, obj_node])
             existing_relations.append(rel_node)
 
+        existing_nodes.extend(entity_nodes.values())
         node.metadata[KG_NODES_KEY] = existing_nodes
         node.metadata[KG_RELATIONS_KEY] = existing_relations
         return node
 
+    async def _aextract_llm(self, node: BaseNode, limiter: AdaptiveLimiter) -> BaseNode:
+        """Extract triples from a node with its own LLM call."""
+        assert hasattr(node, "text")
+
+        text = node.get_content(metadata_mode="llm")
+        try:
+            llm_response = await self._apredict(
+                limiter,
+                self.extract_prompt,
+                text=text,
+                max_knowledge_triplets=self.max_paths_per_chunk,
+            )
+            entities, entities_relationship = self.parse_fn(llm_response)
+            self._checkpoint(node, entities, entities_relationship)
+        except ValueError:
+            entities = []
+            entities_relationship = []
+        return self._attach(node, entities, entities_relationship)
+
+    async def _aextract(self, node: BaseNode, limiter: Optional[AdaptiveLimiter] = None) -> BaseNode:
+        """Extract triples from a node."""
+        if self._resolve(node):
+            return node
+        return await self._aextract_llm(node, limiter or self._new_limiter())
+
+    def _pack(self, nodes: List[BaseNode]) -> List[List[BaseNode]]:
+        """Group nodes into prompts: small chunks share one up to the size budget, large ones go alone."""
+        if self.extract_batch_prompt is None or self.batch_max_chunks <= 1:
+            return [[node] for node in nodes]
+
+        batches: List[List[BaseNode]] = []
+        current: List[BaseNode] = []
+        size = 0
+        for node in nodes:
+            length = len(node.get_content(metadata_mode="llm"))
+            if length > self.batch_max_chars // 2:
+                batches.append([node])
+                continue
+            if current and (size + length > self.batch_max_chars or len(current) >= self.batch_max_chunks):
+                batches.append(current)
+                current, size = [], 0
+            current.append(node)
+            size += length
+        if current:
+            batches.append(current)
+        return batches
+
+    def _parse_batch(self, response: str, count: int) -> List[Optional[Tuple[list, list]]]:
+        """Split a packed response into per-chunk results; None where a chunk is missing or unparseable."""
+        results: List[Optional[Tuple[list, list]]] = [None] * count
+        match = re.search(r"\{.*\}", response, re.DOTALL)
+        if not match:
+            return results
+        try:
+            chunks = json.loads(match.group(0)).get("chunks", [])
+        except (json.JSONDecodeError, AttributeError):
+            return results
+
+        for position, item in enumerate(chunks):
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get("chunk", position + 1)) - 1
+                if 0 <= index < count and results[index] is None:
+                    results[index] = self.parse_fn(json.dumps(item))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return results
+
+    async def _aextract_batch(self, batch: List[BaseNode], limiter: AdaptiveLimiter) -> List[BaseNode]:
+        """Extract triples for a group of nodes with one LLM call."""
+        if len(batch) == 1:
+            return [await self._aextract_llm(batch[0], limiter)]
+
+        text = "\n\n".join(
+            f"-- Chunk {i} --\n{node.get_content(metadata_mode='llm')}"
+            for i, node in enumerate(batch, 1)
+        )
+        try:
+            llm_response = await self._apredict(
+                limiter,
+                self.extract_batch_prompt,
+                text=text,
+                max_knowledge_triplets=self.max_paths_per_chunk,
+            )
+            results = self._parse_batch(llm_response, len(batch))
+        except ValueError:
+            results = [None] * len(batch)
+
+        extracted = []
+        for node, result in zip(batch, results):
+            if result is None:
+                # The model dropped or garbled this chunk; extract it on its own
+                extracted.append(await self._aextract_llm(node, limiter))
+                continue
+            self._checkpoint(node, *result)
+            extracted.append(self._attach(node, *result))
+        return extracted
+
     async def acall(
-        self, nodes: List[BaseNode], show_progress: bool = False, **kwargs: Any
+        self,
+        nodes: List[BaseNode],
+        show_progress: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        **kwargs: Any,
     ) -> List[BaseNode]:
-        """Extract triples from nodes async."""
-        jobs = []
-        for node in nodes:
-            jobs.append(self._aextract(node))
+        """Extract triples from nodes async.
 
-        return await run_jobs(
-            jobs,
-            workers=self.num_workers,
+        ``progress`` is called with (chunks extracted, chunks) after the cache lookup
+        and as each LLM prompt completes; errors it raises are ignored.
+        """
+        def report(done: int) -> None:
+            if progress is None:
+                return
+            try:
+                progress(done, len(nodes))
+            except Exception as e:
+                print(f"Error reporting extraction progress: {e}")
+
+        if self.cache is not None:
+            hits, misses = self.cache.hits, self.cache.misses
+        pending = [node for node in nodes if not self._resolve(node)]
+        if self.cache is not None and (self.cache.hits, self.cache.misses) != (hits, misses):
+            print(
+                f"Extraction cache: {self.cache.hits - hits} hits, "
+                f"{self.cache.misses - misses} misses for {len(nodes)} nodes"
+            )
+        done = len(nodes) - len(pending)
+        report(done)
+        if not pending:
+            return nodes
+
+        limiter = self._new_limiter()
+        batches = self._pack(pending)
+        failures: List[Tuple[List[BaseNode], Exception]] = []
+
+        async def run_batch(batch: List[BaseNode]) -> None:
+            nonlocal done
+            try:
+                await self._aextract_batch(batch, limiter)
+            except Exception as e:
+                # Keep going: finished chunks are checkpointed, only these need a rerun
+                failures.append((batch, e))
+                return
+            done += len(batch)
+            report(done)
+
+        # The limiter bounds the LLM calls, so every batch can be scheduled at once
+        await run_jobs(
+            [run_batch(batch) for batch in batches],
+            workers=len(batches),
             show_progress=show_progress,
             desc="Extracting paths from text",
-        )
\ No newline at end of file
+        )
+        print(
+            f"Extracted {len(pending)} chunks in {len(batches)} LLM prompts "
+            f"(concurrency {limiter.limit}, {limiter.rate_limited} rate limited)"
+        )
+
+        if failures:
+            failed = sum(len(batch) for batch, _ in failures)
+            resume = " (completed chunks are cached and skipped on retry)" if self.cache is not None else ""
+            raise RuntimeError(
+                f"Extraction failed for {failed} of {len(pending)} chunks{resume}: {failures[0][1]!r}"
+            ) from failures[0][1]
+        return nodes
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Engine, Table, delete, func, select, update
+
+from .backend import _batches, _insert, partial_answers, query_cache
+
+
+def normalize_query(query: str) -> str:
+    """Form under which rephrasings that differ only in case, spacing or end punctuation collide."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = " ".join(text.split())
+    return re.sub(r"[\s?!.]+$", "", text)
+
+
+def _evict(conn, table: Table, now: float, ttl: float, max_entries: int) -> None:
+    """Drop expired rows, then the least recently used ones past max_entries."""
+    conn.execute(delete(table).where(table.c.created_at <= now - ttl))
+    excess = conn.execute(select(func.count()).select_from(table)).scalar() - max_entries
+    if excess > 0:
+        # Evict a tenth extra so eviction does not run again on the next insert
+        evict = conn.execute(
+            select(table.c.key).order_by(table.c.last_used).limit(excess + max_entries // 10)
+        ).scalars().all()
+        for batch in _batches(evict):
+            conn.execute(delete(table).where(table.c.key.in_(batch)))
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QueryCache:
+    """Final answers of past queries, in the graph database so every worker shares them.
+
+    An entry is found by its normalized query text or, with a
+    ``similarity_threshold``, by the cosine similarity of its query embedding.
+    Entries are tied to a ``version`` (the graph revision and the community
+    summaries it was answered from), so a changed graph never serves an old
+    answer. Entries expire after ``ttl`` seconds, and past ``max_entries`` the
+    least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        embed_model=None,
+        similarity_threshold: Optional[float] = None,
+        ttl: float = 24 * 3600,
+        max_entries: int = 10000,
+    ) -> None:
+        self.engine = engine
+        self.embed_model = embed_model
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Query vectors of the current version, loaded incrementally from the table
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _key(query: str, version: str) -> str:
+        return hashlib.sha256(f"{version}\0{normalize_query(query)}".encode()).hexdigest()
+
+    @property
+    def _embed_model(self):
+        from llama_index.core import Settings
+
+        return self.embed_model or Settings.embed_model
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.similarity_threshold is not None
+
+    def _get(self, key: str) -> Optional[str]:
+        """Answer stored under ``key`` if it has not expired; marks it as used."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            answer = conn.execute(
+                select(query_cache.c.answer).where(
+                    query_cache.c.key == key, query_cache.c.created_at > now - self.ttl
+                )
+            ).scalar()
+            if answer is not None:
+                conn.execute(update(query_cache).where(query_cache.c.key == key).values(last_used=now))
+        return answer
+
+    def _get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Answers stored under any of ``keys`` that have not expired; marks them as used."""
+        now = time.time()
+        found = {}
+        with self.engine.begin() as conn:
+            for batch in _batches(list(keys)):
+                for row in conn.execute(
+                    select(query_cache.c.key, query_cache.c.answer).where(
+                        query_cache.c.key.in_(batch), query_cache.c.created_at > now - self.ttl
+                    )
+                ):
+                    found[row.key] = row.answer
+            for batch in _batches(list(found)):
+                conn.execute(update(query_cache).where(query_cache.c.key.in_(batch)).values(last_used=now))
+        return found
+
+    def _sync_vectors(self, version: str) -> None:
+        """Load vectors other workers cached for ``version`` since the last sync.
+
+        New entries are found by comparing keys rather than by time: a row is
+        stamped before its transaction commits, so one stamped earlier can become
+        visible after a later one.
+        """
+        if version != self._version:
+            self._version, self._vectors = version, {}
+        with self.engine.connect() as conn:
+            keys = set(
+                conn.execute(
+                    select(query_cache.c.key).where(
+                        query_cache.c.version == version, query_cache.c.vector.is_not(None)
+                    )
+                ).scalars()
+            )
+            for batch in _batches(list(keys - set(self._vectors))):
+                for row in conn.execute(
+                    select(query_cache.c.key, query_cache.c.vector).where(query_cache.c.key.in_(batch))
+                ):
+                    self._vectors[row.key] = np.frombuffer(row.vector, dtype=np.float32)
+        # Expired or evicted meanwhile
+        for key in set(self._vectors) - keys:
+            del self._vectors[key]
+
+    def _nearest(self, vector: np.ndarray, version: str) -> Optional[str]:
+        """Answer of the most similar cached query above the threshold, if any."""
+        with self._lock:
+            self._sync_vectors(version)
+            if not self._vectors:
+                return None
+            keys = list(self._vectors)
+            scores = np.stack([self._vectors[key] for key in keys]) @ vector
+        for i in np.argsort(-scores):
+            if scores[i] < self.similarity_threshold:
+                return None
+            answer = self._get(keys[i])
+            if answer is not None:
+                return answer
+            # Expired or evicted since it was loaded
+            with self._lock:
+                self._vectors.pop(keys[i], None)
+        return None
+
+    def _record(self, found: Optional[str]) -> Optional[str]:
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    def lookup(self, query: str, version: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """(cached answer or None, query vector to pass to ``set``)."""
+        answer = self._get(self._key(query, version))
+        if answer is not None or not self.uses_embeddings:
+            return self._record(answer), None
+        vector = _unit(self._embed_model.get_query_embedding(query))
+        return self._record(self._nearest(vector, version)), vector
+
+    async def alookup(self, query: str, version: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """Async counterpart of ``lookup``."""
+        answer = await asyncio.to_thread(self._get, self._key(query, version))
+        if answer is not None or not self.uses_embeddings:
+            return self._record(answer), None
+        vector = _unit(await self._embed_model.aget_query_embedding(query))
+        answer = await asyncio.to_thread(self._nearest, vector, version)
+        return self._record(answer), vector
+
+    def lookup_many(self, queries: Sequence[str], version: str, vectors=None) -> List[Optional[str]]:
+        """Cached answer of each query (None on a miss), found by text in one lookup for all.
+
+        With ``vectors`` (the queries' embeddings), queries missing by text are
+        also matched by similarity.
+        """
+        keys = [self._key(query, version) for query in queries]
+        found = self._get_many(keys)
+        answers = []
+        for i, key in enumerate(keys):
+            answer = found.get(key)
+            if answer is None and self.uses_embeddings and vectors is not None:
+                answer = self._nearest(_unit(vectors[i]), version)
+            answers.append(self._record(answer))
+        return answers
+
+    def set(self, query: str, version: str, answer: str, vector: Optional[np.ndarray] = None) -> None:
+        """Cache ``answer`` for ``query`` at ``version``, evicting expired and excess entries."""
+        self.set_many([(query, answer, vector)], version)
+
+    def set_many(self, entries: Iterable[Tuple[str, str, Optional[np.ndarray]]], version: str) -> None:
+        """Cache ``(query, answer, vector)`` entries at ``version`` in one transaction."""
+        now = time.time()
+        rows = {}
+        for query, answer, vector in entries:
+            key = self._key(query, version)
+            rows[key] = {
+                "key": key,
+                "version": version,
+                "query": query,
+                "answer": answer,
+                "vector": None if vector is None else _unit(vector).tobytes(),
+                "created_at": now,
+                "last_used": now,
+            }
+        if not rows:
+            return
+        stmt = _insert(self.engine, query_cache)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={col: stmt.excluded[col] for col in ("answer", "vector", "created_at", "last_used")},
+        )
+        with self.engine.begin() as conn:
+            for batch in _batches(list(rows.values())):
+                conn.execute(stmt, batch)
+            _evict(conn, query_cache, now, self.ttl, self.max_entries)
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(query_cache))
+        with self._lock:
+            self._version, self._vectors = None, {}
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process, plus the size of the shared cache."""
+        with self.engine.connect() as conn:
+            entries = conn.execute(select(func.count()).select_from(query_cache)).scalar()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class PartialAnswerCache:
+    """Per-community answers from the map phase of past queries, shared like QueryCache.
+
+    Keys combine the community id, a hash of its summary and the normalized
+    query (see ``make_key``), so an entry stays valid for as long as the summary
+    it was answered from. A community that had nothing relevant to say is
+    remembered too, and skipped when the query comes back.
+    """
+
+    def __init__(self, engine: Engine, ttl: float = 24 * 3600, max_entries: int = 100000) -> None:
+        self.engine = engine
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(community_id, summary: str, query: str) -> str:
+        summary_hash = hashlib.sha256(summary.encode()).hexdigest()
+        return hashlib.sha256(
+            f"{community_id}\0{summary_hash}\0{normalize_query(query)}".encode()
+        ).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, bool]]:
+        """(answer, relevant) for each cached key; marks them as used."""
+        keys = list(keys)
+        now = time.time()
+        found = {}
+        with self.engine.begin() as conn:
+            for batch in _batches(keys):
+                for row in conn.execute(
+                    select(partial_answers.c.key, partial_answers.c.answer, partial_answers.c.relevant)
+                    .where(partial_answers.c.key.in_(batch), partial_answers.c.created_at > now - self.ttl)
+                ):
+                    found[row.key] = (row.answer, row.relevant)
+            for batch in _batches(list(found)):
+                conn.execute(
+                    update(partial_answers).where(partial_answers.c.key.in_(batch)).values(last_used=now)
+                )
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, entries: Dict[str, Tuple[str, bool]]) -> None:
+        """Cache ``{key: (answer, relevant)}``, evicting expired and excess entries."""
+        if not entries:
+            return
+        now = time.time()
+        rows = [
+            {"key": key, "answer": answer, "relevant": relevant, "created_at": now, "last_used": now}
+            for key, (answer, relevant) in entries.items()
+        ]
+        stmt = _insert(self.engine, partial_answers)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={col: stmt.excluded[col] for col in ("answer", "relevant", "created_at", "last_used")},
+        )
+        with self.engine.begin() as conn:
+            for batch in _batches(rows):
+                conn.execute(stmt, batch)
+            _evict(conn, partial_answers, now, self.ttl, self.max_entries)
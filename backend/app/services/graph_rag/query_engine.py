@@ -1,57 +1,498 @@
 # library imports
+import asyncio
 import re
+from typing import List, Optional, Tuple
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.graph_stores.types import EntityNode
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.query_engine import CustomQueryEngine
 from llama_index.core.llms import ChatMessage
 from llama_index.core.llms import LLM
 
 # custom imports
+from .query_cache import PartialAnswerCache
 from .store import GraphRAGStore
 
+# Reply asked of a community whose summary has nothing on the query
+NO_RELEVANT_INFORMATION = "NO_RELEVANT_INFORMATION"
+NO_ANSWER = "I could not find information relevant to this query in the knowledge graph."
+# Phrasings that ask about the corpus as a whole, which only the global mode can answer
+GLOBAL_QUERY_CUES = re.compile(
+    r"\b(overall|overview|summar(?:y|ize|ise)|main (?:themes?|topics?|ideas?|points?)|"
+    r"in general|across|compare|comparison|common|trends?|everything)\b",
+    re.IGNORECASE,
+)
+
 class GraphRAGQueryEngine(CustomQueryEngine):
     graph_store: GraphRAGStore
     llm: LLM
+    # Bounds for the async map phase
+    max_concurrency: int = 8
+    request_timeout: float = 60.0
+    # Community pruning; top_k_communities of 0 sends the query to every leaf community
+    embed_model: Optional[BaseEmbedding] = None
+    top_k_communities: int = 10
+    keyword_prefilter: bool = True
+    # Start from the coarsest communities and drill into children only while they
+    # are more relevant than their parent; max_level caps how deep to go
+    hierarchical: bool = True
+    max_level: Optional[int] = None
+    # Memo of per-community answers (including "nothing relevant") across queries
+    answer_cache: Optional[PartialAnswerCache] = None
+    # "global" maps the query over community summaries; "local" answers in one call
+    # from the graph around the entities the query names; "auto" routes per query
+    mode: str = "auto"
+    local_hops: int = 2
+    local_max_triplets: int = 40
+    local_max_chunks: int = 4
+    # Queries naming more entities than this are broad enough for the global mode
+    local_max_entities: int = 5
+
+    def route(self, query_str: str) -> Tuple[str, List[str]]:
+        """Mode to answer the query in ("local" or "global"), and the entities it names.
+
+        In auto mode a query goes local when it names a few known entities and
+        does not ask about the material as a whole.
+        """
+        if self.mode == "global":
+            return "global", []
+        entities = self.graph_store.match_entities(query_str)
+        return self._route_entities(query_str, entities), entities
+
+    def _route_entities(self, query_str: str, entities: List[str]) -> str:
+        """The mode for a query naming ``entities``."""
+        if self.mode == "global" or not entities:
+            return "global"
+        if self.mode == "local" or (
+            len(entities) <= self.local_max_entities and not GLOBAL_QUERY_CUES.search(query_str)
+        ):
+            return "local"
+        return "global"
+
+    def _local_context(self, entity_ids: List[str]) -> str:
+        """The named entities, their k-hop relationships and the chunks those came from."""
+        store = self.graph_store
+        triplets = store.neighborhood(entity_ids, hops=self.local_hops, max_triplets=self.local_max_triplets)
+        entities = [node for node in store.get(ids=entity_ids) if isinstance(node, EntityNode)]
+        chunks = store.source_chunks(triplets, entities, limit=self.local_max_chunks)
+        sections = [
+            "Entities:\n" + "\n".join(
+                f"- {node.name}: {node.properties.get('entity_description', '')}" for node in entities
+            )
+        ]
+        if triplets:
+            sections.append(
+                "Relationships:\n" + "\n".join(
+                    f"- {subj.id} -> {obj.id} -> {rel.label} -> "
+                    f"{rel.properties.get('relationship_description', '')}"
+                    for subj, rel, obj in triplets
+                )
+            )
+        if chunks:
+            sections.append("Sources:\n" + "\n---\n".join(chunk.get_content() for chunk in chunks))
+        return "\n\n".join(sections)
+
+    def _local_messages(self, context: str, query: str):
+        prompt = (
+            "Answer the query using the knowledge graph context below: entities, their "
+            "relationships and the source passages they were extracted from. If the context "
+            "does not contain the answer, say so.\n\n" + context
+        )
+        return [
+            ChatMessage(role="system", content=prompt),
+            ChatMessage(role="user", content=query),
+        ]
+
+    def local_query(self, query_str: str, entity_ids: List[str]) -> str:
+        """Answer from the neighbourhood of the named entities with a single LLM call."""
+        response = self.llm.chat(self._local_messages(self._local_context(entity_ids), query_str))
+        return self._clean_response(response)
+
+    async def alocal_query(self, query_str: str, entity_ids: List[str]) -> str:
+        """Async version of local_query."""
+        context = await asyncio.to_thread(self._local_context, entity_ids)
+        response = await self.llm.achat(self._local_messages(context, query_str))
+        return self._clean_response(response)
+
+    def _leaf_summaries(self, community_summaries):
+        leaves = self.graph_store.leaf_communities()
+        return {c: summary for c, summary in community_summaries.items() if c in leaves}
+
+    def _should_prune(self, community_summaries) -> bool:
+        return 0 < self.top_k_communities < len(community_summaries)
+
+    def _score_communities(self, query_str, query_embedding) -> dict:
+        """Cosine similarity of every embedded community to the query.
+
+        With ``keyword_prefilter``, communities containing an entity named in the
+        query get a boost that ranks them ahead of the rest.
+        """
+        return self._score_communities_batch([query_str], [query_embedding])[0]
+
+    def _score_communities_batch(self, queries, query_embeddings) -> List[dict]:
+        """_score_communities for many queries, with one matrix product for all of them."""
+        ids, matrix = self.graph_store.get_community_embeddings()
+        if not ids:
+            return [{} for _ in queries]
+        query_vectors = np.asarray(query_embeddings, dtype=np.float32).reshape(len(queries), -1)
+        norms = np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        # Rows are unit-normalized, so the dot product is the cosine similarity
+        scores = (query_vectors / norms) @ matrix.T
+        results = []
+        for query_str, row in zip(queries, scores):
+            if self.keyword_prefilter:
+                matched = self.graph_store.communities_for_text(query_str)
+                if matched:
+                    row = row + np.fromiter((i in matched for i in ids), dtype=np.float32, count=len(ids))
+            results.append(dict(zip(ids, row.tolist())))
+        return results
+
+    def _top_k(self, candidates, scores):
+        return sorted(candidates, key=lambda c: scores[c], reverse=True)[: self.top_k_communities]
+
+    def select_communities(self, query_str, query_embedding, community_summaries, scores=None):
+        """Keep the top_k_communities summaries most relevant to the query.
+
+        Flat mode ranks leaf communities. Hierarchical mode ranks the top level,
+        then descends into the children of each kept community that score at
+        least as well as it does; communities with no better children are
+        answered from their own (coarser) summary. ``scores`` are the query's
+        community scores, if already computed.
+        """
+        if scores is None:
+            scores = self._score_communities(query_str, query_embedding)
+        if not scores:
+            return self._leaf_summaries(community_summaries)
+
+        if not self.hierarchical:
+            leaves = [c for c in self._leaf_summaries(community_summaries) if c in scores]
+            selected = self._top_k(leaves, scores)
+        else:
+            children = self.graph_store.community_children()
+            levels = self.graph_store.community_level
+            frontier = [c for c in self.graph_store.root_communities() if c in scores]
+            selected = []
+            while frontier:
+                next_frontier = []
+                for community in self._top_k(frontier, scores):
+                    relevant_children = [
+                        child
+                        for child in children.get(community, [])
+                        if child in scores and scores[child] >= scores[community]
+                    ]
+                    at_max_level = (
+                        self.max_level is not None
+                        and levels.get(community, 0) >= self.max_level
+                    )
+                    if relevant_children and not at_max_level:
+                        next_frontier.extend(relevant_children)
+                    else:
+                        selected.append(community)
+                frontier = next_frontier
+            selected = self._top_k(selected, scores)
+        return {c: community_summaries[c] for c in selected if c in community_summaries}
+
+    @property
+    def _embed_model(self) -> BaseEmbedding:
+        return self.embed_model or Settings.embed_model
 
     def custom_query(self, query_str: str) -> str:
-        """Process all community summaries to generate answers to a specific query."""
+        """Process the most relevant community summaries to generate answers to a specific query."""
+        mode, entities = self.route(query_str)
+        if mode == "local":
+            return self.local_query(query_str, entities)
         community_summaries = self.graph_store.get_community_summaries()
-        community_answers = [
-            self.generate_answer_from_summary(community_summary, query_str)
-            for _, community_summary in community_summaries.items()
-        ]
+        if self._should_prune(self._leaf_summaries(community_summaries)):
+            query_embedding = self._embed_model.get_query_embedding(query_str)
+            community_summaries = self.select_communities(
+                query_str, query_embedding, community_summaries
+            )
+        else:
+            community_summaries = self._leaf_summaries(community_summaries)
+        cached, keys = self._memo_lookup(query_str, community_summaries)
+        community_answers, new = [], {}
+        for community_id, community_summary in community_summaries.items():
+            if community_id in cached:
+                answer, relevant = cached[community_id]
+            else:
+                answer = self.generate_answer_from_summary(community_summary, query_str)
+                relevant = self._is_relevant(answer)
+                if community_id in keys:
+                    new[keys[community_id]] = (answer, relevant)
+            if relevant:
+                community_answers.append(answer)
+        self._memo_store(new)
+        if not community_answers:
+            return NO_ANSWER
 
         final_answer = self.aggregate_answers(community_answers)
         return final_answer
 
-    def generate_answer_from_summary(self, community_summary, query):
-        """Generate an answer from a community summary based on a given query using LLM."""
+    @staticmethod
+    def _is_relevant(answer: str) -> bool:
+        return not answer.lstrip(" *_`'\"").upper().startswith(NO_RELEVANT_INFORMATION)
+
+    def _memo_lookup(self, query_str: str, community_summaries):
+        """Memoized (answer, relevant) per community, and the memo key of every community."""
+        if self.answer_cache is None:
+            return {}, {}
+        keys = {
+            community_id: self.answer_cache.make_key(community_id, summary, query_str)
+            for community_id, summary in community_summaries.items()
+        }
+        found = self.answer_cache.get_many(keys.values())
+        cached = {community_id: found[key] for community_id, key in keys.items() if key in found}
+        return cached, keys
+
+    def _memo_store(self, entries) -> None:
+        if self.answer_cache is not None and entries:
+            self.answer_cache.set_many(entries)
+
+    async def _aselect_summaries(self, query_str: str):
+        """Async counterpart of the community selection done in custom_query."""
+        # Building communities is blocking, keep it off the event loop
+        community_summaries = await asyncio.to_thread(
+            self.graph_store.get_community_summaries
+        )
+        if self._should_prune(self._leaf_summaries(community_summaries)):
+            query_embedding = await self._embed_model.aget_query_embedding(query_str)
+            return await asyncio.to_thread(
+                self.select_communities, query_str, query_embedding, community_summaries
+            )
+        return self._leaf_summaries(community_summaries)
+
+    async def _amap_communities(self, query_str: str, community_summaries, semaphore=None):
+        """Yield each community's answer (or the exception it raised) as it completes.
+
+        Communities with nothing relevant to the query yield None. Memoized answers
+        come first; the other calls run under a semaphore of ``max_concurrency``
+        (or the one given, to share the bound across queries) and are cancelled
+        after ``request_timeout`` seconds.
+        """
+        cached, keys = await asyncio.to_thread(self._memo_lookup, query_str, community_summaries)
+        for answer, relevant in cached.values():
+            yield answer if relevant else None
+
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        new = {}
+
+        async def answer(community_id, community_summary):
+            async with semaphore:
+                try:
+                    response = await asyncio.wait_for(
+                        self.agenerate_answer_from_summary(community_summary, query_str),
+                        timeout=self.request_timeout,
+                    )
+                except Exception as e:
+                    return e
+            relevant = self._is_relevant(response)
+            if community_id in keys:
+                new[keys[community_id]] = (response, relevant)
+            return response if relevant else None
+
+        tasks = [
+            asyncio.ensure_future(answer(community_id, summary))
+            for community_id, summary in community_summaries.items()
+            if community_id not in cached
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer may stop early (e.g. a client disconnect)
+            for task in tasks:
+                task.cancel()
+        await asyncio.to_thread(self._memo_store, new)
+
+    @staticmethod
+    def _collect(result, community_answers, errors) -> None:
+        if isinstance(result, Exception):
+            errors.append(result)
+        elif result is not None:
+            community_answers.append(result)
+
+    @staticmethod
+    def _check_answers(query_str, community_answers, errors):
+        """Log failed community calls; raise only if every call failed."""
+        if errors:
+            total = len(errors) + len(community_answers)
+            print(f"{len(errors)} of {total} community answers failed for query: {query_str}")
+            if not community_answers:
+                raise RuntimeError("All community answers failed") from errors[0]
+
+    async def acustom_query(self, query_str: str) -> str:
+        """Answer from the most relevant community summaries concurrently, then aggregate.
+
+        Failed or timed-out community calls are dropped; the query only fails if
+        every community call fails. Queries routed to the local mode are answered
+        from the named entities' neighbourhood instead.
+        """
+        mode, entities = await asyncio.to_thread(self.route, query_str)
+        if mode == "local":
+            return await self.alocal_query(query_str, entities)
+        community_summaries = await self._aselect_summaries(query_str)
+        community_answers, errors = [], []
+        async for result in self._amap_communities(query_str, community_summaries):
+            self._collect(result, community_answers, errors)
+        self._check_answers(query_str, community_answers, errors)
+        if not community_answers:
+            return NO_ANSWER
+
+        return await self.aaggregate_answers(community_answers)
+
+    def link_questions(self, questions: List[str], embeddings) -> List[dict]:
+        """Route each question and link it to the entities and communities it concerns.
+
+        Entities are matched with one alias lookup and communities are scored with
+        one matrix product for the whole batch. Returns ``{"mode", "entities",
+        "communities"}`` per question; the communities are those a global answer
+        would be mapped over.
+        """
+        if not questions:
+            return []
+        community_summaries = self.graph_store.get_community_summaries()
+        leaves = self._leaf_summaries(community_summaries)
+        entity_lists = self.graph_store.match_entities_batch(questions, vectors=embeddings)
+        scores = None
+        if self._should_prune(leaves):
+            scores = self._score_communities_batch(questions, embeddings)
+        links = []
+        for i, question in enumerate(questions):
+            if scores is None:
+                communities = leaves
+            else:
+                communities = self.select_communities(
+                    question, embeddings[i], community_summaries, scores=scores[i]
+                )
+            links.append({
+                "mode": self._route_entities(question, entity_lists[i]),
+                "entities": entity_lists[i],
+                "communities": list(communities),
+            })
+        return links
+
+    async def _aanswer_linked(self, question: str, link: dict, community_summaries, semaphore) -> str:
+        if link["mode"] == "local":
+            async with semaphore:
+                return await asyncio.wait_for(
+                    self.alocal_query(question, link["entities"]), timeout=self.request_timeout
+                )
+        summaries = {c: community_summaries[c] for c in link["communities"] if c in community_summaries}
+        community_answers, errors = [], []
+        async for result in self._amap_communities(question, summaries, semaphore=semaphore):
+            self._collect(result, community_answers, errors)
+        self._check_answers(question, community_answers, errors)
+        if not community_answers:
+            return NO_ANSWER
+        async with semaphore:
+            return await self.aaggregate_answers(community_answers)
+
+    async def aquery_batch(self, questions: List[str], links: List[dict]):
+        """Answer linked questions concurrently, yielding ``(index, answer)`` as each completes.
+
+        ``links`` come from link_questions. Every LLM call of the batch shares one
+        semaphore of ``max_concurrency``; a question that fails yields its exception.
+        """
+        community_summaries = await asyncio.to_thread(self.graph_store.get_community_summaries)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def answer(index):
+            try:
+                return index, await self._aanswer_linked(
+                    questions[index], links[index], community_summaries, semaphore
+                )
+            except Exception as e:
+                return index, e
+
+        tasks = [asyncio.ensure_future(answer(index)) for index in range(len(questions))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream_query(self, query_str: str):
+        """Stream a query as events.
+
+        Yields ``{"event": "progress", "completed": n, "total": N}`` as each community
+        answer completes, then ``{"event": "token", "delta": ...}`` for each token of
+        the aggregated answer. Local queries only stream tokens.
+        """
+        mode, entities = await asyncio.to_thread(self.route, query_str)
+        if mode == "local":
+            context = await asyncio.to_thread(self._local_context, entities)
+            response_gen = await self.llm.astream_chat(self._local_messages(context, query_str))
+            async for response in response_gen:
+                if response.delta:
+                    yield {"event": "token", "delta": response.delta}
+            return
+        community_summaries = await self._aselect_summaries(query_str)
+        total = len(community_summaries)
+        community_answers, errors = [], []
+        completed = 0
+        async for result in self._amap_communities(query_str, community_summaries):
+            self._collect(result, community_answers, errors)
+            completed += 1
+            yield {"event": "progress", "completed": completed, "total": total}
+        self._check_answers(query_str, community_answers, errors)
+        if not community_answers:
+            yield {"event": "token", "delta": NO_ANSWER}
+            return
+
+        response_gen = await self.llm.astream_chat(self._aggregate_messages(community_answers))
+        async for response in response_gen:
+            if response.delta:
+                yield {"event": "token", "delta": response.delta}
+
+    def _answer_messages(self, community_summary, query):
         prompt = (
             f"Given the community summary: {community_summary}, "
-            f"how would you answer the following query? Query: {query}"
+            f"how would you answer the following query? Query: {query} "
+            f"If the summary contains nothing relevant to the query, reply with exactly "
+            f"{NO_RELEVANT_INFORMATION} and nothing else."
         )
-        messages = [
+        return [
             ChatMessage(role="system", content=prompt),
             ChatMessage(
                 role="user",
                 content="I need an answer based on the above information.",
             ),
         ]
-        response = self.llm.chat(messages)
-        cleaned_response = re.sub(r"^assistant:\s*", "", str(response)).strip()
-        return cleaned_response
 
-    def aggregate_answers(self, community_answers):
-        """Aggregate individual community answers into a final, coherent response."""
+    def _aggregate_messages(self, community_answers):
         # intermediate_text = " ".join(community_answers)
         prompt = "Combine the following intermediate answers into a final, concise response."
-        messages = [
+        return [
             ChatMessage(role="system", content=prompt),
             ChatMessage(
                 role="user",
                 content=f"Intermediate answers: {community_answers}",
             ),
         ]
-        final_response = self.llm.chat(messages)
-        cleaned_final_response = re.sub(
-            r"^assistant:\s*", "", str(final_response)
-        ).strip()
-        return cleaned_final_response
\ No newline at end of file
+
+    @staticmethod
+    def _clean_response(response) -> str:
+        return re.sub(r"^assistant:\s*", "", str(response)).strip()
+
+    def generate_answer_from_summary(self, community_summary, query):
+        """Generate an answer from a community summary based on a given query using LLM."""
+        response = self.llm.chat(self._answer_messages(community_summary, query))
+        return self._clean_response(response)
+
+    async def agenerate_answer_from_summary(self, community_summary, query):
+        """Async version of generate_answer_from_summary."""
+        response = await self.llm.achat(self._answer_messages(community_summary, query))
+        return self._clean_response(response)
+
+    def aggregate_answers(self, community_answers):
+        """Aggregate individual community answers into a final, coherent response."""
+        final_response = self.llm.chat(self._aggregate_messages(community_answers))
+        return self._clean_response(final_response)
+
+    async def aaggregate_answers(self, community_answers):
+        """Async version of aggregate_answers."""
+        final_response = await self.llm.achat(self._aggregate_messages(community_answers))
+        return self._clean_response(final_response)
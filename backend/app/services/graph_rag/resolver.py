@@ -0,0 +1,194 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+LEADING_ARTICLES = ("the", "a", "an")
+
+
+def normalize_entity_name(name: str) -> str:
+    """Key under which spellings of the same entity collide.
+
+    Unicode-normalized and case-folded, with possessive "'s", punctuation, hyphens
+    and a leading article dropped. Plurals are not folded: a colliding key merges entities for
+    good, and "News", "Mars" or "Species" are not plurals of anything, so singular
+    and plural forms are left to the embedding pass.
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    text = re.sub(r"['’]s\b", "", text)
+    text = re.sub(r"[_\-‐-―/]+", " ", text)
+    text = re.sub(r"[^\w\s]", "", text)
+    words = text.split()
+    if len(words) > 1 and words[0] in LEADING_ARTICLES:
+        words = words[1:]
+    return " ".join(words) or name.strip().casefold()
+
+
+def _block_key(key: str) -> str:
+    # Embedding candidates are only compared within a block (same leading characters)
+    return key[:4]
+
+
+def _preferred_name(names: List[str]) -> str:
+    """Display form for a new entity: mixed case over all-caps or all-lowercase, then first seen."""
+    return min(names, key=lambda name: (name.isupper(), name.islower()))
+
+
+class EntityResolver:
+    """Maps extracted entity names to one canonical entity id.
+
+    Names are first matched on their normalized form through an alias table; with a
+    ``similarity_threshold``, names that are still new are also compared by embedding
+    against known entities in the same block and merged above the threshold. The
+    alias table lives in the graph backend when there is one, so every process
+    resolves names the same way; without a backend it is kept in memory.
+    """
+
+    def __init__(self, backend=None, embed_model=None, similarity_threshold: Optional[float] = None) -> None:
+        self.backend = backend
+        self.embed_model = embed_model
+        self.similarity_threshold = similarity_threshold
+        # Alias key -> canonical id, a cache in front of the backend table. Entries only
+        # go when their entity is deleted (see forget); other processes call clear
+        self._aliases: Dict[str, str] = {}
+        # Canonical id -> (block, unit vector), for stores without a backend
+        self._vectors: Dict[str, tuple] = {}
+
+    def seed(self, entity_ids: Iterable[str]) -> None:
+        """Register existing entities as canonical (for stores without a persistent alias table)."""
+        for entity_id in entity_ids:
+            self._aliases.setdefault(normalize_entity_name(entity_id), entity_id)
+
+    def forget(self, entity_ids: Iterable[str]) -> None:
+        """Stop resolving names to deleted entities (the backend drops its rows itself)."""
+        entity_ids = set(entity_ids)
+        if not entity_ids:
+            return
+        self._aliases = {key: id for key, id in self._aliases.items() if id not in entity_ids}
+        for entity_id in entity_ids:
+            self._vectors.pop(entity_id, None)
+
+    def clear(self) -> None:
+        """Drop cached aliases, e.g. after another process changed the graph."""
+        self._aliases = {}
+
+    def _lookup(self, keys: Iterable[str]) -> Dict[str, str]:
+        found = {key: self._aliases[key] for key in keys if key in self._aliases}
+        missing = [key for key in keys if key not in found]
+        if missing and self.backend is not None:
+            stored = self.backend.get_aliases(missing)
+            self._aliases.update(stored)
+            found.update(stored)
+        return found
+
+    def _record(self, aliases: Dict[str, str]) -> None:
+        if not aliases:
+            return
+        if self.backend is not None:
+            self.backend.add_aliases(aliases)
+        self._aliases.update(aliases)
+
+    def _block_vectors(self, blocks: Iterable[str]) -> Dict[str, tuple]:
+        """(block, vector) of known canonical entities in the given blocks."""
+        blocks = set(blocks)
+        if self.backend is not None:
+            return self.backend.get_entity_vectors(blocks)
+        return {
+            entity_id: (block, vector)
+            for entity_id, (block, vector) in self._vectors.items()
+            if block in blocks
+        }
+
+    def _store_vectors(self, vectors: Dict[str, tuple]) -> None:
+        if not vectors:
+            return
+        if self.backend is not None:
+            self.backend.add_entity_vectors(vectors)
+        else:
+            self._vectors.update(vectors)
+
+    def _embed(self, names: List[str]) -> List[np.ndarray]:
+        from llama_index.core import Settings
+
+        embed_model = self.embed_model or Settings.embed_model
+        vectors = []
+        for vector in embed_model.get_text_embedding_batch(names):
+            vector = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    def _match_by_embedding(self, new: Dict[str, str]) -> Dict[str, str]:
+        """For new alias keys, the existing entity each should merge into (if any).
+
+        Entities created in this call become candidates for the ones after them.
+        """
+        keys = list(new)
+        vectors = dict(zip(keys, self._embed([new[key] for key in keys])))
+        candidates = self._block_vectors(_block_key(key) for key in keys)
+        merged, created = {}, {}
+        for key in keys:
+            block = _block_key(key)
+            best, best_score = None, self.similarity_threshold
+            for entity_id, (candidate_block, vector) in candidates.items():
+                if candidate_block != block:
+                    continue
+                score = float(vectors[key] @ vector)
+                if score >= best_score:
+                    best, best_score = entity_id, score
+            if best is not None:
+                merged[key] = best
+            else:
+                candidates[new[key]] = created[new[key]] = (block, vectors[key])
+        self._store_vectors(created)
+        return merged
+
+    def find(self, names: Iterable[str]) -> Dict[str, str]:
+        """Canonical id of each name that is already known; nothing is registered."""
+        keys = {name: normalize_entity_name(name) for name in names}
+        known = self._lookup(set(keys.values()))
+        return {name: known[key] for name, key in keys.items() if key in known}
+
+    def nearest(self, text: str, words: Iterable[str], limit: int = 5, vector=None) -> List[str]:
+        """Known entities whose name embedding is within the similarity threshold of ``text``.
+
+        Candidates come from the blocks of ``words``; needs a ``similarity_threshold``.
+        ``vector`` is the embedding of ``text``, if already computed.
+        """
+        if self.similarity_threshold is None:
+            return []
+        candidates = self._block_vectors(_block_key(normalize_entity_name(word)) for word in words)
+        if not candidates:
+            return []
+        if vector is None:
+            (vector,) = self._embed([text])
+        else:
+            vector = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+        scored = [(float(vector @ candidate), entity_id) for entity_id, (_, candidate) in candidates.items()]
+        scored.sort(reverse=True)
+        return [entity_id for score, entity_id in scored[:limit] if score >= self.similarity_threshold]
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, str]:
+        """Canonical id for each name, registering names not seen before."""
+        keys = {name: normalize_entity_name(name) for name in names}
+        known = self._lookup(set(keys.values()))
+
+        spellings: Dict[str, List[str]] = {}
+        for name, key in keys.items():
+            if key not in known:
+                spellings.setdefault(key, []).append(name)
+        new = {key: _preferred_name(forms) for key, forms in spellings.items()}
+
+        aliases = dict(new)
+        if new and self.similarity_threshold is not None:
+            try:
+                aliases.update(self._match_by_embedding(new))
+            except Exception as e:
+                # Exact-name resolution still applies without embeddings
+                print(f"Error embedding entity names: {e}")
+        self._record(aliases)
+        known.update(aliases)
+        return {name: known[key] for name, key in keys.items()}
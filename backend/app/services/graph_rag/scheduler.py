@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a provider/client error, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for 429 / rate-limit responses from the LLM provider."""
+    if _status_code(error) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "too many requests" in message
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for failures worth retrying: rate limits, timeouts, dropped connections and 5xx."""
+    if is_rate_limited(error):
+        return True
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After header), if it said."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for LLM calls that adapts to the provider (AIMD).
+
+    The limit grows by one after a window of calls that came back faster than
+    target_latency, shrinks by one when calls are slow, and halves on a rate-limit
+    response; a rate limit also pauses every new call until the backoff has passed.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        target_latency: float = 30.0,
+    ) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.target_latency = target_latency
+        self.rate_limited = 0
+        self._active = 0
+        self._fast = 0
+        self._paused_until = 0.0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record_success(self, latency: float) -> None:
+        if latency > self.target_latency:
+            self.limit = max(self.minimum, self.limit - 1)
+            self._fast = 0
+            return
+        self._fast += 1
+        if self._fast >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._fast = 0
+
+    def record_rate_limit(self, delay: float) -> None:
+        self.rate_limited += 1
+        self.limit = max(self.minimum, self.limit // 2)
+        self._fast = 0
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+
+async def call_with_retries(limiter: AdaptiveLimiter, call, max_retries: int = 5):
+    """Await ``call()`` under the limiter, retrying transient failures with jittered backoff."""
+    attempt = 0
+    while True:
+        async with limiter:
+            start = time.monotonic()
+            try:
+                result = await call()
+            except Exception as e:
+                if attempt >= max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after(e) or backoff_delay(attempt)
+                if is_rate_limited(e):
+                    limiter.record_rate_limit(delay)
+            else:
+                limiter.record_success(time.monotonic() - start)
+                return result
+        attempt += 1
+        # Back off outside the limiter so the slot is free for other calls
+        await asyncio.sleep(delay)
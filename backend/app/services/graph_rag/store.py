@@ -1,91 +1,992 @@
-from llama_index.llms.mistralai import MistralAI
+import asyncio
+import hashlib
+import json
+import os
 import re
+from typing import Dict, List, Optional, Sequence
+import fsspec
+import numpy as np
+from llama_index.core import Settings
 from llama_index.core.graph_stores import SimplePropertyGraphStore
-import networkx as nx
+from llama_index.core.graph_stores.types import (
+    KG_NODES_KEY,
+    TRIPLET_SOURCE_KEY,
+    EntityNode,
+    LabelledNode,
+    Relation,
+    Triplet,
+)
 from graspologic.partition import hierarchical_leiden
 
-from llama_index.core.llms import ChatMessage
+from llama_index.core.async_utils import run_jobs
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import LLM, ChatMessage
+from llama_index.core.schema import BaseNode, TransformComponent
+from llama_index.core.utils import get_tokenizer
+
+from .backend import SQLGraphBackend
+from .compact import CompactGraph
+from .resolver import EntityResolver
+from .scheduler import AdaptiveLimiter, call_with_retries
+
+COMMUNITY_PERSIST_FNAME = "communities.json"
+COMMUNITY_EMBEDDINGS_FNAME = "community_embeddings.npz"
+
+COMMUNITY_SUMMARY_PROMPT = (
+    "You are provided with a set of relationships from a knowledge graph, each represented as "
+    "entity1->entity2->relation->relationship_description. Your task is to create a summary of these "
+    "relationships. The summary should include the names of the entities involved and a concise synthesis "
+    "of the relationship descriptions. The goal is to capture the most critical and relevant details that "
+    "highlight the nature and significance of each relationship. Ensure that the summary is coherent and "
+    "integrates the information in a way that emphasizes the key aspects of the relationships."
+)
+COMMUNITY_REDUCE_PROMPT = (
+    "You are provided with several partial summaries of the relationships in one community of a "
+    "knowledge graph. Combine them into a single coherent summary that keeps the names of the entities "
+    "involved and the most critical and relevant details of their relationships, without repeating "
+    "information."
+)
 
 
 class GraphRAGStore(SimplePropertyGraphStore):
-    community_summary = {}
+    """Property graph store with GraphRAG communities.
+
+    The graph lives in memory (``self.graph``, persisted as one JSON file) unless a
+    ``backend`` is given, in which case nodes and relations are read from and written
+    to it on demand and only communities are kept in memory.
+
+    Entity names are canonicalized on the way in (see EntityResolver), so spellings
+    of one concept become a single node whose properties are merged.
+    """
+
     max_cluster_size = 5
+    # Fixed so re-clustering an unchanged region yields the same communities
+    random_seed = 42
+    # Summaries slower than this shrink the summarization concurrency
+    summary_target_latency = 60.0
 
-    def generate_community_summary(self, text):
-        """Generate summary for a given text using an LLM."""
-        messages = [
-            ChatMessage(
-                role="system",
-                content=(
-                    "You are provided with a set of relationships from a knowledge graph, each represented as "
-                    "entity1->entity2->relation->relationship_description. Your task is to create a summary of these "
-                    "relationships. The summary should include the names of the entities involved and a concise synthesis "
-                    "of the relationship descriptions. The goal is to capture the most critical and relevant details that "
-                    "highlight the nature and significance of each relationship. Ensure that the summary is coherent and "
-                    "integrates the information in a way that emphasizes the key aspects of the relationships."
-                ),
-            ),
+    def __init__(
+        self,
+        *args,
+        backend: Optional[SQLGraphBackend] = None,
+        resolver: Optional[EntityResolver] = None,
+        llm: Optional[LLM] = None,
+        summary_concurrency: int = 8,
+        summary_max_tokens: int = 6000,
+        summary_max_retries: int = 5,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.backend = backend
+        # Shared by every summary call; Settings.llm when not given
+        self.llm = llm
+        # Parallel summary calls at most, and the token budget of the relationships sent
+        # in one call (larger communities are summarized in parts and then combined)
+        self.summary_concurrency = summary_concurrency
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_max_retries = summary_max_retries
+        self.resolver = resolver or EntityResolver(backend=backend)
+        # An in-memory store registers its existing entities with the resolver on first use
+        self._resolver_seeded = backend is not None
+        # Integer-id view of the graph for community detection, built on first use and
+        # then updated by upserts; _compact_revision is the backend revision it reflects
+        self._compact: Optional[CompactGraph] = None
+        self._compact_revision = 0
+        # Per-instance so a reloaded store never inherits another store's summaries
+        self.community_summary = {}
+        # Memo of summaries_version(); cleared whenever summaries are replaced
+        self._summaries_version: Optional[str] = None
+        # Node to leaf (final) community, and each community's level and parent
+        # across the Leiden hierarchy; level 0 is the coarsest
+        self.community_mapping = {}
+        self.community_level = {}
+        self.community_parent = {}
+        self.community_info = {}
+        # Unit-normalized summary embeddings, one row per id in community_embedding_ids;
+        # community_embedding_keys holds the summary hash each row was computed from
+        self.community_embedding_ids = []
+        self.community_embedding_keys = []
+        self.community_embeddings = np.zeros((0, 0), dtype=np.float32)
+        # Entities touched since communities were last built
+        self.pending_node_ids = set()
+        # Where communities are saved; set once the store is persisted or loaded
+        self.community_persist_path: Optional[str] = None
+
+    def get(
+        self,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[LabelledNode]:
+        """Get nodes."""
+        if self.backend is None:
+            return super().get(properties=properties, ids=ids)
+        return self.backend.get(properties=properties, ids=ids)
+
+    def get_triplets(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[Triplet]:
+        """Get triplets."""
+        if self.backend is None:
+            return super().get_triplets(entity_names, relation_names, properties, ids)
+        return self.backend.get_triplets(entity_names, relation_names, properties, ids)
+
+    def delete(
+        self,
+        entity_names: Optional[List[str]] = None,
+        relation_names: Optional[List[str]] = None,
+        properties: Optional[dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> None:
+        """Delete matching data."""
+        self._compact = None
+        if self.backend is None:
+            return super().delete(entity_names, relation_names, properties, ids)
+        self.backend.delete(entity_names, relation_names, properties, ids)
+
+    def _seed_resolver(self) -> None:
+        if not self._resolver_seeded:
+            self.resolver.seed(self._entity_ids())
+            self._resolver_seeded = True
+
+    def _resolve(self, names) -> dict:
+        """Canonical entity id for each name."""
+        self._seed_resolver()
+        return self.resolver.resolve(names)
+
+    def match_entities(self, text: str, max_words: int = 4) -> List[str]:
+        """Entities named in ``text``, in order of appearance.
+
+        Word n-grams are looked up by their normalized form, longest first, so
+        "the Krebs cycle" matches that entity rather than "cycle". When nothing
+        matches by name, entity-name embeddings are tried (if the resolver has a
+        similarity threshold).
+        """
+        return self.match_entities_batch([text], max_words=max_words)[0]
+
+    def match_entities_batch(self, texts: List[str], max_words: int = 4, vectors=None) -> List[List[str]]:
+        """match_entities for many texts, with a single alias lookup for all of them.
+
+        ``vectors`` (the texts' embeddings, if already computed) spare the embedding
+        fallback its own call.
+        """
+        self._seed_resolver()
+        all_words, all_spans = [], []
+        for text in texts:
+            words = re.findall(r"\w+(?:[-']\w+)*", text)
+            all_words.append(words)
+            all_spans.append({
+                (i, i + n): " ".join(words[i:i + n])
+                for n in range(1, min(max_words, len(words)) + 1)
+                for i in range(len(words) - n + 1)
+            })
+        found = self.resolver.find(set().union(*(spans.values() for spans in all_spans)))
+        results = []
+        for index, (text, words, spans) in enumerate(zip(texts, all_words, all_spans)):
+            matched, covered = {}, set()
+            for (start, end), phrase in sorted(spans.items(), key=lambda item: item[0][0] - item[0][1]):
+                if phrase in found and covered.isdisjoint(range(start, end)):
+                    covered.update(range(start, end))
+                    matched[start] = found[phrase]
+            if matched:
+                results.append(list(dict.fromkeys(matched[start] for start in sorted(matched))))
+                continue
+            try:
+                vector = None if vectors is None else vectors[index]
+                results.append(self.resolver.nearest(text, words, vector=vector))
+            except Exception as e:
+                print(f"Error matching entities by embedding: {e}")
+                results.append([])
+        return results
+
+    def neighborhood(self, entity_ids: List[str], hops: int = 2, max_triplets: int = 50) -> List[Triplet]:
+        """Triplets within ``hops`` of the given entities, nearest first, at most max_triplets."""
+        triplets = {}
+        seen = set(entity_ids)
+        frontier = list(entity_ids)
+        for _ in range(hops):
+            if not frontier:
+                break
+            next_frontier = []
+            for subj, rel, obj in self.get_triplets(entity_names=frontier):
+                key = (subj.id, rel.label, obj.id)
+                if key in triplets:
+                    continue
+                triplets[key] = (subj, rel, obj)
+                if len(triplets) >= max_triplets:
+                    return list(triplets.values())
+                for node in (subj, obj):
+                    if node.id not in seen:
+                        seen.add(node.id)
+                        next_frontier.append(node.id)
+            frontier = next_frontier
+        return list(triplets.values())
+
+    def source_chunks(self, triplets: List[Triplet], entities: Sequence[LabelledNode] = (), limit: int = 4):
+        """Text chunks the given triplets and entities were extracted from, most cited first."""
+        counts = {}
+        for item in [*entities, *(rel for _, rel, _ in triplets)]:
+            chunk_id = item.properties.get(TRIPLET_SOURCE_KEY)
+            if chunk_id:
+                counts[chunk_id] = counts.get(chunk_id, 0) + 1
+        chunk_ids = sorted(counts, key=counts.get, reverse=True)[:limit]
+        chunks = {node.node_id: node for node in self.get_llama_nodes(chunk_ids)}
+        return [chunks[chunk_id] for chunk_id in chunk_ids if chunk_id in chunks]
+
+    def _stored_entities(self, ids: List[str]) -> dict:
+        if self.backend is not None:
+            nodes = self.backend.get(ids=ids)
+        else:
+            nodes = [self.graph.nodes[i] for i in ids if i in self.graph.nodes]
+        return {node.id: node for node in nodes if isinstance(node, EntityNode)}
+
+    @staticmethod
+    def _fold_entity(target: EntityNode, source: EntityNode) -> None:
+        """Merge a duplicate into ``target``: a typed label beats the bare default, first property value wins."""
+        if target.label == "entity" and source.label != "entity":
+            target.label = source.label
+        for key, value in source.properties.items():
+            target.properties.setdefault(key, value)
+
+    def _canonical_entities(self, entities: List[EntityNode]) -> List[EntityNode]:
+        """One node per canonical entity, merged with duplicates in the batch and in the store."""
+        canonical = self._resolve({node.name for node in entities})
+        merged = {}
+        for node in entities:
+            name = canonical[node.name]
+            if name not in merged:
+                merged[name] = (
+                    node if node.name == name
+                    else EntityNode(name=name, label=node.label, properties=dict(node.properties))
+                )
+            else:
+                self._fold_entity(merged[name], node)
+        stored = self._stored_entities(list(merged))
+        for name, node in merged.items():
+            if name in stored and stored[name] is not node:
+                self._fold_entity(stored[name], node)
+                merged[name] = stored[name]
+        return list(merged.values())
+
+    def upsert_nodes(self, nodes: Sequence[LabelledNode]) -> None:
+        """Add nodes, remembering which entities need their communities refreshed."""
+        incoming = [node for node in nodes if isinstance(node, EntityNode)]
+        entities = self._canonical_entities(incoming)
+        nodes = [node for node in nodes if not isinstance(node, EntityNode)] + entities
+        if self.backend is None:
+            super().upsert_nodes(nodes)
+        else:
+            # Folding keeps the stored node's source; every chunk naming the entity counts
+            canonical = self._resolve({node.name for node in incoming})
+            sources = {}
+            for node in incoming:
+                source_id = node.properties.get(TRIPLET_SOURCE_KEY)
+                if source_id is not None:
+                    sources.setdefault(canonical[node.name], set()).add(source_id)
+            self.backend.upsert_nodes(nodes, sources=sources)
+        self._update_compact(lambda graph: graph.add_nodes(node.id for node in entities))
+        self.pending_node_ids.update(node.id for node in entities)
+
+    def add_entity_sources(self, sources: Dict[str, set]) -> None:
+        """Count further chunks (``{entity id: chunk ids}``) among the sources of stored entities."""
+        if self.backend is not None:
+            self.backend.add_entity_sources(sources)
+        # In memory an entity keeps only the chunk stored on it
+
+    def upsert_relations(self, relations: List[Relation]) -> None:
+        """Add relations, remembering which entities need their communities refreshed."""
+        canonical = self._resolve(
+            {relation.source_id for relation in relations}
+            | {relation.target_id for relation in relations}
+        )
+        resolved = []
+        for relation in relations:
+            source, target = canonical[relation.source_id], canonical[relation.target_id]
+            if source == target:
+                # Both ends resolved to one entity; a self-loop carries no structure
+                continue
+            if (source, target) != (relation.source_id, relation.target_id):
+                relation = relation.model_copy(update={"source_id": source, "target_id": target})
+            resolved.append(relation)
+        relations = resolved
+        if self.backend is None:
+            super().upsert_relations(relations)
+        else:
+            self.backend.upsert_relations(relations)
+        self._update_compact(
+            lambda graph: graph.add_edges(
+                (
+                    relation.source_id,
+                    relation.target_id,
+                    relation.label,
+                    relation.properties.get("relationship_description", ""),
+                )
+                for relation in relations
+            )
+        )
+        for relation in relations:
+            self.pending_node_ids.add(relation.source_id)
+            self.pending_node_ids.add(relation.target_id)
+
+    def remove_sources(self, chunk_ids: Sequence[str]) -> set:
+        """Remove chunks and what was extracted from them, keeping entities still in use.
+
+        Entities that lost a relation, and the other members of communities that lost
+        an entity, are marked pending so only those communities are refreshed. Returns
+        the ids of the entities removed.
+        """
+        if self.backend is not None:
+            removed, touched = self.backend.delete_sources(chunk_ids)
+        else:
+            removed, touched = self._delete_sources(set(chunk_ids))
+        self._compact = None
+        self.resolver.forget(removed)
+        if removed:
+            leaf = {self.community_mapping[node] for node in removed if node in self.community_mapping}
+            touched |= {node for node, cluster in self.community_mapping.items() if cluster in leaf}
+            touched -= removed
+        self.pending_node_ids -= removed
+        self.pending_node_ids |= touched
+        return removed
+
+    def _delete_sources(self, chunk_ids: set):
+        """In-memory counterpart of SQLGraphBackend.delete_sources."""
+        graph = self.graph
+        endpoints = set()
+        for key, relation in list(graph.relations.items()):
+            if relation.properties.get(TRIPLET_SOURCE_KEY) in chunk_ids:
+                endpoints.update((relation.source_id, relation.target_id))
+                del graph.relations[key]
+                graph.triplets.discard((relation.source_id, relation.label, relation.target_id))
+        for chunk_id in chunk_ids:
+            graph.nodes.pop(chunk_id, None)
+        # Chunk of a remaining relation of each connected entity
+        connected = {}
+        for relation in graph.relations.values():
+            for node_id in (relation.source_id, relation.target_id):
+                connected.setdefault(node_id, relation.properties.get(TRIPLET_SOURCE_KEY))
+        removed = set()
+        for node_id in endpoints | {
+            node.id for node in graph.nodes.values()
+            if isinstance(node, EntityNode) and node.properties.get(TRIPLET_SOURCE_KEY) in chunk_ids
+        }:
+            node = graph.nodes.get(node_id)
+            if node is None:
+                continue
+            if node_id in connected:
+                if node.properties.get(TRIPLET_SOURCE_KEY) in chunk_ids:
+                    node.properties[TRIPLET_SOURCE_KEY] = connected[node_id]
+                continue
+            if node.properties.get(TRIPLET_SOURCE_KEY) in chunk_ids | {None}:
+                del graph.nodes[node_id]
+                removed.add(node_id)
+        return removed, endpoints - removed
+
+    def _entity_ids(self) -> set:
+        if self.backend is not None:
+            return self.backend.entity_ids()
+        return {node.id for node in self.graph.nodes.values() if isinstance(node, EntityNode)}
+
+    def merge_duplicate_entities(self) -> int:
+        """Fold existing entities that resolve to one canonical entity. Returns how many were merged.
+
+        For graphs built before names were canonicalized on insert.
+        """
+        ids = sorted(self._entity_ids())
+        canonical = self._resolve(ids)
+        duplicates = [entity_id for entity_id in ids if canonical[entity_id] != entity_id]
+        if not duplicates:
+            return 0
+        triplets = self.get_triplets(ids=duplicates)
+        keep = set(duplicates) | {canonical[entity_id] for entity_id in duplicates}
+        for subj, _, obj in triplets:
+            keep.update((subj.id, obj.id))
+        nodes = self.get(ids=sorted(keep))
+        # SimplePropertyGraphStore.delete also drops the endpoints of deleted triplets,
+        # so every node touched is upserted again (duplicates fold into their canonical)
+        self.delete(ids=duplicates)
+        self.upsert_nodes(nodes)
+        self.upsert_relations([relation for _, relation, _ in triplets])
+        print(f"Merged {len(duplicates)} duplicate entities")
+        return len(duplicates)
+
+    def has_pending_changes(self) -> bool:
+        """Whether the graph changed since communities were last built."""
+        return bool(self.pending_node_ids)
+
+    @property
+    def _llm(self) -> LLM:
+        return self.llm or Settings.llm
+
+    @staticmethod
+    def _summary_messages(text, prompt=COMMUNITY_SUMMARY_PROMPT):
+        return [
+            ChatMessage(role="system", content=prompt),
             ChatMessage(role="user", content=text),
         ]
-        response = MistralAI().chat(messages)
-        clean_response = re.sub(r"^assistant:\s*", "", str(response)).strip()
-        return clean_response
-
-    def build_communities(self):
-        """Builds communities from the graph and summarizes them."""
-        nx_graph = self._create_nx_graph()
-        community_hierarchical_clusters = hierarchical_leiden(
-            nx_graph, max_cluster_size=self.max_cluster_size
+
+    @staticmethod
+    def _clean_summary(response) -> str:
+        return re.sub(r"^assistant:\s*", "", str(response)).strip()
+
+    def generate_community_summary(self, text):
+        """Generate summary for a given text using an LLM."""
+        response = self._llm.chat(self._summary_messages(text))
+        return self._clean_summary(response)
+
+    async def agenerate_community_summary(self, text, limiter: AdaptiveLimiter, prompt=COMMUNITY_SUMMARY_PROMPT):
+        """Async summary of ``text``, under the limiter and with retries."""
+        messages = self._summary_messages(text, prompt)
+        response = await call_with_retries(
+            limiter, lambda: self._llm.achat(messages), max_retries=self.summary_max_retries
         )
-        community_info = self._collect_community_info(
-            nx_graph, community_hierarchical_clusters
+        return self._clean_summary(response)
+
+    def build_communities(self, incremental: bool = True):
+        """Builds communities at every level of the Leiden hierarchy and summarizes them.
+
+        With ``incremental``, only connected components containing pending entities
+        are re-clustered (seeded with their previous top-level assignments), and only
+        communities whose edge set changed are re-summarized.
+        """
+        graph = self._compact_graph()
+        if not (incremental and self.community_mapping):
+            clusters = self._run_leiden(graph)
+            self._set_hierarchy(clusters)
+            community_info = graph.community_details(clusters)
+            failed = self._summarize_communities(community_info)
+        else:
+            affected = graph.components_containing(self.pending_node_ids)
+
+            # Communities outside the affected region keep their ids, details and summaries
+            members = self.community_members()
+            kept = {
+                cluster
+                for cluster, nodes in members.items()
+                if nodes.isdisjoint(affected) and all(node in graph.index for node in nodes)
+            }
+            community_info = {
+                cluster: details
+                for cluster, details in self.community_info.items()
+                if cluster in kept
+            }
+            kept_summaries = {
+                cluster: self.community_summary[cluster]
+                for cluster in community_info
+                if cluster in self.community_summary
+            }
+            previous_summaries = {
+                self._community_key(details): self.community_summary[cluster]
+                for cluster, details in self.community_info.items()
+                if cluster in self.community_summary
+            }
+
+            subgraph = graph.subgraph(affected)
+            starting_communities = {
+                node: self._root_community(self.community_mapping[node])
+                for node in affected
+                if node in self.community_mapping
+            }
+            # New clusters are numbered after all previous ones so ids never collide
+            offset = max(self.community_level, default=-1) + 1
+            clusters = [
+                item._replace(
+                    cluster=item.cluster + offset,
+                    parent_cluster=(
+                        None if item.parent_cluster is None else item.parent_cluster + offset
+                    ),
+                )
+                for item in self._run_leiden(subgraph, starting_communities)
+            ]
+            self._set_hierarchy(clusters, keep=kept)
+            new_info = subgraph.community_details(clusters)
+
+            failed = self._summarize_communities(new_info, previous_summaries)
+            self.community_summary.update(kept_summaries)
+            community_info.update(new_info)
+        self.community_info = community_info
+        # Communities whose summary failed stay pending, so the next build retries them
+        # (and reuses every summary that did succeed)
+        members = self.community_members() if failed else {}
+        self.pending_node_ids = set().union(*(members.get(cluster, ()) for cluster in failed))
+        self._summaries_version = None
+        try:
+            self.embed_communities()
+        except Exception as e:
+            # Queries fall back to scanning every community without embeddings
+            print(f"Error embedding community summaries: {e}")
+        if self.community_persist_path:
+            self.persist_communities(self.community_persist_path)
+
+    def _set_hierarchy(self, clusters, keep=frozenset()):
+        """Record leaf assignments, levels and parents from Leiden output.
+
+        Entries for communities in ``keep`` are preserved; everything else is replaced.
+        """
+        self.community_mapping = {
+            node: cluster for node, cluster in self.community_mapping.items() if cluster in keep
+        }
+        self.community_level = {
+            cluster: level for cluster, level in self.community_level.items() if cluster in keep
+        }
+        self.community_parent = {
+            cluster: parent for cluster, parent in self.community_parent.items() if cluster in keep
+        }
+        for item in clusters:
+            self.community_level[item.cluster] = item.level
+            self.community_parent[item.cluster] = item.parent_cluster
+            if item.is_final_cluster:
+                self.community_mapping[item.node] = item.cluster
+
+    def _root_community(self, cluster):
+        """The level-0 ancestor of a community."""
+        while self.community_parent.get(cluster) is not None:
+            cluster = self.community_parent[cluster]
+        return cluster
+
+    def community_members(self) -> dict:
+        """Entities in each community, at every level."""
+        members = {}
+        for node, cluster in self.community_mapping.items():
+            while cluster is not None:
+                members.setdefault(cluster, set()).add(node)
+                cluster = self.community_parent.get(cluster)
+        return members
+
+    def community_children(self) -> dict:
+        """Child communities of each community that was split further."""
+        children = {}
+        for cluster, parent in self.community_parent.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(cluster)
+        return children
+
+    def root_communities(self) -> list:
+        """Communities at the coarsest level."""
+        return [cluster for cluster, parent in self.community_parent.items() if parent is None]
+
+    def leaf_communities(self) -> set:
+        """Communities that were not split further."""
+        return set(self.community_mapping.values())
+
+    def _run_leiden(self, graph: CompactGraph, starting_communities=None):
+        """Run hierarchical Leiden, skipping graphs with no edges."""
+        if graph.number_of_edges == 0:
+            return []
+        connected = graph.has_edges()
+        starting = {
+            node: cluster
+            for node, cluster in (starting_communities or {}).items()
+            if node in graph.index and connected[graph.index[node]]
+        }
+        return hierarchical_leiden(
+            graph.leiden_edges(),
+            max_cluster_size=self.max_cluster_size,
+            starting_communities=starting or None,
+            random_seed=self.random_seed,
         )
-        self._summarize_communities(community_info)
 
-    def _create_nx_graph(self):
-        """Converts internal graph representation to NetworkX graph."""
-        nx_graph = nx.Graph()
-        for node in self.graph.nodes.values():
-            nx_graph.add_node(str(node))
+    def _iter_edges(self):
+        """(source, target, relationship, description) for every relation."""
+        if self.backend is not None:
+            yield from self.backend.iter_edges()
+            return
         for relation in self.graph.relations.values():
-            nx_graph.add_edge(
+            yield (
                 relation.source_id,
                 relation.target_id,
-                relationship=relation.label,
-                description=relation.properties["relationship_description"],
+                relation.label,
+                relation.properties["relationship_description"],
             )
-        return nx_graph
 
-    def _collect_community_info(self, nx_graph, clusters):
-        """Collect detailed information for each node based on their community."""
-        community_mapping = {item.node: item.cluster for item in clusters}
-        community_info = {}
-        for item in clusters:
-            cluster_id = item.cluster
-            node = item.node
-            if cluster_id not in community_info:
-                community_info[cluster_id] = []
-
-            for neighbor in nx_graph.neighbors(node):
-                if community_mapping[neighbor] == cluster_id:
-                    edge_data = nx_graph.get_edge_data(node, neighbor)
-                    if edge_data:
-                        detail = f"{node} -> {neighbor} -> {edge_data['relationship']} -> {edge_data['description']}"
-                        community_info[cluster_id].append(detail)
-        return community_info
-
-    def _summarize_communities(self, community_info):
-        """Generate and store summaries for each community."""
+    def _compact_graph(self) -> CompactGraph:
+        """The integer-id graph view, (re)built from the store if missing or stale."""
+        if self.backend is not None and self._compact is not None:
+            if self.backend.revision() != self._compact_revision:
+                # Another process wrote to the graph
+                self._compact = None
+        if self._compact is None:
+            graph = CompactGraph()
+            if self.backend is not None:
+                self._compact_revision = self.backend.revision()
+                graph.add_nodes(sorted(self.backend.entity_ids()))
+            else:
+                graph.add_nodes(
+                    node.id for node in self.graph.nodes.values() if isinstance(node, EntityNode)
+                )
+            graph.add_edges(self._iter_edges())
+            self._compact = graph
+        return self._compact
+
+    def _update_compact(self, update) -> None:
+        """Apply this store's own write to the graph view, or drop the view if it missed others."""
+        if self._compact is None:
+            return
+        if self.backend is not None:
+            revision = self.backend.revision()
+            if revision == self._compact_revision:
+                return
+            if revision != self._compact_revision + 1:
+                self._compact = None
+                return
+            self._compact_revision = revision
+        update(self._compact)
+
+    @staticmethod
+    def _community_key(details) -> str:
+        """Identify a community by its edge set, independent of its cluster id."""
+        return hashlib.sha256("\n".join(sorted(details)).encode()).hexdigest()
+
+    @staticmethod
+    def _truncate(text: str, tokens: int, max_tokens: int) -> str:
+        """Cut ``text`` (``tokens`` long) to roughly max_tokens tokens."""
+        return text if tokens <= max_tokens else text[: len(text) * max_tokens // tokens]
+
+    def _split_to_budget(self, lines: List[str]) -> List[List[str]]:
+        """Group lines into parts of at most summary_max_tokens tokens each.
+
+        A single line over the budget is truncated to fit.
+        """
+        tokenizer = get_tokenizer()
+        budget = self.summary_max_tokens
+        parts, current, used = [], [], 0
+        for line in lines:
+            tokens = len(tokenizer(line)) + 1
+            if tokens > budget:
+                line, tokens = self._truncate(line, tokens, budget), budget
+            if current and used + tokens > budget:
+                parts.append(current)
+                current, used = [], 0
+            current.append(line)
+            used += tokens
+        if current:
+            parts.append(current)
+        return parts
+
+    async def _asummarize_details(self, details: List[str], limiter: AdaptiveLimiter) -> str:
+        """Summarize a community's relationships, map-reducing those over the token budget."""
+        parts = self._split_to_budget(details)
+        partials = await asyncio.gather(
+            *(
+                # Ensure it ends with a period
+                self.agenerate_community_summary("\n".join(part) + ".", limiter)
+                for part in parts
+            )
+        )
+        while len(partials) > 1:
+            parts = self._split_to_budget(partials)
+            if len(parts) == len(partials):
+                # Partial summaries too long to pair up: shorten them all into one call
+                share = max(1, self.summary_max_tokens // len(partials))
+                tokenizer = get_tokenizer()
+                parts = [[self._truncate(text, len(tokenizer(text)), share) for text in partials]]
+            partials = await asyncio.gather(
+                *(
+                    self.agenerate_community_summary(
+                        "\n\n".join(part), limiter, prompt=COMMUNITY_REDUCE_PROMPT
+                    )
+                    for part in parts
+                )
+            )
+        return partials[0]
+
+    async def _asummarize_communities(self, pending: Dict[int, List[str]], show_progress: bool = True):
+        """Summaries for ``pending`` communities; the ones that failed are left out."""
+        limiter = AdaptiveLimiter(
+            initial=self.summary_concurrency,
+            maximum=self.summary_concurrency,
+            target_latency=self.summary_target_latency,
+        )
+        summaries, failed = {}, {}
+
+        async def summarize(community_id, details):
+            try:
+                summaries[community_id] = await self._asummarize_details(details, limiter)
+            except Exception as e:
+                failed[community_id] = e
+
+        await run_jobs(
+            [summarize(community_id, details) for community_id, details in pending.items()],
+            workers=max(1, len(pending)),
+            show_progress=show_progress,
+            desc="Summarizing communities",
+        )
+        for community_id, error in failed.items():
+            print(f"Error summarizing community {community_id}: {error}")
+        return summaries
+
+    def _summarize_communities(self, community_info, previous_summaries=None, show_progress: bool = True):
+        """Generate and store summaries for each community.
+
+        Summaries in ``previous_summaries`` (keyed by ``_community_key``) are reused
+        for communities whose edge set is unchanged; the rest are generated
+        concurrently. Returns the ids of communities that could not be summarized.
+        """
+        previous_summaries = previous_summaries or {}
+        community_summary = {}
+        pending = {}
         for community_id, details in community_info.items():
-            details_text = (
-                "\n".join(details) + "."
-            )  # Ensure it ends with a period
-            self.community_summary[
-                community_id
-            ] = self.generate_community_summary(details_text)
+            key = self._community_key(details)
+            if key in previous_summaries:
+                community_summary[community_id] = previous_summaries[key]
+            else:
+                pending[community_id] = details
+        if pending:
+            community_summary.update(
+                asyncio.run(self._asummarize_communities(pending, show_progress=show_progress))
+            )
+        self.community_summary = community_summary
+        failed = [community_id for community_id in pending if community_id not in community_summary]
+        print(
+            f"Summarized {len(pending) - len(failed)} communities, "
+            f"reused {len(community_info) - len(pending)}, failed {len(failed)}"
+        )
+        return failed
+
+    @staticmethod
+    def _summary_key(summary: str) -> str:
+        return hashlib.sha256(summary.encode()).hexdigest()
+
+    def embed_communities(self, embed_model=None):
+        """Embed community summaries, reusing rows whose summary text is unchanged."""
+        embed_model = embed_model or Settings.embed_model
+        ids = list(self.community_summary)
+        keys = [self._summary_key(self.community_summary[i]) for i in ids]
+        existing = dict(zip(self.community_embedding_keys, self.community_embeddings))
+        missing = [(i, key) for i, key in zip(ids, keys) if key not in existing]
+        if missing:
+            vectors = embed_model.get_text_embedding_batch(
+                [self.community_summary[i] for i, _ in missing]
+            )
+            for (_, key), vector in zip(missing, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                existing[key] = vector / norm if norm else vector
+        self.community_embedding_ids = ids
+        self.community_embedding_keys = keys
+        if ids:
+            self.community_embeddings = np.vstack([existing[key] for key in keys])
+        else:
+            self.community_embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    def get_community_embeddings(self):
+        """Returns (community ids, embedding matrix), embedding any summaries not yet embedded."""
+        keys = [self._summary_key(summary) for summary in self.community_summary.values()]
+        if (
+            self.community_embedding_ids != list(self.community_summary)
+            or self.community_embedding_keys != keys
+        ):
+            self.embed_communities()
+        return self.community_embedding_ids, self.community_embeddings
+
+    def communities_for_text(self, text: str) -> set:
+        """Communities (at any level) containing an entity whose name appears in ``text``."""
+        if getattr(self, "_entity_lookup_source", None) is not self.community_mapping:
+            lookup = {}
+            for cluster, nodes in self.community_members().items():
+                for node in nodes:
+                    lookup.setdefault(node.lower(), set()).add(cluster)
+            self._entity_lookup = lookup
+            self._entity_lookup_source = self.community_mapping
+            self._entity_lookup_max_words = max(
+                (len(name.split()) for name in lookup), default=0
+            )
+
+        # Match every word n-gram of the text against entity names
+        words = re.findall(r"\w+", text.lower())
+        matched = set()
+        for n in range(1, min(self._entity_lookup_max_words, len(words)) + 1):
+            for i in range(len(words) - n + 1):
+                matched |= self._entity_lookup.get(" ".join(words[i:i + n]), set())
+        return matched
 
     def get_community_summaries(self):
-        """Returns the community summaries, building them if not already done."""
-        if not self.community_summary:
+        """Returns the community summaries, building or refreshing them if needed."""
+        if not self.community_summary and self.community_persist_path:
+            # Another worker may have built them since this store was loaded
+            self.load_communities(self.community_persist_path)
+        if not self.community_summary or self.has_pending_changes():
             self.build_communities()
         return self.community_summary
+
+    def reset_communities(self):
+        """Forget communities so the next build starts from scratch."""
+        self.community_summary = {}
+        self._summaries_version = None
+        self.community_mapping = {}
+        self.community_level = {}
+        self.community_parent = {}
+        self.community_info = {}
+        self.community_embedding_ids = []
+        self.community_embedding_keys = []
+        self.community_embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.pending_node_ids = self._entity_ids()
+
+    def summaries_version(self) -> str:
+        """Hash of the current community summaries; changes whenever any summary does."""
+        if self._summaries_version is None:
+            digest = hashlib.sha256()
+            for community_id in sorted(self.community_summary):
+                digest.update(f"{community_id}\0{self.community_summary[community_id]}\0".encode())
+            self._summaries_version = digest.hexdigest()
+        return self._summaries_version
+
+    def graph_version(self) -> str:
+        """Hash of the graph contents, used to tell whether saved communities still apply."""
+        if self.backend is not None:
+            # Every write bumps the backend revision, so it identifies the contents
+            return f"revision-{self.backend.revision()}"
+        digest = hashlib.sha256()
+        for node_id in sorted(self.graph.nodes):
+            digest.update(node_id.encode())
+            digest.update(b"\0")
+        for key in sorted(self.graph.relations):
+            description = self.graph.relations[key].properties.get("relationship_description", "")
+            digest.update(f"{key}\0{description}\0".encode())
+        return digest.hexdigest()
+
+    def persist_communities(
+        self, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None
+    ) -> None:
+        """Save cluster assignments, community details and summaries with a graph version stamp."""
+        if fs is None:
+            fs = fsspec.filesystem("file")
+        data = {
+            "version": self.graph_version(),
+            "community_mapping": self.community_mapping,
+            "community_level": {str(k): v for k, v in self.community_level.items()},
+            "community_parent": {str(k): v for k, v in self.community_parent.items()},
+            "community_info": {str(k): v for k, v in self.community_info.items()},
+            "community_summary": {str(k): v for k, v in self.community_summary.items()},
+            "pending_node_ids": sorted(self.pending_node_ids),
+        }
+        # Write to a temp file first so a crash never leaves a half-written file behind
+        tmp_path = f"{persist_path}.tmp"
+        with fs.open(tmp_path, "w") as f:
+            f.write(json.dumps(data))
+        fs.mv(tmp_path, persist_path)
+
+        embeddings_path = os.path.join(os.path.dirname(persist_path), COMMUNITY_EMBEDDINGS_FNAME)
+        tmp_path = f"{embeddings_path}.tmp"
+        with fs.open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.asarray(self.community_embedding_ids, dtype=np.int64),
+                keys=np.asarray(self.community_embedding_keys, dtype=str),
+                vectors=self.community_embeddings,
+            )
+        fs.mv(tmp_path, embeddings_path)
+        self.community_persist_path = persist_path
+
+    def load_communities(
+        self, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None
+    ) -> bool:
+        """Load saved communities. Returns True if any were loaded.
+
+        If the graph changed since they were saved, every entity is marked pending
+        so the next build refreshes them, reusing summaries whose edges are unchanged.
+        """
+        if fs is None:
+            fs = fsspec.filesystem("file")
+        self.community_persist_path = persist_path
+        if not fs.exists(persist_path):
+            return False
+        try:
+            with fs.open(persist_path, "r") as f:
+                data = json.loads(f.read())
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading communities from {persist_path}: {e}")
+            return False
+        self.community_mapping = data["community_mapping"]
+        self.community_level = {int(k): v for k, v in data.get("community_level", {}).items()}
+        self.community_parent = {int(k): v for k, v in data.get("community_parent", {}).items()}
+        self.community_info = {int(k): v for k, v in data["community_info"].items()}
+        self.community_summary = {int(k): v for k, v in data["community_summary"].items()}
+        self._summaries_version = None
+        self.pending_node_ids = set(data.get("pending_node_ids", []))
+        # Files written before communities were level-aware are refreshed on the next build
+        if data.get("version") != self.graph_version() or "community_parent" not in data:
+            self.pending_node_ids = self._entity_ids()
+
+        embeddings_path = os.path.join(os.path.dirname(persist_path), COMMUNITY_EMBEDDINGS_FNAME)
+        if fs.exists(embeddings_path):
+            try:
+                with fs.open(embeddings_path, "rb") as f:
+                    arrays = np.load(f)
+                    self.community_embedding_ids = arrays["ids"].tolist()
+                    self.community_embedding_keys = arrays["keys"].tolist()
+                    self.community_embeddings = arrays["vectors"]
+            except (OSError, ValueError, KeyError) as e:
+                # Stale or missing rows are recomputed by get_community_embeddings
+                print(f"Error loading community embeddings from {embeddings_path}: {e}")
+        return bool(self.community_summary)
+
+    def persist(
+        self, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None
+    ) -> None:
+        """Persist the graph, plus its communities in the same directory.
+
+        With a backend the graph is already stored as it is written, so only the
+        communities are saved.
+        """
+        if self.backend is None:
+            super().persist(persist_path, fs=fs)
+        community_path = os.path.join(os.path.dirname(persist_path), COMMUNITY_PERSIST_FNAME)
+        self.persist_communities(community_path, fs=fs)
+
+    @classmethod
+    def from_persist_path(
+        cls, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None
+    ) -> "GraphRAGStore":
+        """Load the graph and any communities saved alongside it."""
+        store = super().from_persist_path(persist_path, fs=fs)
+        community_path = os.path.join(os.path.dirname(persist_path), COMMUNITY_PERSIST_FNAME)
+        store.load_communities(community_path, fs=fs)
+        return store
+
+    @classmethod
+    def from_backend(
+        cls,
+        backend: SQLGraphBackend,
+        persist_dir: Optional[str] = None,
+        resolver: Optional[EntityResolver] = None,
+        **kwargs,
+    ) -> "GraphRAGStore":
+        """Open a store over ``backend``, restoring communities saved in ``persist_dir``."""
+        store = cls(backend=backend, resolver=resolver, **kwargs)
+        if persist_dir is not None:
+            store.load_communities(os.path.join(persist_dir, COMMUNITY_PERSIST_FNAME))
+        return store
+
+
+class EntitySourceRecorder(TransformComponent):
+    """Last of an index's kg_extractors: counts each chunk among the sources of the entities it names.
+
+    PropertyGraphIndex drops extracted entities whose id is already stored before
+    upserting the rest, so without this a chunk naming an existing entity would
+    not be part of its provenance, and removing the entity's first chunk would
+    delete it.
+    """
+
+    _store: GraphRAGStore = PrivateAttr()
+
+    def __init__(self, store: GraphRAGStore, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._store = store
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "EntitySourceRecorder"
+
+    def __call__(self, nodes: Sequence[BaseNode], **kwargs) -> Sequence[BaseNode]:
+        sources: Dict[str, set] = {}
+        for node in nodes:
+            for entity in node.metadata.get(KG_NODES_KEY, []):
+                if isinstance(entity, EntityNode):
+                    sources.setdefault(entity.id, set()).add(node.node_id)
+        if sources:
+            self._store.add_entity_sources(sources)
+        return nodes
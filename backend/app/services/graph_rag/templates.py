@@ -61,4 +61,69 @@ For each pair of related entities, extract the following information:
 text: {text}
 ######################
 output:
-"""
\ No newline at end of file
+"""
+
+KG_TRIPLET_EXTRACT_BATCH_TMPL = """
+-Goal-
+You are given several numbered text chunks. Treat each chunk as a separate document: for each one, identify all entities and their entity types and all relationships among the identified entities, extracting up to {max_knowledge_triplets} entity-relation triplets per chunk.
+
+-Steps-
+1. Identify all entities in the chunk. For each identified entity, extract the following information:
+- entity_name: Name of the entity, capitalized
+- entity_type: Type of the entity
+- entity_description: Comprehensive description of the entity's attributes and activities
+
+2. From the entities identified in step 1, identify all pairs of (source_entity, target_entity) that are *clearly related* to each other.
+For each pair of related entities, extract the following information:
+- source_entity: name of the source entity, as identified in step 1
+- target_entity: name of the target entity, as identified in step 1
+- relation: relationship between source_entity and target_entity
+- relationship_description: explanation as to why you think the source entity and the target entity are related to each other
+
+3. Output Formatting:
+- Return the result in valid JSON format with one key: 'chunks', a list with one object per chunk.
+- Each chunk object has the keys 'chunk' (the chunk number), 'entities' (list of entity objects) and 'relationships' (list of relationship objects).
+- Only use entities from a chunk in that chunk's relationships.
+- Exclude any text outside the JSON structure (e.g., no explanations or comments).
+- If no entities or relationships are identified in a chunk, return empty lists for it.
+
+-An Output Example-
+{
+  "chunks": [
+    {
+      "chunk": 1,
+      "entities": [
+        {
+          "entity_name": "Albert Einstein",
+          "entity_type": "Person",
+          "entity_description": "Albert Einstein was a theoretical physicist who developed the theory of relativity."
+        },
+        {
+          "entity_name": "Theory of Relativity",
+          "entity_type": "Scientific Theory",
+          "entity_description": "A scientific theory describing the laws of physics in relation to observers in different frames of reference."
+        }
+      ],
+      "relationships": [
+        {
+          "source_entity": "Albert Einstein",
+          "target_entity": "Theory of Relativity",
+          "relation": "developed",
+          "relationship_description": "Albert Einstein is the developer of the theory of relativity."
+        }
+      ]
+    },
+    {
+      "chunk": 2,
+      "entities": [],
+      "relationships": []
+    }
+  ]
+}
+
+-Real Data-
+######################
+{text}
+######################
+output:
+"""
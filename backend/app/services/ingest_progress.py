@@ -0,0 +1,222 @@
+"""
+Ingestion progress events.
+
+`RAGService.ingest_file` reports each stage through an `IngestProgress`. The
+ingestion worker stores the latest snapshot on the job row and announces it
+with Postgres NOTIFY; each API process relays the notifications to the clients
+following that study material's event stream.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.logging import logger
+
+CHANNEL = "ingestion_progress"
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+
+def job_event(job_id: UUID, material_id: Optional[UUID], status: str, progress: Optional[dict]) -> dict:
+    """The event clients receive: a job's status plus its latest progress snapshot."""
+    return {
+        "job_id": str(job_id),
+        # None for question bank jobs, which no stream follows
+        "material_id": None if material_id is None else str(material_id),
+        **(progress or {}),
+        "status": status,
+    }
+
+
+class IngestProgress:
+    """Running counts for one ingest, sent to `callback` as a snapshot at every stage.
+
+    The ETA extrapolates from the chunks handled so far; for PDFs the total number
+    of chunks is estimated from the pages read out of `documents_total`.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[dict], None]] = None,
+        documents_total: Optional[int] = None,
+    ) -> None:
+        self.callback = callback
+        self.started = time.monotonic()
+        self.counts = {
+            "documents_read": 0,
+            "documents_total": documents_total,
+            "chunks_split": 0,
+            "chunks_skipped": 0,
+            "chunks_extracted": 0,
+            "nodes_inserted": 0,
+            "batches_persisted": 0,
+            "chunks_removed": 0,
+        }
+
+    def estimated_chunks(self) -> Optional[int]:
+        split, read = self.counts["chunks_split"], self.counts["documents_read"]
+        total = self.counts["documents_total"]
+        if not split:
+            return None
+        if total and read:
+            return max(split, round(split * total / read))
+        return split
+
+    def eta(self) -> Optional[float]:
+        done = self.counts["chunks_extracted"] + self.counts["chunks_skipped"]
+        total = self.estimated_chunks()
+        if not done or not total:
+            return None
+        elapsed = time.monotonic() - self.started
+        return round(max(0.0, elapsed * (total - done) / done), 1)
+
+    def update(self, stage: str, **counts: Any) -> None:
+        self.counts.update(counts)
+        if self.callback is None:
+            return
+        event = {
+            "stage": stage,
+            **self.counts,
+            "chunks_estimated": self.estimated_chunks(),
+            "elapsed": round(time.monotonic() - self.started, 1),
+            "eta_seconds": self.eta(),
+        }
+        try:
+            self.callback(event)
+        except Exception as e:
+            print(f"Error reporting ingest progress: {e}")
+
+    def add(self, stage: str, **increments: int) -> None:
+        for name, value in increments.items():
+            self.counts[name] += value
+        self.update(stage)
+
+
+class ProgressReporter:
+    """Publishes one job's progress snapshots from any thread, latest first.
+
+    Snapshots arriving while one is being written replace each other, so a fast
+    extraction never queues up database writes. Create it on the event loop.
+    """
+
+    def __init__(self, publish: Callable[[dict], Awaitable[None]]) -> None:
+        self._publish = publish
+        self._loop = asyncio.get_running_loop()
+        self._latest: Optional[dict] = None
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    def report(self, event: dict) -> None:
+        """Thread-safe; usable as `RAGService.ingest_file`'s progress callback."""
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict) -> None:
+        self._latest = event
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            event, self._latest = self._latest, None
+            if event is not None:
+                try:
+                    await self._publish(event)
+                except Exception as e:
+                    logger.warning(f"Could not publish ingestion progress: {e}")
+            if self._closed and self._latest is None:
+                return
+
+    def _close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+
+    async def aclose(self) -> None:
+        """Publish the last snapshot reported and stop."""
+        # Queued like the reports, so those already made are applied first
+        self._loop.call_soon_threadsafe(self._close)
+        await self._task
+
+
+class ProgressBroker:
+    """Relays progress notifications to the event streams of this API process.
+
+    One LISTEN connection is opened on the first subscription. LISTEN needs a
+    session-level connection, so behind a transaction pooler point
+    INGEST_EVENTS_DB_URL at the direct database port; without a listener, streams
+    still advance by re-reading the job row every INGEST_EVENTS_REFRESH_INTERVAL.
+    """
+
+    # Seconds before a failed LISTEN connection is tried again
+    retry_after = 30.0
+
+    def __init__(self, url: Optional[str] = None) -> None:
+        self.url = url
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._connection = None
+        self._next_attempt = 0.0
+        self._lock = asyncio.Lock()
+
+    def _dsn(self) -> str:
+        url = self.url or settings.INGEST_EVENTS_DB_URL or settings.SQLALCHEMY_DATABASE_URI
+        return url.replace("postgresql+asyncpg://", "postgresql://")
+
+    async def _ensure_listener(self) -> None:
+        async with self._lock:
+            if self._connection is not None or time.monotonic() < self._next_attempt:
+                return
+            try:
+                import asyncpg
+
+                connection = await asyncpg.connect(self._dsn())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                connection.add_termination_listener(self._on_terminate)
+            except Exception as e:
+                self._next_attempt = time.monotonic() + self.retry_after
+                logger.warning(f"Ingestion progress listener unavailable, streams fall back to polling: {e}")
+                return
+            self._connection = connection
+
+    def _on_terminate(self, connection) -> None:
+        if connection is self._connection:
+            self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        self.publish(event)
+
+    def publish(self, event: dict) -> None:
+        """Hand an event to every stream following its material."""
+        for queue in self._subscribers.get(event.get("material_id"), ()):
+            if queue.full():
+                # Snapshots are cumulative; a slow client only needs the newest
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def subscribe(self, material_id: UUID) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        self._subscribers.setdefault(str(material_id), set()).add(queue)
+        await self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, material_id: UUID, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(str(material_id))
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[str(material_id)]
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+
+progress_broker = ProgressBroker()
@@ -1,80 +1,504 @@
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Callable, Iterator, List, Optional
+import asyncio
+import fcntl
+import hashlib
 import json
 import re
+import threading
 
 from llama_index.core import PropertyGraphIndex, SimpleDirectoryReader
+from llama_index.core.graph_stores import SimplePropertyGraphStore
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import Document
+from llama_index.core.readers.file.base import default_file_metadata_func
+from llama_index.core.schema import BaseNode, Document
 from llama_index.llms.mistralai import MistralAI
 from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.index_store import SimpleIndexStore
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
+from llama_index.core.vector_stores import SimpleVectorStore
 
-from app.services.graph_rag import GraphRAGExtractor, GraphRAGQueryEngine, GraphRAGStore, KG_TRIPLET_EXTRACT_TMPL
+from app.services.graph_rag import EntityResolver, PartialAnswerCache, QueryCache, SQLGraphBackend, SQLKVStore, SQLVectorStore, create_storage_engine, normalize_query
+from app.services.graph_rag import EntitySourceRecorder, ExtractionCache, GraphRAGExtractor, GraphRAGQueryEngine, GraphRAGStore, KG_TRIPLET_EXTRACT_BATCH_TMPL, KG_TRIPLET_EXTRACT_TMPL
 from app.core.config import settings
+from app.services.ingest_progress import IngestProgress
+
+# Chunks already inserted for each ingested document, keyed by content
+INGESTED_DOCUMENTS_COLLECTION = "ingested_documents"
+
+
+def chunk_keys(nodes: List[BaseNode], counts: dict) -> List[str]:
+    """Content key of each chunk; ``counts`` numbers repeats of the same text within a document."""
+    keys = []
+    for node in nodes:
+        digest = hashlib.sha256(node.get_content().encode()).hexdigest()
+        counts[digest] = counts.get(digest, 0) + 1
+        keys.append(f"{digest}:{counts[digest]}")
+    return keys
+
+
+def iter_documents(file_path: str) -> Iterator[Document]:
+    """Documents of a file; PDFs are read one page at a time so a large file is never fully loaded."""
+    reader = SimpleDirectoryReader(input_files=[file_path])
+    if Path(file_path).suffix.lower() != ".pdf":
+        yield from reader.load_data()
+        return
+
+    from pypdf import PdfReader
+
+    pdf = PdfReader(file_path)
+    metadata = default_file_metadata_func(file_path)
+    labels = pdf.page_labels
+    for number, page in enumerate(pdf.pages):
+        document = Document(
+            text=page.extract_text() or "",
+            metadata={**metadata, "page_label": labels[number]},
+        )
+        # Same metadata exclusions as SimpleDirectoryReader
+        yield from reader._exclude_metadata([document])
+
+
+def count_documents(file_path: str) -> Optional[int]:
+    """How many documents iter_documents will yield, where that is cheap to know (PDF pages)."""
+    if Path(file_path).suffix.lower() != ".pdf":
+        return None
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def iter_node_batches(
+    documents: Iterator[Document],
+    splitter,
+    batch_size: int,
+    on_split: Optional[Callable[[int], None]] = None,
+) -> Iterator[List[BaseNode]]:
+    """Split documents lazily into chunks, yielding them batch_size at a time.
+
+    ``on_split`` is called with the number of chunks of each document as it is split.
+    """
+    batch = []
+    for document in documents:
+        nodes = splitter.get_nodes_from_documents([document])
+        if on_split is not None:
+            on_split(len(nodes))
+        for node in nodes:
+            batch.append(node)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
 
 class RAGService:
-    def __init__(self, storage_dir: str = "storage"):
+    def __init__(self, storage_dir: str = settings.RAG_STORAGE_DIR):
         self.llm = MistralAI(api_key=settings.MISTRAL_API_KEY)
+        self.storage_path = Path(storage_dir)
+        self.storage_path.mkdir(exist_ok=True)
         self.extractor = GraphRAGExtractor(
             llm=self.llm, 
             extract_prompt=KG_TRIPLET_EXTRACT_TMPL, 
             max_paths_per_chunk=2, 
-            parse_fn=self.parse_fn
+            parse_fn=self.parse_fn,
+            extract_batch_prompt=KG_TRIPLET_EXTRACT_BATCH_TMPL,
+            batch_max_chars=settings.RAG_EXTRACT_BATCH_MAX_CHARS,
+            batch_max_chunks=settings.RAG_EXTRACT_BATCH_MAX_CHUNKS,
+            num_workers=settings.RAG_EXTRACT_WORKERS,
+            max_workers=settings.RAG_EXTRACT_MAX_WORKERS,
+            max_retries=settings.RAG_EXTRACT_MAX_RETRIES,
+            cache=ExtractionCache(
+                self.storage_path / "extraction_cache.sqlite",
+                max_bytes=settings.RAG_EXTRACTION_CACHE_MAX_BYTES,
+            ),
         )
-        self.storage_path = Path(storage_dir)
-        self.storage_path.mkdir(exist_ok=True)
+
+        # Guards the index against concurrent ingestion and reloads in this process;
+        # _storage_lock serializes writers across processes
+        self._lock = threading.RLock()
+
+        # Graph, docstore, index store and vectors live in one database and are written
+        # row by row as nodes are inserted, instead of being rewritten as JSON on every persist
+        engine = create_storage_engine(
+            settings.RAG_GRAPH_STORE_URL or f"sqlite:///{self.storage_path / 'graph.sqlite'}"
+        )
+        self.graph_backend = SQLGraphBackend(engine=engine)
+        self.kvstore = SQLKVStore(engine)
+        self.vector_store = SQLVectorStore(engine)
+        self.resolver = EntityResolver(
+            backend=self.graph_backend,
+            similarity_threshold=settings.RAG_ENTITY_MERGE_THRESHOLD,
+        )
+        # Final answers, shared with every worker on the same database
+        self.query_cache = (
+            QueryCache(
+                engine,
+                similarity_threshold=settings.RAG_QUERY_CACHE_SIMILARITY,
+                ttl=settings.RAG_QUERY_CACHE_TTL,
+                max_entries=settings.RAG_QUERY_CACHE_MAX_ENTRIES,
+            )
+            if settings.RAG_QUERY_CACHE_ENABLED
+            else None
+        )
+        self.answer_cache = (
+            PartialAnswerCache(
+                engine,
+                ttl=settings.RAG_QUERY_CACHE_TTL,
+                max_entries=settings.RAG_PARTIAL_ANSWER_CACHE_MAX_ENTRIES,
+            )
+            if settings.RAG_PARTIAL_ANSWER_CACHE_ENABLED
+            else None
+        )
+        with self._storage_lock():
+            self._migrate_json_storage()
+            self._migrate_json_vectors()
+            if self.graph_backend.has_entities_without_aliases():
+                # Graph built before entity resolution: register its names and merge duplicates
+                GraphRAGStore.from_backend(self.graph_backend, resolver=self.resolver).merge_duplicate_entities()
         
         # Load existing index if available, else initialize new
         self.index = self._load_or_create_index()
+        self._loaded_marker = self._index_marker()
+        self.query_engine = self._create_query_engine()
+
+    def _index_marker(self) -> int:
+        """Graph store revision; any process writing to the graph moves it on."""
+        return self.graph_backend.revision()
+
+    def _migrate_json_storage(self) -> None:
+        """Move a graph and docstore persisted as JSON files into the database (once)."""
+        graph_path = self.storage_path / "property_graph_store.json"
+        if not graph_path.exists() or not self.graph_backend.is_empty():
+            return
+        legacy = SimplePropertyGraphStore.from_persist_path(str(graph_path))
+        self.graph_backend.upsert_nodes(list(legacy.graph.nodes.values()))
+        self.graph_backend.upsert_relations(list(legacy.graph.relations.values()))
+        for fname, store_cls in (("docstore.json", SimpleDocumentStore), ("index_store.json", SimpleIndexStore)):
+            path = self.storage_path / fname
+            if path.exists():
+                legacy_kv = store_cls.from_persist_path(str(path))._kvstore
+                for collection, entries in legacy_kv.to_dict().items():
+                    self.kvstore.put_all(list(entries.items()), collection=collection)
+                path.rename(path.with_name(path.name + ".migrated"))
+        graph_path.rename(graph_path.with_name(graph_path.name + ".migrated"))
+        print(f"Migrated JSON index in {self.storage_path} to the graph database")
+
+    def _migrate_json_vectors(self) -> None:
+        """Move a vector store persisted as a JSON file into the database (once)."""
+        path = self.storage_path / "default__vector_store.json"
+        if not path.exists():
+            return
+        legacy = SimpleVectorStore.from_persist_path(str(path)).data
+        self.vector_store.add_embeddings(legacy.embedding_dict, legacy.text_id_to_ref_doc_id)
+        path.rename(path.with_name(path.name + ".migrated"))
+        print(f"Migrated JSON vector store in {self.storage_path} to the graph database")
+
+    def _create_query_engine(self) -> GraphRAGQueryEngine:
+        return GraphRAGQueryEngine(
+            llm=self.llm,
+            graph_store=self.index.property_graph_store,
+            max_concurrency=settings.RAG_QUERY_CONCURRENCY,
+            request_timeout=settings.RAG_QUERY_TIMEOUT,
+            top_k_communities=settings.RAG_QUERY_TOP_K,
+            keyword_prefilter=settings.RAG_QUERY_KEYWORD_PREFILTER,
+            hierarchical=settings.RAG_QUERY_HIERARCHICAL,
+            max_level=settings.RAG_QUERY_MAX_LEVEL,
+            answer_cache=self.answer_cache,
+            mode=settings.RAG_QUERY_MODE,
+            local_hops=settings.RAG_LOCAL_HOPS,
+            local_max_triplets=settings.RAG_LOCAL_MAX_TRIPLETS,
+            local_max_chunks=settings.RAG_LOCAL_MAX_CHUNKS,
+        )
 
     def _load_or_create_index(self):
-        try:
-            if (self.storage_path / "docstore.json").exists():
-                storage_context = StorageContext.from_defaults(persist_dir=str(self.storage_path))
-                return load_index_from_storage(storage_context)
-            else:
-                # Initialize with empty graph store if no index exists
-                # We use GraphRAGStore (SimplePropertyGraphStore) 
-                return PropertyGraphIndex(
-                    nodes=[], 
-                    property_graph_store=GraphRAGStore(), 
-                    kg_extractors=[self.extractor],
-                    show_progress=True
-                )
-        except Exception as e:
-            print(f"Error loading index: {e}. creating new one.")
-            return PropertyGraphIndex(
-                nodes=[], 
-                property_graph_store=GraphRAGStore(), 
-                kg_extractors=[self.extractor],
+        graph_store = GraphRAGStore.from_backend(
+            self.graph_backend,
+            persist_dir=str(self.storage_path),
+            resolver=self.resolver,
+            llm=self.llm,
+            summary_concurrency=settings.RAG_SUMMARY_CONCURRENCY,
+            summary_max_tokens=settings.RAG_SUMMARY_MAX_TOKENS,
+            summary_max_retries=settings.RAG_SUMMARY_MAX_RETRIES,
+        )
+        # The recorder sees each chunk's entities before the index drops those already stored
+        kg_extractors = [self.extractor, EntitySourceRecorder(graph_store)]
+        storage_context = StorageContext.from_defaults(
+            docstore=KVDocumentStore(self.kvstore),
+            index_store=KVIndexStore(self.kvstore),
+            vector_store=self.vector_store,
+            # Reads the graph lazily from the database; restores saved communities
+            property_graph_store=graph_store,
+        )
+        if storage_context.index_store.index_structs():
+            return load_index_from_storage(
+                storage_context,
+                kg_extractors=kg_extractors,
                 show_progress=True
             )
+        # Initialize with an empty graph if no index exists yet
+        return PropertyGraphIndex(
+            nodes=[],
+            storage_context=storage_context,
+            kg_extractors=kg_extractors,
+            show_progress=True
+        )
 
-    def ingest_file(self, file_path: str):
-        """Read file, split, and build graph index."""
-        documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
-        
-        splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=20)
-        nodes = splitter.get_nodes_from_documents(documents)
-        
-        # Insert nodes into the existing index
-        self.index.insert_nodes(nodes)
-        
-        # Persist changes to disk
+    def reload_if_changed(self) -> bool:
+        """Reload the index if another process persisted a newer one. Returns True on reload."""
+        marker = self._index_marker()
+        if marker == self._loaded_marker:
+            return False
+        with self._lock:
+            if marker == self._loaded_marker:
+                return False
+            # Entities the other process deleted must stop resolving here too
+            self.resolver.clear()
+            self.index = self._load_or_create_index()
+            self._loaded_marker = marker
+            self.query_engine = self._create_query_engine()
+            print(f"Reloaded index from {self.storage_path}")
+            return True
+
+    @contextmanager
+    def _storage_lock(self):
+        """Exclusive lock on the persist dir, shared by every process (API and ingestion workers)."""
+        with open(self.storage_path / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _persist(self) -> None:
+        """Save communities after a write (graph, docstore and vector rows are already stored)."""
         self.index.storage_context.persist(persist_dir=str(self.storage_path))
-        print(f"Ingested {file_path} and persisted to {self.storage_path}")
+        self._loaded_marker = self._index_marker()
+
+    def _remove_chunks(self, node_ids: List[str]) -> None:
+        """Remove chunks and what was extracted only from them from the graph, docstore and vector store."""
+        removed = self.index.property_graph_store.remove_sources(node_ids)
+        for node_id in node_ids:
+            self.index.docstore.delete_document(node_id, raise_error=False)
+        if removed and self.index.vector_store is not None:
+            self.index.vector_store.delete_nodes(list(removed))
+
+    def ingest_file(
+        self,
+        file_path: str,
+        document_id: Optional[str] = None,
+        progress: Optional[Callable[[dict], None]] = None,
+    ):
+        """Read, split and build graph index, streaming the file through in bounded batches.
+
+        Chunks are identified by a hash of their text, so re-ingesting a document
+        (``document_id``, by default the file path) only extracts and inserts chunks
+        it did not have before, and removes those it no longer has. ``progress`` is
+        called with a snapshot of the counts at each stage (see IngestProgress).
+        """
+        document_id = document_id or str(Path(file_path).resolve())
+        tracker = IngestProgress(progress, documents_total=count_documents(file_path))
+        tracker.update("started")
+        manifest = self.kvstore.get(document_id, collection=INGESTED_DOCUMENTS_COLLECTION) or {}
+        known = manifest.get("chunks", {})
+        splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=20)
+        batches = iter_node_batches(
+            iter_documents(file_path),
+            splitter,
+            settings.INGEST_BATCH_NODES,
+            on_split=lambda count: tracker.add("split", documents_read=1, chunks_split=count),
+        )
+
+        seen, counts = set(), {}
+        inserted = 0
+        for nodes in batches:
+            keys = chunk_keys(nodes, counts)
+            seen.update(keys)
+            fresh = {key: node for key, node in zip(keys, nodes) if key not in known}
+            tracker.add("split", chunks_skipped=len(nodes) - len(fresh))
+            if not fresh:
+                continue
+            nodes = list(fresh.values())
+            # Extract triples before taking the lock so workers only serialize on the
+            # (fast) insert and persist, not on the LLM calls
+            extracted = tracker.counts["chunks_extracted"]
+            self.extractor.prepare(
+                nodes,
+                show_progress=True,
+                progress=lambda done, _: tracker.update("extracting", chunks_extracted=extracted + done),
+            )
+
+            with self._lock, self._storage_lock():
+                # Pick up anything persisted by other workers before adding to it
+                self.reload_if_changed()
+
+                # Insert nodes into the existing index; the store marks touched
+                # entities so only their communities are refreshed on the next query
+                self.index.insert_nodes(nodes)
+                tracker.add("inserted", nodes_inserted=len(nodes))
+
+                # Saved per batch so the next batch (or another worker) reloads a
+                # consistent index, and a retried ingest skips what is already in
+                self._persist()
+                known.update({key: node.node_id for key, node in fresh.items()})
+                self.kvstore.put(document_id, {"chunks": known}, collection=INGESTED_DOCUMENTS_COLLECTION)
+            tracker.add("persisted", batches_persisted=1)
+            inserted += len(nodes)
+
+        stale = [key for key in known if key not in seen]
+        if stale:
+            with self._lock, self._storage_lock():
+                self.reload_if_changed()
+                self._remove_chunks([known[key] for key in stale])
+                self._persist()
+                for key in stale:
+                    del known[key]
+                self.kvstore.put(document_id, {"chunks": known}, collection=INGESTED_DOCUMENTS_COLLECTION)
+            tracker.add("removed", chunks_removed=len(stale))
+        pending = len(self.index.property_graph_store.pending_node_ids)
+        # Communities are refreshed lazily on the next query; report what was marked
+        tracker.update("communities", pending_entities=pending)
+        print(
+            f"Ingested {file_path}: {inserted} new chunks, {len(seen) - inserted} unchanged, "
+            f"{len(stale)} removed; persisted to {self.storage_path} ({pending} entities pending community refresh)"
+        )
+
+    def remove_document(self, document_id: str) -> int:
+        """Remove an ingested document: its chunks and whatever was extracted only from them.
+
+        Entities and relations also extracted from other documents stay; only the
+        communities that lost something are refreshed on the next query. Returns the
+        number of chunks removed.
+        """
+        with self._lock, self._storage_lock():
+            manifest = self.kvstore.get(document_id, collection=INGESTED_DOCUMENTS_COLLECTION)
+            if manifest is None:
+                return 0
+            self.reload_if_changed()
+            chunks = list(manifest.get("chunks", {}).values())
+            if chunks:
+                self._remove_chunks(chunks)
+                self._persist()
+            self.kvstore.delete(document_id, collection=INGESTED_DOCUMENTS_COLLECTION)
+        pending = len(self.index.property_graph_store.pending_node_ids)
+        print(f"Removed document {document_id}: {len(chunks)} chunks ({pending} entities pending community refresh)")
+        return len(chunks)
+
+    def close(self) -> None:
+        """Release the graph database connections and the extraction cache."""
+        self.graph_backend.engine.dispose()
+        if self.extractor.cache is not None:
+            self.extractor.cache.close()
+
+    def _cache_version(self) -> str:
+        """What a cached answer depends on: the graph revision and the community summaries."""
+        store = self.index.property_graph_store
+        return f"{store.graph_version()}:{store.summaries_version()}"
 
     def query(self, query_str: str) -> str:
         """Query the graph using GraphRAGQueryEngine."""
-        # Note: GraphRAGStore needs to be passed explicitly if not embedded
-        # The CustomQueryEngine logic expects the store to have communities built
-        
-        # We need to access the underlying graph store
-        graph_store = self.index.property_graph_store
-        
-        # Initialize our Custom Engine
-        query_engine = GraphRAGQueryEngine(llm=self.llm, graph_store=graph_store)
-        return query_engine.query(query_str)
+        # The CustomQueryEngine logic expects the store to have communities built;
+        # they are built lazily on first query and kept until the graph changes
+        self.reload_if_changed()
+        if self.query_cache is None:
+            return str(self.query_engine.query(query_str))
+        cached, vector = self.query_cache.lookup(query_str, self._cache_version())
+        if cached is not None:
+            return cached
+        answer = str(self.query_engine.query(query_str))
+        # Versioned after answering, since the query may have rebuilt the communities
+        self.query_cache.set(query_str, self._cache_version(), answer, vector)
+        return answer
+
+    async def aquery(self, query_str: str) -> str:
+        """Query the graph without blocking the event loop; community answers run concurrently."""
+        await asyncio.to_thread(self.reload_if_changed)
+        if self.query_cache is None:
+            return str(await self.query_engine.aquery(query_str))
+        version = await asyncio.to_thread(self._cache_version)
+        cached, vector = await self.query_cache.alookup(query_str, version)
+        if cached is not None:
+            return cached
+        answer = str(await self.query_engine.aquery(query_str))
+        version = await asyncio.to_thread(self._cache_version)
+        await asyncio.to_thread(self.query_cache.set, query_str, version, answer, vector)
+        return answer
+
+    async def astream_query(self, query_str: str):
+        """Stream progress and answer-token events for a query (see GraphRAGQueryEngine.astream_query).
+
+        A cached answer is sent as a single token event.
+        """
+        await asyncio.to_thread(self.reload_if_changed)
+        if self.query_cache is None:
+            async for event in self.query_engine.astream_query(query_str):
+                yield event
+            return
+        version = await asyncio.to_thread(self._cache_version)
+        cached, vector = await self.query_cache.alookup(query_str, version)
+        if cached is not None:
+            yield {"event": "token", "delta": cached}
+            return
+        tokens = []
+        async for event in self.query_engine.astream_query(query_str):
+            if event["event"] == "token":
+                tokens.append(event["delta"])
+            yield event
+        # Only reached when the client read the whole answer
+        answer = "".join(tokens).strip()
+        version = await asyncio.to_thread(self._cache_version)
+        await asyncio.to_thread(self.query_cache.set, query_str, version, answer, vector)
+
+    def link_questions(self, questions: List[str]):
+        """Embed questions in batches and link each to the graph's entities and communities.
+
+        Returns the question vectors and one link per question (see
+        GraphRAGQueryEngine.link_questions). Builds the communities if needed.
+        """
+        self.reload_if_changed()
+        embed_model = self.query_engine._embed_model
+        size = settings.QUESTION_EMBED_BATCH_SIZE
+        vectors = []
+        for start in range(0, len(questions), size):
+            vectors.extend(embed_model.get_text_embedding_batch(questions[start:start + size]))
+        return vectors, self.query_engine.link_questions(questions, vectors)
+
+    async def aanswer_questions(self, questions: List[str], vectors, links):
+        """Answer linked questions concurrently, yielding ``(index, answer)`` as each completes.
+
+        Answers already in the query cache come first; new ones are added to it,
+        so the same questions sent to ``/query`` later are answered instantly.
+        Repeated questions are answered once. A failed question yields its exception.
+        """
+        pending = list(range(len(questions)))
+        if self.query_cache is not None:
+            version = await asyncio.to_thread(self._cache_version)
+            cached = await asyncio.to_thread(self.query_cache.lookup_many, questions, version, vectors)
+            for index, answer in enumerate(cached):
+                if answer is not None:
+                    yield index, answer
+            pending = [index for index, answer in enumerate(cached) if answer is None]
+        if not pending:
+            return
+
+        repeats = {}
+        for index in pending:
+            repeats.setdefault(normalize_query(questions[index]), []).append(index)
+        unique = [indexes[0] for indexes in repeats.values()]
+        new = []
+        async for position, answer in self.query_engine.aquery_batch(
+            [questions[index] for index in unique], [links[index] for index in unique]
+        ):
+            index = unique[position]
+            if self.query_cache is not None and not isinstance(answer, Exception):
+                new.append((questions[index], answer, vectors[index]))
+            for repeat in repeats[normalize_query(questions[index])]:
+                yield repeat, answer
+        if new:
+            version = await asyncio.to_thread(self._cache_version)
+            await asyncio.to_thread(self.query_cache.set_many, new, version)
 
     @staticmethod
     def parse_fn(response_str: str) -> Any:
@@ -108,3 +532,26 @@ class RAGService:
         except json.JSONDecodeError as e:
             print("Error parsing JSON:", e)
             return entities, relationships
+
+
+_rag_service: Optional[RAGService] = None
+_rag_service_lock = threading.Lock()
+
+
+def get_rag_service() -> RAGService:
+    """Return the process-wide RAGService, creating it on first use."""
+    global _rag_service
+    if _rag_service is None:
+        with _rag_service_lock:
+            if _rag_service is None:
+                _rag_service = RAGService()
+    return _rag_service
+
+
+def close_rag_service() -> None:
+    """Close the process-wide RAGService; the next call to get_rag_service rebuilds it."""
+    global _rag_service
+    with _rag_service_lock:
+        service, _rag_service = _rag_service, None
+    if service is not None:
+        service.close()
@@ -0,0 +1,73 @@
+"""
+Question bank parsing.
+
+A question bank is a document of numbered questions ("1.", "2)", "Q3:",
+"Question 4 -"), each possibly followed by answer options or further lines.
+Documents without numbering are split into paragraphs instead.
+"""
+import re
+from typing import List
+
+from app.services.pipeline import iter_documents
+
+# "12." / "12)" / "Q12:" / "Question 12 -" at the start of a line
+QUESTION_START = re.compile(
+    r"^\s*(?:(?:Q(?:uestion)?\s*\.?\s*(?P<q>\d+)\s*[.):\-]?)|(?:(?P<n>\d+)\s*[.):]))\s+(?P<text>\S.*)$",
+    re.IGNORECASE,
+)
+# Worked answers some banks include; they are not part of the question
+ANSWER_START = re.compile(r"^\s*(?:answer|ans|solution|explanation)\s*[:.\-]", re.IGNORECASE)
+
+
+def _split_numbered(lines: List[str]) -> List[str]:
+    """Questions from numbered lines; returns [] when the text is not numbered.
+
+    A number only starts a question when it follows on from the previous one, or
+    restarts at 1 (a new section) where the current numbering does not continue
+    further down, so numbered statements inside a question stay with it.
+    """
+    matches = [QUESTION_START.match(line) for line in lines]
+    numbers = [int(match.group("q") or match.group("n")) if match else None for match in matches]
+    last_line = {number: i for i, number in enumerate(numbers) if number is not None}
+    questions: List[List[str]] = []
+    expected, in_answer = None, False
+    for i, (line, match, number) in enumerate(zip(lines, matches, numbers)):
+        starts = match is not None and (
+            expected is None
+            or number == expected
+            or (number == 1 and last_line.get(expected, -1) < i)
+        )
+        if starts:
+            questions.append([match.group("text").strip()])
+            expected, in_answer = number + 1, False
+        elif not questions:
+            continue
+        elif ANSWER_START.match(line):
+            in_answer = True
+        elif not in_answer and line.strip():
+            questions[-1].append(line.strip())
+    return ["\n".join(question) for question in questions]
+
+
+def _split_paragraphs(text: str) -> List[str]:
+    paragraphs = [" ".join(block.split()) for block in re.split(r"\n\s*\n", text)]
+    paragraphs = [paragraph for paragraph in paragraphs if paragraph]
+    if len(paragraphs) > 1:
+        return paragraphs
+    # A single block: one question per line ending in a question mark
+    questions = [line.strip() for line in text.splitlines() if line.strip().endswith("?")]
+    return questions or paragraphs
+
+
+def parse_questions(text: str) -> List[str]:
+    """The individual questions of a question bank's text, in order."""
+    questions = _split_numbered(text.splitlines())
+    if not questions:
+        questions = _split_paragraphs(text)
+    return [question for question in questions if question.strip()]
+
+
+def read_questions(file_path: str) -> List[str]:
+    """Parse a question bank file (any format iter_documents reads)."""
+    text = "\n".join(document.text for document in iter_documents(file_path))
+    return parse_questions(text)
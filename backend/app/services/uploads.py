@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from uuid import uuid4
+
+from fastapi import UploadFile
+
+from app.core.exceptions import UploadTooLargeException
+
+
+# Most filesystems limit a single path component to 255 bytes
+MAX_FILENAME_BYTES = 255
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+def safe_filename(filename: str | None) -> str:
+    """The last path component of a client-supplied filename, usable as a file name.
+
+    Control characters are dropped and long names are shortened, keeping the
+    extension. A name with nothing usable left ("", "..", "dir/") is replaced by a
+    generated one.
+    """
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = "".join(char for char in name if char.isprintable()).strip()
+    if name in ("", ".", ".."):
+        return f"upload-{uuid4().hex}"
+    if len(name.encode()) > MAX_FILENAME_BYTES:
+        stem, suffix = os.path.splitext(name)
+        if len(suffix.encode()) > 16:
+            stem, suffix = name, ""
+        stem = stem.encode()[: MAX_FILENAME_BYTES - len(suffix.encode())].decode(errors="ignore")
+        name = stem + suffix
+    return name
+
+
+async def save_upload(
+    file: UploadFile, upload_dir: str, *, max_bytes: int, chunk_size: int = 1024 * 1024
+) -> StoredUpload:
+    """Stream an upload to ``upload_dir`` in chunks, hashing it on the way.
+
+    Disk writes run in a thread so the event loop is never blocked. The file is
+    stored as ``{upload_dir}/{sha256}/{filename}``, so uploads that share a name no
+    longer overwrite each other and identical uploads share one file. It is
+    written under a temporary name and moved once complete, so a failed or
+    oversized upload leaves nothing behind.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeException(max_bytes)
+    os.makedirs(upload_dir, exist_ok=True)
+    partial_path = f"{upload_dir}/.{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    buffer = await asyncio.to_thread(open, partial_path, "wb")
+    try:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeException(max_bytes)
+            digest.update(chunk)
+            await asyncio.to_thread(buffer.write, chunk)
+        await asyncio.to_thread(buffer.close)
+        content_dir = f"{upload_dir}/{digest.hexdigest()}"
+        await asyncio.to_thread(os.makedirs, content_dir, exist_ok=True)
+        path = f"{content_dir}/{safe_filename(file.filename)}"
+        await asyncio.to_thread(os.replace, partial_path, path)
+    except BaseException:
+        buffer.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return StoredUpload(path=path, size=size, sha256=digest.hexdigest())
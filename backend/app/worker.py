@@ -0,0 +1,200 @@
+"""
+Ingestion worker pool.
+
+Runs study material ingestion and question bank processing outside the API
+process. Each worker process polls the `ingestionjob` table, claims a job with
+`SELECT ... FOR UPDATE SKIP LOCKED`, runs `RAGService.ingest_file` (or parses,
+links and answers a question bank), and records the outcome. Failed jobs are
+retried with exponential backoff until `max_attempts` is reached.
+
+Usage:
+    python -m app.worker [--workers N]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.logging import logger
+from app.models.domain import IngestionJob, Question, QuestionBank, StudyMaterial
+from app.services import crud_services
+from app.services.ingest_progress import ProgressReporter
+from app.services.pipeline import get_rag_service
+from app.services.question_bank import read_questions
+
+
+async def _heartbeat(job: IngestionJob):
+    """Keep a running job from being treated as abandoned."""
+    while True:
+        await asyncio.sleep(settings.INGEST_HEARTBEAT_INTERVAL)
+        async with async_session() as session:
+            await crud_services.ingestion_job.heartbeat(session, id=job.id)
+
+
+async def _publish_progress(job: IngestionJob, progress: dict | None = None):
+    async with async_session() as session:
+        await crud_services.ingestion_job.set_progress(session, job=job, progress=progress)
+
+
+async def _save_answers(answers: dict) -> None:
+    async with async_session() as session:
+        await crud_services.question.set_answers(session, answers=answers)
+
+
+async def process_question_bank(job: IngestionJob, report):
+    """Parse a question bank into questions, link them to the graph and answer them all.
+
+    Questions are embedded and linked in batches, then answered concurrently;
+    answers are written QUESTION_ANSWER_FLUSH_SIZE at a time as they complete.
+    """
+    rag = get_rag_service()
+    texts = await asyncio.to_thread(read_questions, job.file_path)
+    progress = {"stage": "parsed", "questions_total": len(texts), "questions_answered": 0, "questions_failed": 0}
+    report(dict(progress))
+    vectors, links = await asyncio.to_thread(rag.link_questions, texts)
+    questions = [
+        Question(
+            bank_id=job.question_bank_id,
+            position=position,
+            text=text,
+            mode=link["mode"],
+            entities=link["entities"],
+            communities=link["communities"],
+        )
+        for position, (text, link) in enumerate(zip(texts, links))
+    ]
+    async with async_session() as session:
+        questions = await crud_services.question.replace_for_bank(
+            session, bank_id=job.question_bank_id, objs_in=questions
+        )
+    progress["stage"] = "linked"
+    report(dict(progress))
+
+    pending = {}
+    async for index, answer in rag.aanswer_questions(texts, vectors, links):
+        if isinstance(answer, Exception):
+            logger.warning(f"Could not answer question {index} of {job.file_path}: {answer}")
+            progress["questions_failed"] += 1
+            continue
+        pending[questions[index].id] = answer
+        if len(pending) >= settings.QUESTION_ANSWER_FLUSH_SIZE:
+            await _save_answers(pending)
+            progress["questions_answered"] += len(pending)
+            pending = {}
+            report({**progress, "stage": "answering"})
+    await _save_answers(pending)
+    progress["questions_answered"] += len(pending)
+    report({**progress, "stage": "answered"})
+    # Retries only pay for the failed questions, the others come from the query cache;
+    # the last attempt keeps what it has
+    if progress["questions_failed"] and job.attempts < job.max_attempts:
+        raise RuntimeError(f"{progress['questions_failed']} of {len(texts)} questions could not be answered")
+
+
+async def process_job(job: IngestionJob):
+    """Run a claimed job and record the result on the job and its material or question bank.
+
+    Progress is stored on the job and announced to the API as the job advances.
+    """
+    rag = get_rag_service()
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    reporter = ProgressReporter(lambda progress: _publish_progress(job, progress))
+    try:
+        if job.question_bank_id is not None:
+            await process_question_bank(job, reporter.report)
+        else:
+            # Keyed by material so a retried or repeated job only inserts chunks it is missing
+            await asyncio.to_thread(rag.ingest_file, job.file_path, str(job.material_id), reporter.report)
+    except Exception as e:
+        logger.error(f"Job failed for {job.file_path} (attempt {job.attempts}/{job.max_attempts}): {e}")
+        await reporter.aclose()
+        async with async_session() as session:
+            await crud_services.ingestion_job.mark_failed(
+                session,
+                job=job,
+                error=str(e),
+                base_delay=settings.INGEST_RETRY_BASE_DELAY,
+                max_delay=settings.INGEST_RETRY_MAX_DELAY,
+            )
+        await _publish_progress(job)
+        return
+    finally:
+        heartbeat.cancel()
+    await reporter.aclose()
+
+    async with async_session() as session:
+        if job.question_bank_id is not None:
+            bank = await session.get(QuestionBank, job.question_bank_id)
+            if bank:
+                bank.is_processed = True
+                bank.processed_at = datetime.utcnow().isoformat()
+                session.add(bank)
+        else:
+            material = await session.get(StudyMaterial, job.material_id)
+            if material:
+                material.is_indexed = True
+                material.indexed_at = datetime.utcnow().isoformat()
+                session.add(material)
+        await crud_services.ingestion_job.mark_succeeded(session, job=job)
+    if job.question_bank_id is not None:
+        await crud_services.question_bank.invalidate_cache()
+    else:
+        await crud_services.study_material.invalidate_cache()
+    await _publish_progress(job)
+    logger.info(f"Processed {job.file_path}")
+
+
+async def run_worker(worker_id: str):
+    """Poll for jobs until cancelled.
+
+    An error outside a job's own handling (e.g. the database going away) is logged
+    and the loop carries on; a job it interrupted is requeued once it goes stale.
+    """
+    logger.info(f"Ingestion worker {worker_id} started")
+    while True:
+        try:
+            async with async_session() as session:
+                await crud_services.ingestion_job.requeue_stale(
+                    session, stale_after=settings.INGEST_STALE_AFTER
+                )
+                job = await crud_services.ingestion_job.claim_next(session, worker_id=worker_id)
+            if job is None:
+                await asyncio.sleep(settings.INGEST_POLL_INTERVAL)
+                continue
+            await process_job(job)
+        except Exception as e:
+            logger.exception(f"Ingestion worker {worker_id} error: {e}")
+            await asyncio.sleep(settings.INGEST_POLL_INTERVAL)
+
+
+def _worker_main(index: int):
+    asyncio.run(run_worker(f"{socket.gethostname()}-{os.getpid()}-{index}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ingestion worker pool.")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS)
+    args = parser.parse_args()
+
+    # Spawn so each worker gets its own engine and RAGService rather than forked copies
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_main, args=(i,), name=f"ingest-worker-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from app.services.graph_rag.compact import CompactGraph
+
+
+def build() -> CompactGraph:
+    graph = CompactGraph()
+    graph.add_edges([
+        ("ATP", "Cell", "powers", "first"),
+        ("ATP", "Cell", "powers", "duplicate"),
+        ("Cell", "ATP", "uses", "reverse"),
+        ("DNA", "RNA", "transcribed_to", "dna"),
+    ])
+    graph.add_nodes(["Lonely"])
+    return graph
+
+
+def test_duplicate_relations_keep_the_first():
+    graph = build()
+    assert graph.number_of_nodes == 5
+    assert graph.number_of_edges == 3
+    assert graph.descriptions == ["first", "reverse", "dna"]
+    # Growing past the initial capacity keeps earlier relations
+    graph.add_edges((f"n{i}", f"n{i + 1}", "next", "") for i in range(2000))
+    assert graph.number_of_edges == 2003
+    assert graph.descriptions[:3] == ["first", "reverse", "dna"]
+
+
+def test_components_and_subgraph():
+    graph = build()
+    assert graph.components_containing(["ATP"]) == {"ATP", "Cell"}
+    assert graph.components_containing(["RNA", "Lonely"]) == {"DNA", "RNA", "Lonely"}
+    assert graph.components_containing(["missing"]) == set()
+    sub = graph.subgraph(["ATP", "Cell", "missing"])
+    assert sub.ids == ["ATP", "Cell"] and sub.number_of_edges == 2
+    assert graph.has_edges().tolist() == [True, True, True, True, False]
+
+
+def test_leiden_edges_are_unique_undirected_pairs():
+    assert build().leiden_edges() == [("ATP", "Cell", 1.0), ("DNA", "RNA", 1.0)]
+
+
+def test_community_details():
+    clusters = [
+        SimpleNamespace(node="ATP", cluster=0, level=0),
+        SimpleNamespace(node="Cell", cluster=0, level=0),
+        SimpleNamespace(node="DNA", cluster=1, level=0),
+        SimpleNamespace(node="RNA", cluster=2, level=0),
+    ]
+    details = build().community_details(clusters)
+    assert details[0] == [
+        "ATP -> Cell -> powers -> first",
+        "Cell -> ATP -> powers -> first",
+        "Cell -> ATP -> uses -> reverse",
+        "ATP -> Cell -> uses -> reverse",
+    ]
+    # The relation crosses communities, so neither lists it
+    assert details[1] == [] and details[2] == []
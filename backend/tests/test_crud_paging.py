@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.crud import CRUDBase, decode_cursor, encode_cursor
+from app.core.exceptions import InvalidCursorException, UnknownFieldsException
+from app.models.domain import QuestionBank
+
+crud = CRUDBase(QuestionBank)
+
+
+def _seed(session_factory, count: int):
+    async def seed():
+        async with session_factory() as db:
+            return await crud.create_many(
+                db, objs_in=[QuestionBank(title=f"bank {i}", file_path=f"{i}.txt") for i in range(count)]
+            )
+
+    return asyncio.run(seed())
+
+
+def _call(session_factory, method, **kwargs):
+    async def call():
+        async with session_factory() as db:
+            return await getattr(crud, method)(db, **kwargs)
+
+    return asyncio.run(call())
+
+
+def test_cursor_round_trip():
+    bank = QuestionBank(title="t", file_path="f")
+    assert decode_cursor(encode_cursor(bank.created_at, bank.id)) == (bank.created_at, bank.id)
+    with pytest.raises(InvalidCursorException):
+        decode_cursor("not a cursor")
+
+
+def test_get_page_walks_every_row_once(session_factory):
+    banks = _seed(session_factory, 7)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = _call(session_factory, "get_page", cursor=cursor, limit=3)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+    expected = [bank.id for bank in sorted(banks, key=lambda bank: (bank.created_at, bank.id))]
+    assert seen == expected
+
+
+def test_projection_applies_to_both_paging_modes(session_factory):
+    _seed(session_factory, 3)
+    rows, _ = _call(session_factory, "get_page", limit=2, fields=["title"])
+    assert set(rows[0]) == {"id", "created_at", "title"}
+    listing = _call(session_factory, "get_listing", skip=1, limit=2, fields=["title"])
+    assert all(set(row) == {"id", "created_at", "title"} for row in json.loads(listing["body"]))
+    with pytest.raises(UnknownFieldsException):
+        _call(session_factory, "get_multi", fields=["nope"])
@@ -0,0 +1,102 @@
+from llama_index.core import MockEmbedding, PropertyGraphIndex
+from llama_index.core.graph_stores.types import (
+    KG_NODES_KEY,
+    KG_RELATIONS_KEY,
+    TRIPLET_SOURCE_KEY,
+    EntityNode,
+    Relation,
+)
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import TextNode, TransformComponent
+
+from app.services.graph_rag.backend import SQLGraphBackend, create_storage_engine
+from app.services.graph_rag.store import EntitySourceRecorder, GraphRAGStore
+
+
+def _store(tmp_path) -> GraphRAGStore:
+    backend = SQLGraphBackend(engine=create_storage_engine(f"sqlite:///{tmp_path / 'graph.sqlite'}"))
+    return GraphRAGStore.from_backend(backend)
+
+
+def _ingest(store: GraphRAGStore, chunk: str, *names: str) -> None:
+    store.upsert_nodes(
+        [EntityNode(name=name, label="T", properties={TRIPLET_SOURCE_KEY: chunk}) for name in names]
+    )
+    store.upsert_relations(
+        [
+            Relation(label="related", source_id=a, target_id=b, properties={TRIPLET_SOURCE_KEY: chunk})
+            for a, b in zip(names, names[1:])
+        ]
+    )
+
+
+class CommaExtractor(TransformComponent):
+    """Takes a chunk's text as comma-separated entity names, each related to the next."""
+
+    def __call__(self, nodes, **kwargs):
+        for node in nodes:
+            names = [name.strip() for name in node.text.split(",")]
+            node.metadata[KG_NODES_KEY] = [EntityNode(name=name, label="T") for name in names]
+            node.metadata[KG_RELATIONS_KEY] = [
+                Relation(label="related", source_id=a, target_id=b) for a, b in zip(names, names[1:])
+            ]
+        return nodes
+
+
+def test_removed_entities_stop_resolving(tmp_path):
+    store = _store(tmp_path)
+    _ingest(store, "chunk-1", "ATP", "Mitochondria")
+    assert store.match_entities("What is ATP?") == ["ATP"]
+
+    assert store.remove_sources(["chunk-1"]) == {"ATP", "Mitochondria"}
+
+    assert store.match_entities("What is ATP?") == []
+    # A fresh resolver reads the backend tables, which no longer hold the aliases either
+    assert _store(tmp_path).match_entities("What is ATP?") == []
+    assert store.backend.get_aliases(["atp", "mitochondria"]) == {}
+
+
+def test_entities_shared_with_remaining_chunks_are_kept(tmp_path):
+    store = _store(tmp_path)
+    _ingest(store, "chunk-1", "ATP", "Mitochondria")
+    _ingest(store, "chunk-2", "ATP", "Glucose")
+
+    removed = store.remove_sources(["chunk-1"])
+
+    assert removed == {"Mitochondria"}
+    assert store.match_entities("ATP and Glucose and Mitochondria") == ["ATP", "Glucose"]
+    triplets = store.get_triplets(entity_names=["ATP"])
+    assert [(s.id, r.label, o.id) for s, r, o in triplets] == [("ATP", "related", "Glucose")]
+    assert store.get(ids=["ATP"])[0].properties[TRIPLET_SOURCE_KEY] == "chunk-2"
+
+
+def test_index_insert_records_chunks_naming_stored_entities(tmp_path):
+    store = _store(tmp_path)
+    index = PropertyGraphIndex(
+        nodes=[],
+        property_graph_store=store,
+        kg_extractors=[CommaExtractor(), EntitySourceRecorder(store)],
+        llm=MockLLM(),
+        embed_model=MockEmbedding(embed_dim=8),
+        embed_kg_nodes=False,
+    )
+    index.insert_nodes([TextNode(id_="chunk-1", text="ATP, Mitochondria, Cristae")])
+    # ATP is already stored, so the index itself only upserts the chunk
+    index.insert_nodes([TextNode(id_="chunk-2", text="ATP")])
+
+    assert store.remove_sources(["chunk-1"]) == {"Mitochondria", "Cristae"}
+    assert store.get(ids=["ATP"])[0].properties[TRIPLET_SOURCE_KEY] == "chunk-2"
+
+
+def test_entities_kept_by_a_relation_point_at_a_remaining_chunk(tmp_path):
+    store = _store(tmp_path)
+    _ingest(store, "chunk-1", "ATP", "Mitochondria")
+    store.upsert_relations([
+        Relation(
+            label="made_in", source_id="ATP", target_id="Mitochondria", properties={TRIPLET_SOURCE_KEY: "chunk-2"}
+        )
+    ])
+
+    assert store.remove_sources(["chunk-1"]) == set()
+    for entity in store.get(ids=["ATP", "Mitochondria"]):
+        assert entity.properties[TRIPLET_SOURCE_KEY] == "chunk-2"
@@ -0,0 +1,41 @@
+import json
+
+from app.services.graph_rag.cache import ExtractionCache
+
+RESULT = ([("ATP", "Molecule", "Energy carrier")], [("ATP", "Cell", "powers", "ATP powers the cell")])
+
+
+def test_round_trip_and_shared_file(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    key = ExtractionCache.make_key("text", "prompt", "model", 10)
+    assert cache.get(key) is None
+    cache.set(key, RESULT)
+    assert cache.get(key) == RESULT
+    # Another worker opening the same file sees the entry
+    assert ExtractionCache(tmp_path / "cache.sqlite").get(key) == RESULT
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_covers_everything_that_changes_the_result():
+    base = ExtractionCache.make_key("text", "prompt", "model", 10)
+    assert base == ExtractionCache.make_key("text", "prompt", "model", 10)
+    assert len({
+        base,
+        ExtractionCache.make_key("text2", "prompt", "model", 10),
+        ExtractionCache.make_key("text", "prompt2", "model", 10),
+        ExtractionCache.make_key("text", "prompt", "model2", 10),
+        ExtractionCache.make_key("text", "prompt", "model", 11),
+    }) == 5
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len(json.dumps([list(RESULT[0]), list(RESULT[1])]))
+    cache = ExtractionCache(tmp_path / "cache.sqlite", max_bytes=entry_size * 3)
+    for key in ("a", "b", "c"):
+        cache.set(key, RESULT)
+    cache.get("a")
+    cache.set("d", RESULT)
+    # Trimmed to 90% of the limit, oldest first; "a" was used after "b" and "c"
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.get("a") == RESULT and cache.get("d") == RESULT
+    assert cache.stats()["bytes"] <= entry_size * 3
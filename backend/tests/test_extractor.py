@@ -0,0 +1,57 @@
+import json
+
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import TextNode
+
+from app.services.graph_rag import KG_TRIPLET_EXTRACT_BATCH_TMPL
+from app.services.graph_rag.extractor import GraphRAGExtractor
+from app.services.pipeline import RAGService
+
+
+def _extractor(**kwargs) -> GraphRAGExtractor:
+    return GraphRAGExtractor(
+        llm=MockLLM(),
+        parse_fn=RAGService.parse_fn,
+        extract_batch_prompt=KG_TRIPLET_EXTRACT_BATCH_TMPL,
+        **kwargs,
+    )
+
+
+def _chunk(number, entity):
+    return {
+        "chunk": number,
+        "entities": [{"entity_name": entity, "entity_type": "T", "entity_description": "d"}],
+        "relationships": [],
+    }
+
+
+def test_parse_batch_assigns_results_by_chunk_number():
+    response = "Here you go:\n" + json.dumps({"chunks": [_chunk(2, "B"), _chunk(1, "A")]})
+    results = _extractor()._parse_batch(response, 3)
+    assert results[0] == ([("A", "T", "d")], [])
+    assert results[1] == ([("B", "T", "d")], [])
+    # Missing chunks are extracted again on their own
+    assert results[2] is None
+
+
+def test_parse_batch_ignores_garbage_and_out_of_range_chunks():
+    extractor = _extractor()
+    assert extractor._parse_batch("no json at all", 2) == [None, None]
+    assert extractor._parse_batch('{"chunks": [', 2) == [None, None]
+    response = json.dumps({"chunks": ["text", _chunk(5, "X"), _chunk("x", "Y"), _chunk(1, "A"), _chunk(1, "Z")]})
+    assert extractor._parse_batch(response, 2) == [([("A", "T", "d")], []), None]
+
+
+def test_pack_respects_the_size_budget():
+    extractor = _extractor(batch_max_chars=100, batch_max_chunks=3)
+    sizes = {"a": 30, "b": 30, "c": 30, "d": 80, "e": 10, "f": 10, "g": 10, "h": 10}
+    nodes = [TextNode(text=letter * size) for letter, size in sizes.items()]
+    batches = [[node.text[0] for node in batch] for batch in extractor._pack(nodes)]
+    # Large chunks go alone, straight away; small ones fill prompts up to the limits
+    assert batches == [["d"], ["a", "b", "c"], ["e", "f", "g"], ["h"]]
+
+
+def test_pack_without_batch_prompt_sends_chunks_alone():
+    extractor = GraphRAGExtractor(llm=MockLLM(), parse_fn=RAGService.parse_fn)
+    nodes = [TextNode(text="x"), TextNode(text="y")]
+    assert [len(batch) for batch in extractor._pack(nodes)] == [1, 1]
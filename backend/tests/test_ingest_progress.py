@@ -0,0 +1,66 @@
+import asyncio
+import time
+from uuid import uuid4
+
+from app.services.ingest_progress import IngestProgress, ProgressBroker, ProgressReporter
+
+
+def test_estimated_chunks_extrapolate_from_pages_read():
+    progress = IngestProgress(documents_total=10)
+    assert progress.estimated_chunks() is None
+    progress.update("split", documents_read=2, chunks_split=8)
+    assert progress.estimated_chunks() == 40
+    progress.update("split", documents_read=10, chunks_split=37)
+    assert progress.estimated_chunks() == 37
+    # Without a page count only the chunks split so far are known
+    unknown = IngestProgress()
+    unknown.update("split", documents_read=3, chunks_split=5)
+    assert unknown.estimated_chunks() == 5
+
+
+def test_eta_and_events():
+    events = []
+    progress = IngestProgress(events.append, documents_total=1)
+    progress.started = time.monotonic() - 10
+    progress.update("split", documents_read=1, chunks_split=20)
+    assert progress.eta() is None
+    progress.add("extract", chunks_extracted=4, chunks_skipped=1)
+    assert 29 <= progress.eta() <= 31
+    assert events[-1]["stage"] == "extract"
+    assert events[-1]["chunks_estimated"] == 20 and events[-1]["chunks_extracted"] == 4
+
+
+def test_reporter_publishes_the_latest_snapshot():
+    published = []
+
+    async def run():
+        async def publish(event):
+            published.append(event)
+            await asyncio.sleep(0)
+
+        reporter = ProgressReporter(publish)
+        for i in range(5):
+            reporter.report({"step": i})
+        await reporter.aclose()
+
+    asyncio.run(run())
+    assert published[-1] == {"step": 4}
+    assert len(published) < 5
+
+
+def test_broker_keeps_only_the_newest_events_for_slow_streams():
+    async def run():
+        broker = ProgressBroker()
+        broker._next_attempt = float("inf")  # no LISTEN connection in tests
+        material_id = uuid4()
+        queue = await broker.subscribe(material_id)
+        for i in range(20):
+            broker.publish({"material_id": str(material_id), "step": i})
+        broker.publish({"material_id": str(uuid4()), "step": "other"})
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+        broker.unsubscribe(material_id, queue)
+        return events, broker._subscribers
+
+    events, subscribers = asyncio.run(run())
+    assert [event["step"] for event in events] == list(range(4, 20))
+    assert subscribers == {}
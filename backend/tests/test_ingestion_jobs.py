@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.models.domain import IngestionJob, JobStatus, StudyMaterial
+from app.services import crud_services
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_requeue_stale_fails_jobs_out_of_attempts(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            material = await crud_services.study_material.create(
+                db, obj_in=StudyMaterial(title="m", file_path="m.txt")
+            )
+            stale = datetime.utcnow() - timedelta(hours=1)
+            jobs = await crud_services.ingestion_job.create_many(
+                db,
+                objs_in=[
+                    IngestionJob(
+                        material_id=material.id,
+                        file_path="m.txt",
+                        status=JobStatus.RUNNING,
+                        attempts=attempts,
+                        max_attempts=3,
+                        heartbeat_at=stale,
+                    )
+                    for attempts in (1, 3)
+                ],
+            )
+            changed = await crud_services.ingestion_job.requeue_stale(db, stale_after=60)
+        async with session_factory() as db:
+            retried = await crud_services.ingestion_job.get(db, id=jobs[0].id)
+            lost = await crud_services.ingestion_job.get(db, id=jobs[1].id)
+        return changed, retried, lost
+
+    changed, retried, lost = _run(scenario())
+    assert changed == 2
+    assert retried.status == JobStatus.PENDING and retried.worker_id is None
+    assert lost.status == JobStatus.FAILED and lost.last_error == "worker lost"
+    assert lost.finished_at is not None
+
+
+def test_requeue_stale_keeps_live_jobs(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            material = await crud_services.study_material.create(
+                db, obj_in=StudyMaterial(title="m", file_path="m.txt")
+            )
+            job = await crud_services.ingestion_job.create(
+                db,
+                obj_in=IngestionJob(
+                    material_id=material.id,
+                    file_path="m.txt",
+                    status=JobStatus.RUNNING,
+                    attempts=5,
+                    heartbeat_at=datetime.utcnow(),
+                ),
+            )
+            assert await crud_services.ingestion_job.requeue_stale(db, stale_after=60) == 0
+            return (await crud_services.ingestion_job.get(db, id=job.id)).status
+
+    assert _run(scenario()) == JobStatus.RUNNING
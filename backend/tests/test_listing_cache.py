@@ -0,0 +1,64 @@
+import asyncio
+
+from app.core.cache import LRUCache, ListingCache, etag_for, etag_matches
+
+
+class UnavailableShared:
+    """A shared backend whose every call fails, like an unreachable Redis."""
+
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, value):
+        raise ConnectionError("down")
+
+    async def get_version(self, namespace):
+        raise ConnectionError("down")
+
+    async def incr_version(self, namespace):
+        raise ConnectionError("down")
+
+
+def test_lru_cache_evicts_oldest_and_expires():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    expired = LRUCache(ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_listing_cache_reloads_after_invalidate():
+    async def run(shared):
+        cache = ListingCache(LRUCache(ttl=60), shared)
+        loads = []
+
+        async def load():
+            loads.append(1)
+            return {"count": len(loads)}
+
+        first = await cache.get_or_load("materials", "page", load)
+        again = await cache.get_or_load("materials", "page", load)
+        await cache.invalidate("materials")
+        reloaded = await cache.get_or_load("materials", "page", load)
+        other = await cache.get_or_load("banks", "page", load)
+        return first, again, reloaded, other
+
+    expected = ({"count": 1}, {"count": 1}, {"count": 2}, {"count": 3})
+    assert asyncio.run(run(None)) == expected
+    # An unavailable shared backend falls back to the local cache
+    assert asyncio.run(run(UnavailableShared())) == expected
+
+
+def test_etag_matches():
+    etag = etag_for("body")
+    assert etag != etag_for("other body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from app.services.graph_rag.backend import create_storage_engine, query_cache
+from app.services.graph_rag.query_cache import PartialAnswerCache, QueryCache, normalize_query
+
+
+class FakeEmbedding:
+    """Embeds a query as its counts of "a" and "b"."""
+
+    def get_query_embedding(self, query):
+        return [query.count("a"), query.count("b")]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_storage_engine(f"sqlite:///{tmp_path / 'graph.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("query", ["What is ATP?", "  what   is atp ", "WHAT IS ATP?!", "what is ａｔｐ."])
+def test_normalize_query(query):
+    assert normalize_query(query) == "what is atp"
+
+
+def test_lookup_by_text_is_tied_to_the_version(engine):
+    cache = QueryCache(engine)
+    cache.set("What is ATP?", "v1", "An energy carrier")
+    assert cache.lookup("what is atp", "v1") == ("An energy carrier", None)
+    assert cache.lookup("What is ATP?", "v2") == (None, None)
+    assert cache.lookup_many(["What is ATP", "Other"], "v1") == ["An energy carrier", None]
+    assert (cache.hits, cache.misses) == (2, 2)
+    # Another worker sharing the database sees the entry
+    assert QueryCache(engine).lookup("What is ATP?", "v1")[0] == "An energy carrier"
+
+
+def test_expired_and_excess_entries_are_evicted(engine):
+    cache = QueryCache(engine, ttl=0)
+    cache.set("q", "v1", "answer")
+    assert cache.lookup("q", "v1")[0] is None
+
+    cache = QueryCache(engine, max_entries=2)
+    cache.set_many([(f"q{i}", "answer", None) for i in range(3)], "v1")
+    assert cache.stats()["entries"] == 2
+
+
+def test_lookup_by_similarity(engine):
+    cache = QueryCache(engine, embed_model=FakeEmbedding(), similarity_threshold=0.99)
+    answer, vector = cache.lookup("aa", "v1")
+    assert answer is None and vector is not None
+    cache.set("aa", "v1", "mostly a", vector)
+    assert cache.lookup("aaa", "v1")[0] == "mostly a"
+    assert cache.lookup("ab", "v1")[0] is None
+    assert cache.lookup("aaa", "v2")[0] is None
+
+
+def test_similarity_finds_entries_committed_out_of_order(engine):
+    reader = QueryCache(engine, embed_model=FakeEmbedding(), similarity_threshold=0.99)
+    writer = QueryCache(engine, embed_model=FakeEmbedding(), similarity_threshold=0.99)
+    writer.set("bb", "v1", "mostly b", writer.lookup("bb", "v1")[1])
+    assert reader.lookup("aaa", "v1")[0] is None
+
+    # Another worker's entry, stamped before the one the reader has seen but committed after it
+    writer.set("aa", "v1", "mostly a", writer.lookup("aa", "v1")[1])
+    with engine.begin() as conn:
+        conn.execute(
+            query_cache.update().where(query_cache.c.query == "aa").values(created_at=time.time() - 60)
+        )
+
+    assert reader.lookup("aaa", "v1")[0] == "mostly a"
+
+
+def test_partial_answers_are_keyed_by_summary_and_query(engine):
+    cache = PartialAnswerCache(engine)
+    key = PartialAnswerCache.make_key(3, "summary", "What is ATP?")
+    assert key == PartialAnswerCache.make_key(3, "summary", "what is atp")
+    assert key != PartialAnswerCache.make_key(3, "new summary", "What is ATP?")
+    assert key != PartialAnswerCache.make_key(4, "summary", "What is ATP?")
+
+    irrelevant = PartialAnswerCache.make_key(4, "summary", "What is ATP?")
+    cache.set_many({key: ("An energy carrier", True), irrelevant: ("", False)})
+    assert cache.get_many([key, irrelevant, "missing"]) == {
+        key: ("An energy carrier", True),
+        irrelevant: ("", False),
+    }
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.question_bank import parse_questions
+
+
+@pytest.mark.parametrize("prefix", ["{}.", "{})", "Q{}:", "q{}.", "Question {} -"])
+def test_numbering_styles(prefix):
+    text = f"{prefix.format(1)} What is ATP?\n{prefix.format(2)} What is DNA?"
+    assert parse_questions(text) == ["What is ATP?", "What is DNA?"]
+
+
+def test_options_stay_with_their_question_and_answers_are_dropped():
+    text = """Biology quiz
+
+1. What is the Krebs cycle?
+a) A metabolic pathway
+b) A bicycle
+2) Name two enzymes of glycolysis.
+Answer: hexokinase, PFK
+still answer text
+3. Define osmosis.
+"""
+    assert parse_questions(text) == [
+        "What is the Krebs cycle?\na) A metabolic pathway\nb) A bicycle",
+        "Name two enzymes of glycolysis.",
+        "Define osmosis.",
+    ]
+
+
+def test_numbered_statements_inside_a_question():
+    text = "Q3: Which statements hold?\n1. Statement one\n2. Statement two\nQuestion 4 - Next question?"
+    assert parse_questions(text) == [
+        "Which statements hold?\n1. Statement one\n2. Statement two",
+        "Next question?",
+    ]
+
+
+def test_numbering_restarts_in_a_new_section():
+    text = "1. First?\n2. Second?\n\n1. Third?\n2. Fourth?"
+    assert parse_questions(text) == ["First?", "Second?", "Third?", "Fourth?"]
+
+
+def test_unnumbered_text():
+    assert parse_questions("What is X?\nWhy Y?\nplain line") == ["What is X?", "Why Y?"]
+    assert parse_questions("Para one\ncontinued\n\nPara two?") == ["Para one continued", "Para two?"]
+    assert parse_questions("Only a statement") == ["Only a statement"]
+    assert parse_questions("  \n") == []
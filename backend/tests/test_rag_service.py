@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore, VectorStoreQuery
+
+from app.services import pipeline
+
+
+def test_close_rag_service_releases_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.settings, "RAG_GRAPH_STORE_URL", None)
+    monkeypatch.setattr(pipeline, "_rag_service", pipeline.RAGService(storage_dir=str(tmp_path)))
+    service = pipeline.get_rag_service()
+    disposed = []
+    monkeypatch.setattr(service.graph_backend.engine, "dispose", lambda: disposed.append(True))
+
+    pipeline.close_rag_service()
+
+    assert disposed == [True]
+    with pytest.raises(sqlite3.ProgrammingError):
+        service.extractor.cache.stats()
+    assert pipeline._rag_service is None
+
+
+def test_vectors_live_in_the_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.settings, "RAG_GRAPH_STORE_URL", None)
+    legacy = SimpleVectorStore()
+    legacy.add([TextNode(id_="ATP", text="", embedding=[1.0, 0.0])])
+    legacy.persist(str(tmp_path / "default__vector_store.json"))
+
+    service = pipeline.RAGService(storage_dir=str(tmp_path))
+    service.vector_store.add([TextNode(id_="Glucose", text="", embedding=[0.0, 1.0])])
+    service._persist()
+
+    assert not (tmp_path / "default__vector_store.json").exists()
+    result = service.index.vector_store.query(VectorStoreQuery(query_embedding=[1.0, 0.1], similarity_top_k=2))
+    assert result.ids == ["ATP", "Glucose"]
+    service.index.vector_store.delete_nodes(["ATP"])
+    assert service.vector_store.query(VectorStoreQuery(query_embedding=[1.0, 0.0])).ids == ["Glucose"]
+    service.close()
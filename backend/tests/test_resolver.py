@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.graph_rag.resolver import EntityResolver, normalize_entity_name
+
+
+@pytest.mark.parametrize(
+    "name, key",
+    [
+        ("The Krebs Cycle", "krebs cycle"),
+        ("krebs-cycle", "krebs cycle"),
+        ("Mitochondria's", "mitochondria"),
+        ("Newton’s laws", "newton laws"),
+        ("ATP", "atp"),
+        ("ＡＴＰ", "atp"),
+        ("A", "a"),
+        # Plurals are left to the embedding pass
+        ("Enzymes", "enzymes"),
+        ("T cells", "t cells"),
+        # Words ending in "s" that are not plurals keep it
+        ("Physics", "physics"),
+        ("Gas", "gas"),
+        ("Analysis", "analysis"),
+        ("Virus", "virus"),
+        ("Glass", "glass"),
+        ("News", "news"),
+        ("Mars", "mars"),
+        ("Texas", "texas"),
+        ("Lens", "lens"),
+        ("Species", "species"),
+        ("Series", "series"),
+        ("Diabetes", "diabetes"),
+    ],
+)
+def test_normalize_entity_name(name, key):
+    assert normalize_entity_name(name) == key
+
+
+def test_resolve_merges_spellings_and_prefers_mixed_case():
+    resolver = EntityResolver()
+    canonical = resolver.resolve(["KREBS CYCLE", "Krebs cycle", "the krebs-cycle"])
+    assert set(canonical.values()) == {"Krebs cycle"}
+
+
+def test_names_ending_in_s_stay_distinct():
+    resolver = EntityResolver()
+    canonical = resolver.resolve(["News", "New", "Mars", "Mar", "Species", "Specie"])
+    assert canonical == {name: name for name in canonical}
+
+
+class TableEmbedding:
+    """Embeds names by lookup, so tests choose which names are similar."""
+
+    vectors = {"Krebs cycle": [1.0, 0.0], "Krebs cycles": [0.99, 0.1], "Krebs citrate": [0.0, 1.0]}
+
+    def get_text_embedding_batch(self, names):
+        return [self.vectors[name] for name in names]
+
+
+def test_plurals_merge_by_embedding():
+    resolver = EntityResolver(embed_model=TableEmbedding(), similarity_threshold=0.95)
+    assert resolver.resolve(["Krebs cycle"]) == {"Krebs cycle": "Krebs cycle"}
+    assert resolver.resolve(["Krebs cycles", "Krebs citrate"]) == {
+        "Krebs cycles": "Krebs cycle",
+        "Krebs citrate": "Krebs citrate",
+    }
+
+
+def test_find_does_not_register_and_forget_unresolves():
+    resolver = EntityResolver()
+    assert resolver.find(["Physics"]) == {}
+    resolver.resolve(["Physics", "Physic"])
+    assert resolver.find(["physics", "Physic"]) == {"physics": "Physics", "Physic": "Physic"}
+    resolver.forget(["Physics"])
+    assert resolver.find(["Physics"]) == {}
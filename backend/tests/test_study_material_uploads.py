@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+from uuid import UUID
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.api.api_v1.endpoints import resources
+from app.core.db import get_session
+from app.models.domain import IngestionJob, JobStatus
+from app.services import crud_services
+from app.services.pipeline import get_rag_service
+
+
+@pytest.fixture
+def client(session_factory, tmp_path, monkeypatch):
+    # Uploads are stored relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    app = FastAPI()
+    app.include_router(resources.router)
+
+    async def session():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    return TestClient(app)
+
+
+def _upload(client, filename: str, content: bytes):
+    response = client.post(
+        "/study-materials/", params={"title": filename}, files={"file": (filename, content)}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_duplicate_upload_under_another_name_leaves_no_file(client):
+    first = _upload(client, "notes.txt", b"same content")
+    second = _upload(client, "copy.txt", b"same content")
+
+    assert second["id"] == first["id"]
+    assert Path(first["file_path"]).exists()
+    assert not (Path(first["file_path"]).parent / "copy.txt").exists()
+
+
+def test_replacing_with_identical_content_leaves_no_file(client):
+    material = _upload(client, "notes.txt", b"same content")
+
+    response = client.put(
+        f"/study-materials/{material['id']}/file", files={"file": ("renamed.txt", b"same content")}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["file_path"] == material["file_path"]
+    assert sorted(path.name for path in Path(material["file_path"]).parent.iterdir()) == ["notes.txt"]
+
+
+class RecordingRAGService:
+    def __init__(self, on_remove=lambda document_id: None):
+        self.on_remove = on_remove
+        self.removed = []
+
+    def remove_document(self, document_id):
+        self.on_remove(document_id)
+        self.removed.append(document_id)
+        return 0
+
+
+def _jobs(session_factory, material_id):
+    async def load():
+        async with session_factory() as db:
+            result = await db.execute(select(IngestionJob).where(IngestionJob.material_id == UUID(material_id)))
+            return result.scalars().all()
+
+    return asyncio.run(load())
+
+
+def test_delete_drops_queued_jobs_before_the_graph(client, session_factory):
+    jobs_left = []
+    service = RecordingRAGService(lambda document_id: jobs_left.append(_jobs(session_factory, document_id)))
+    client.app.dependency_overrides[get_rag_service] = lambda: service
+    material = _upload(client, "notes.txt", b"content")
+    assert _jobs(session_factory, material["id"])
+
+    response = client.delete(f"/study-materials/{material['id']}")
+
+    assert response.status_code == 200, response.text
+    assert jobs_left == [[]]
+
+
+def test_delete_refuses_a_job_claimed_meanwhile(client, session_factory, monkeypatch):
+    service = RecordingRAGService()
+    client.app.dependency_overrides[get_rag_service] = lambda: service
+    material = _upload(client, "notes.txt", b"content")
+    remove_for_material = crud_services.ingestion_job.remove_for_material
+
+    async def claimed_first(db, **kwargs):
+        # A worker claims the queued job just before the delete reaches it
+        async with session_factory() as worker_db:
+            assert await crud_services.ingestion_job.claim_next(worker_db, worker_id="w")
+        return await remove_for_material(db, **kwargs)
+
+    monkeypatch.setattr(crud_services.ingestion_job, "remove_for_material", claimed_first)
+
+    response = client.delete(f"/study-materials/{material['id']}")
+
+    assert response.status_code == 409
+    assert service.removed == []
+    assert [job.status for job in _jobs(session_factory, material["id"])] == [JobStatus.RUNNING]
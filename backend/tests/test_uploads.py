@@ -0,0 +1,50 @@
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.exceptions import UploadTooLargeException
+from app.services.uploads import MAX_FILENAME_BYTES, safe_filename, save_upload
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("notes.pdf", "notes.pdf"),
+        ("../../etc/passwd", "passwd"),
+        ("C:\\Users\\me\\notes.pdf", "notes.pdf"),
+        ("bad\x00name\n.txt", "badname.txt"),
+    ],
+)
+def test_safe_filename(filename, expected):
+    assert safe_filename(filename) == expected
+
+
+@pytest.mark.parametrize("filename", [None, "", "  ", ".", "..", "dir/", "\x00"])
+def test_unusable_filenames_are_replaced(filename):
+    assert safe_filename(filename).startswith("upload-")
+
+
+def test_long_filenames_keep_their_extension():
+    name = safe_filename("é" * 300 + ".pdf")
+    assert name.endswith(".pdf") and len(name.encode()) <= MAX_FILENAME_BYTES
+
+
+def _save(tmp_path, filename, content=b"content", max_bytes=1024):
+    upload = UploadFile(io.BytesIO(content), filename=filename)
+    return asyncio.run(save_upload(upload, str(tmp_path / "uploads"), max_bytes=max_bytes, chunk_size=4))
+
+
+@pytest.mark.parametrize("filename", ["..", "", None])
+def test_save_upload_without_a_usable_filename(tmp_path, filename):
+    stored = _save(tmp_path, filename)
+    assert Path(stored.path).read_bytes() == b"content"
+    assert Path(stored.path).parent.parent == tmp_path / "uploads"
+
+
+def test_oversized_upload_leaves_nothing(tmp_path):
+    with pytest.raises(UploadTooLargeException):
+        _save(tmp_path, "big.txt", content=b"x" * 10, max_bytes=5)
+    assert list((tmp_path / "uploads").iterdir()) == []
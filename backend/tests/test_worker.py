@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+import app.worker as worker
+from app.core.config import settings
+
+
+def test_run_worker_survives_errors_outside_jobs(monkeypatch):
+    calls = []
+
+    class FailingSession:
+        async def __aenter__(self):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("database unavailable")
+            # Stops the loop once it has come back from the first error
+            raise asyncio.CancelledError
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(worker, "async_session", FailingSession)
+    monkeypatch.setattr(settings, "INGEST_POLL_INTERVAL", 0)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(worker.run_worker("test"))
+    assert len(calls) == 2
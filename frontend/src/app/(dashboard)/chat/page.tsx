@@ -20,6 +20,7 @@ export default function ChatPage() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [progress, setProgress] = useState<{ completed: number; total: number } | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
 
@@ -46,17 +47,26 @@ export default function ChatPage() {
     setInput("");
     setIsLoading(true);
 
+    const assistantId = (Date.now() + 1).toString();
     try {
-      const response = await queryApi.ask(input.trim());
-      
-      const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        role: "assistant",
-        content: response.answer,
-        timestamp: new Date(),
-      };
-
-      setMessages((prev) => [...prev, assistantMessage]);
+      let started = false;
+      await queryApi.askStream(input.trim(), (event) => {
+        if (event.event === "progress") {
+          setProgress(event);
+        } else if (event.event === "token") {
+          if (!started) {
+            started = true;
+            setIsLoading(false);
+            setMessages((prev) => [
+              ...prev,
+              { id: assistantId, role: "assistant", content: "", timestamp: new Date() },
+            ]);
+          }
+          setMessages((prev) =>
+            prev.map((m) => (m.id === assistantId ? { ...m, content: m.content + event.delta } : m))
+          );
+        }
+      });
     } catch (error) {
       const errorMessage: Message = {
         id: (Date.now() + 1).toString(),
@@ -64,9 +74,10 @@ export default function ChatPage() {
         content: "Sorry, I encountered an error processing your request. Please try again.",
         timestamp: new Date(),
       };
-      setMessages((prev) => [...prev, errorMessage]);
+      setMessages((prev) => [...prev.filter((m) => m.id !== assistantId), errorMessage]);
     } finally {
       setIsLoading(false);
+      setProgress(null);
       textareaRef.current?.focus();
     }
   };
@@ -179,7 +190,11 @@ export default function ChatPage() {
                 <Card className="max-w-[80%]">
                   <CardContent className="p-4 flex items-center gap-2">
                     <Loader2 className="h-4 w-4 animate-spin" />
-                    <span className="text-sm text-muted-foreground">Thinking...</span>
+                    <span className="text-sm text-muted-foreground">
+                      {progress && progress.total > 0
+                        ? `Reading your materials (${progress.completed}/${progress.total})...`
+                        : "Thinking..."}
+                    </span>
                   </CardContent>
                 </Card>
               </div>
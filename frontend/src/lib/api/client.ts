@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { QuestionBank, StudyMaterial, QueryResponse } from '@/types';
+import { QuestionBank, StudyMaterial, QueryResponse, QueryStreamEvent } from '@/types';
 
 // Use environment variable or default to localhost
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
@@ -41,5 +41,35 @@ export const queryApi = {
   ask: async (query: string) => {
     const response = await apiClient.post<QueryResponse>('/query/', { query });
     return response.data;
-  }
+  },
+  // Streams Server-Sent Events from /query/stream; resolves once the answer is complete
+  askStream: async (query: string, onEvent: (event: QueryStreamEvent) => void) => {
+    const response = await fetch(`${API_BASE_URL}/query/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query }),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Query failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const name = raw.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? '{}');
+        if (name === 'error') throw new Error(data.detail);
+        if (name) onEvent({ event: name, ...data } as QueryStreamEvent);
+      }
+    }
+  },
 };
@@ -22,3 +22,8 @@ export interface StudyMaterial {
 export interface QueryResponse {
   answer: string;
 }
+
+export type QueryStreamEvent =
+  | { event: 'progress'; completed: number; total: number }
+  | { event: 'token'; delta: string }
+  | { event: 'done' };